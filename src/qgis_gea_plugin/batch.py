@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+"""
+Headless batch generation of the farmer reports.
+
+Usage::
+
+    python -m qgis_gea_plugin.batch PROJECT.qgz \\
+        --layer project_instances.shp --output /path/to/output
+
+The reports are written to the 'reports' folder in the output folder
+together with a JSON summary of the timings and failures of the batch.
+The state of each report is recorded in a journal in the same folder,
+an interrupted batch is resumed with the ``--resume`` option, which
+only generates the reports that are unfinished or failed.
+"""
+
+import argparse
+import dataclasses
+import datetime
+import json
+import os
+import signal
+import sys
+import time
+import typing
+from pathlib import Path
+
+from qgis.core import (
+    QgsApplication,
+    QgsDateTimeRange,
+    QgsFeedback,
+    QgsProject,
+    QgsVectorLayer,
+)
+
+from qgis.PyQt import QtCore
+
+from .definitions.defaults import (
+    BATCH_JOURNAL_FILE_NAME,
+    BATCH_SUMMARY_FILE_NAME,
+    DEFAULT_LOG_LEVEL,
+    FARMER_ID_FIELD,
+)
+from .models.base import (
+    ExportProfile,
+    IMAGERY,
+    LogLevel,
+    MapTemporalInfo,
+    ReportBatchMode,
+)
+from .models.report import ReportOutputResult
+from .utils import log_level_from_name, set_log_level, start_file_log, stop_file_log
+
+
+def parse_args(argv: typing.List[str] = None) -> argparse.Namespace:
+    """Parses the command line arguments of the batch runner.
+
+    :param argv: Command line arguments, defaults to `sys.argv`.
+    :type argv: list
+
+    :returns: Parsed arguments.
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m qgis_gea_plugin.batch",
+        description="Generates the farmer reports of a project without the "
+        "QGIS user interface.",
+    )
+    parser.add_argument("project", help="Path to the QGIS project (.qgz) file.")
+    parser.add_argument(
+        "--layer",
+        required=True,
+        help="Path to the project instances layer, which should also be "
+        "loaded in the project.",
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="Output folder, the reports are written to its 'reports' folder.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Number of reports generated concurrently, defaults to the "
+        "report concurrency in the plugin settings.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=[mode.value for mode in ReportBatchMode],
+        default=ReportBatchMode.TASKS.value,
+        help="One report task per farmer or one atlas for all the farmers.",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=[profile.value for profile in ExportProfile],
+        default=None,
+        help="PDF export profile, defaults to the one in the plugin settings.",
+    )
+    parser.add_argument(
+        "--farmer",
+        action="append",
+        default=[],
+        help="Only generate the report of the farmer with the given ID, "
+        "can be repeated.",
+    )
+    parser.add_argument(
+        "--farmer-file",
+        default="",
+        help="Path of a JSON file with the list of the IDs of the farmers "
+        "whose reports are generated.",
+    )
+    # Used by the process backend, the batch project is the given
+    # project and the events are written to the standard output.
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Only generate the reports which are not done in the "
+        f"'reports/{BATCH_JOURNAL_FILE_NAME}' journal of the output folder, "
+        "the combined atlas is generated again for all the farmers if any "
+        "of them is not done.",
+    )
+    parser.add_argument(
+        "--summary",
+        default="",
+        help="Path of the JSON summary, defaults to "
+        f"'reports/{BATCH_SUMMARY_FILE_NAME}' in the output folder.",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=[level.name.lower() for level in LogLevel],
+        default=None,
+        help="Minimum level of the log messages, defaults to the one in the "
+        "plugin settings.",
+    )
+    parser.add_argument(
+        "--log-file",
+        default="",
+        help="Path of a file to which the log messages are written.",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print the plugin log messages to the standard error.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def _init_application(verbose: bool) -> QgsApplication:
+    """Creates and initializes a QGIS application without a GUI."""
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    app = QgsApplication([], False)
+    app.initQgis()
+
+    if verbose:
+        app.messageLog().messageReceived.connect(
+            lambda message, tag, level: print(f"[{tag}] {message}", file=sys.stderr)
+        )
+
+    return app
+
+
+def _run_tasks(tasks: typing.List, results: typing.List[ReportOutputResult]):
+    """Runs the report tasks using the QGIS task manager and blocks
+    until all of them have completed or terminated.
+    """
+    from .lib.reports.process_pool import ProcessBatchReportTask
+    from .lib.reports.scheduler import BatchReportTask
+
+    if not tasks:
+        return
+
+    loop = QtCore.QEventLoop()
+    pending = {id(task) for task in tasks}
+
+    def on_task_done(task, success):
+        if isinstance(task, (BatchReportTask, ProcessBatchReportTask)):
+            task_results = task.results
+        else:
+            task_results = [task.result] if task.result is not None else []
+            for result in task_results:
+                status = "done" if success and result.success else "failed"
+                print(f"{result.name}: {status}", file=sys.stderr)
+        if not task_results and not success:
+            task_results = [
+                ReportOutputResult(
+                    False, "", task.description(), ("Report task terminated.",)
+                )
+            ]
+        results.extend(task_results)
+        pending.discard(id(task))
+        if not pending:
+            loop.quit()
+
+    for task in tasks:
+        task.taskCompleted.connect(lambda task=task: on_task_done(task, True))
+        task.taskTerminated.connect(lambda task=task: on_task_done(task, False))
+        if isinstance(task, (BatchReportTask, ProcessBatchReportTask)):
+            task.report_finished.connect(
+                lambda result: print(
+                    f"{result.name}: {'done' if result.success else 'failed'}",
+                    file=sys.stderr,
+                )
+            )
+
+    # Cancel the pending reports on Ctrl+C, the timer gives the Python
+    # interpreter a chance to run the signal handler.
+    task_manager = QgsApplication.taskManager()
+    previous_handler = signal.signal(
+        signal.SIGINT, lambda *args: task_manager.cancelAll()
+    )
+    timer = QtCore.QTimer()
+    timer.timeout.connect(lambda: None)
+    timer.start(200)
+
+    try:
+        for task in tasks:
+            task_manager.addTask(task)
+        loop.exec_()
+    finally:
+        timer.stop()
+        signal.signal(signal.SIGINT, previous_handler)
+
+
+def run_batch(args: argparse.Namespace) -> typing.Tuple[dict, str]:
+    """Generates the farmer reports, the QGIS application should have
+    been initialized.
+
+    :param args: Parsed command line arguments.
+    :type args: argparse.Namespace
+
+    :returns: Tuple of the batch summary and the path the summary was
+    written to.
+    :rtype: tuple
+    """
+    # The report manager requires an initialized QGIS application
+    from .lib.reports.atlas import ProjectInstanceAtlasTask
+    from .lib.reports.farmers import aggregate_farmers, ensure_farmer_id_index
+    from .lib.reports.journal import BatchJournal
+    from .lib.reports.manager import ReportManager
+    from .lib.reports.process_pool import (
+        metadata_from_dict,
+        ProcessBatchReportTask,
+        WorkerEventWriter,
+    )
+    from .lib.reports.profiler import aggregate_timings
+    from .lib.reports.scheduler import BatchReportTask
+
+    start_time = time.perf_counter()
+    summary = {
+        "project": os.path.abspath(args.project),
+        "layer": os.path.abspath(args.layer),
+        "output": os.path.abspath(args.output),
+        "mode": args.mode,
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "errors": [],
+        "reports": [],
+    }
+
+    layer_path = Path(args.layer)
+    if args.worker:
+        # The farmer file of a worker is the shard written by the parent
+        # with the metadata of its farmers, the reports read the batch
+        # project themselves hence the project is not loaded here.
+        with open(args.farmer_file, "r", encoding="utf-8") as farmer_file:
+            farmers = [metadata_from_dict(values) for values in json.load(farmer_file)]
+    else:
+        project = QgsProject.instance()
+        if not project.read(args.project):
+            summary["errors"].append(f"Unable to read the project {args.project}")
+            return summary, ""
+
+        site_layer = QgsVectorLayer(str(layer_path), layer_path.stem, "ogr")
+        if not site_layer.isValid():
+            summary["errors"].append(f"Invalid project instances layer {args.layer}")
+            return summary, ""
+
+        ensure_farmer_id_index(site_layer)
+        farmers = aggregate_farmers(site_layer)
+        if args.farmer:
+            farmers = [farmer for farmer in farmers if farmer.farmer_id in args.farmer]
+        if args.farmer_file:
+            with open(args.farmer_file, "r", encoding="utf-8") as farmer_file:
+                farmer_ids = set(json.load(farmer_file))
+            farmers = [
+                farmer for farmer in farmers if str(farmer.farmer_id) in farmer_ids
+            ]
+    if not farmers:
+        summary["errors"].append(f"No farmers found in the {FARMER_ID_FIELD} field")
+        return summary, ""
+
+    output_folder = os.path.abspath(args.output)
+    os.makedirs(output_folder, exist_ok=True)
+    # The project of a worker is the batch project prepared by the parent
+    batch_project_path = (
+        os.path.abspath(args.project)
+        if args.worker
+        else ReportManager.prepare_batch_project(output_folder)
+    )
+    if not batch_project_path:
+        summary["errors"].append("Unable to prepare the project for the reports")
+        return summary, ""
+
+    worker_count = args.workers if args.workers > 0 else ReportManager.worker_count()
+    QgsApplication.taskManager().setMaxActiveThreadCount(worker_count)
+    export_profile = (
+        ExportProfile(args.profile) if args.profile else ReportManager.export_profile()
+    )
+    summary["workers"] = worker_count
+    summary["profile"] = export_profile.value
+
+    temporal_info = MapTemporalInfo(IMAGERY.HISTORICAL, QgsDateTimeRange())
+
+    def create_context(metadata):
+        context = ReportManager.create_site_context(
+            metadata, output_folder, QgsFeedback(), temporal_info, batch_project_path
+        )
+        if context is None:
+            return None
+        return dataclasses.replace(
+            context,
+            export_profile=export_profile,
+            site_layer_path=str(layer_path.resolve()),
+            adopt_layout=False,
+        )
+
+    tasks = []
+    batch_mode = ReportBatchMode.TASKS if args.worker else ReportBatchMode(args.mode)
+    context = create_context(farmers[0])
+    journal = None
+    # The journal of a worker is written by the parent from its events
+    event_writer = WorkerEventWriter() if args.worker else None
+    if context is not None and not args.worker:
+        journal = BatchJournal.for_directory(context.report_dir)
+        summary["journal"] = journal.path
+        if args.resume:
+            farmer_count = len(farmers)
+            unfinished = [
+                farmer for farmer in farmers if not journal.is_done(farmer.farmer_id)
+            ]
+            # The combined PDF has the pages of all the farmers, it is
+            # generated again for all of them if any is unfinished.
+            if batch_mode == ReportBatchMode.ATLAS_COMBINED and unfinished:
+                unfinished = farmers
+            farmers = unfinished
+            summary["resumed"] = farmer_count - len(farmers)
+            print(
+                f"Resuming batch, {summary['resumed']} report(s) already done.",
+                file=sys.stderr,
+            )
+        journal.queue(farmer.farmer_id for farmer in farmers)
+
+    if context is None:
+        summary["errors"].append("Unable to create the report context")
+    elif batch_mode == ReportBatchMode.TASKS:
+        batch_task = BatchReportTask(
+            iter(farmers), context, worker_count, len(farmers), event_writer or journal
+        )
+        if event_writer is not None:
+            batch_task.report_finished.connect(event_writer.report)
+        tasks.append(batch_task)
+    elif batch_mode == ReportBatchMode.PROCESSES:
+        tasks.append(
+            ProcessBatchReportTask(
+                farmers, context, str(layer_path.resolve()), worker_count
+            )
+        )
+    elif farmers:
+        # The atlas generates the reports of all the farmers at once
+        # and records the state of each farmer in the journal.
+        tasks.append(
+            ProjectInstanceAtlasTask(
+                context,
+                farmers,
+                batch_mode == ReportBatchMode.ATLAS_COMBINED,
+                journal,
+            )
+        )
+
+    results = []
+    _run_tasks(tasks, results)
+
+    wall_time = time.perf_counter() - start_time
+    succeeded = [result for result in results if result.success]
+    summary.update(
+        {
+            "farmers": len(farmers),
+            "succeeded": len(succeeded),
+            "failed": len(results) - len(succeeded),
+            "wall_time": wall_time,
+            "reports_per_minute": (
+                len(succeeded) * 60 / wall_time if wall_time > 0 else 0.0
+            ),
+            "pdf_size": sum(result.pdf_size for result in results),
+            "aggregates": aggregate_timings(results),
+            "caches": ReportManager.cache_stats(),
+            "journal_states": journal.counts() if journal is not None else {},
+        }
+    )
+    summary["reports"] = [
+        {
+            "name": result.name,
+            "success": result.success,
+            "errors": list(result.errors),
+            "export_duration": result.export_duration,
+            "pdf_size": result.pdf_size,
+            "timings": {timing.name: timing.duration for timing in result.timings},
+        }
+        for result in results
+    ]
+
+    # The summary of the batch is written by the parent of the worker
+    if args.worker:
+        return summary, ""
+
+    summary_path = args.summary or os.path.join(
+        output_folder, "reports", BATCH_SUMMARY_FILE_NAME
+    )
+    with open(summary_path, "w", encoding="utf-8") as summary_file:
+        json.dump(summary, summary_file, indent=2)
+
+    return summary, summary_path
+
+
+def main(argv: typing.List[str] = None) -> int:
+    """Entry point of the batch runner.
+
+    :param argv: Command line arguments, defaults to `sys.argv`.
+    :type argv: list
+
+    :returns: Exit code, 0 if all the reports were generated.
+    :rtype: int
+    """
+    args = parse_args(argv)
+    app = _init_application(args.verbose)
+    if args.log_level:
+        set_log_level(log_level_from_name(args.log_level))
+    else:
+        # The settings are only available once the application exists
+        from .conf import settings_manager, Settings
+
+        set_log_level(
+            log_level_from_name(
+                settings_manager.get_value(
+                    Settings.LOG_LEVEL, default=DEFAULT_LOG_LEVEL
+                )
+            )
+        )
+    if args.log_file:
+        start_file_log(args.log_file)
+
+    try:
+        summary, summary_path = run_batch(args)
+    finally:
+        stop_file_log()
+        app.exitQgis()
+
+    for error in summary["errors"]:
+        print(error, file=sys.stderr)
+
+    if summary_path:
+        print(
+            f"{summary['succeeded']} report(s) generated, {summary['failed']} "
+            f"failed in {summary['wall_time']:.1f}s. Summary: {summary_path}"
+        )
+
+    if summary["errors"] or summary.get("failed", 1):
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -61,6 +61,30 @@ class Settings(enum.Enum):
     LAST_SITE_LAYER_PATH = "last_site_layer_path"
     CURRENT_PROJECT_LAYER_PATH = "current_project_layer_path"
 
+    # Number of reports generated concurrently, 0 or less uses
+    # the number of processor cores minus one.
+    REPORT_CONCURRENCY = "report_concurrency"
+
+    # Whether to write a copy of the project file for each report in a
+    # batch, otherwise all reports use one shared copy of the project.
+    REPORT_PROJECT_COPIES = "report_project_copies"
+
+    # Name of the PDF export profile i.e. draft, standard or print
+    REPORT_EXPORT_PROFILE = "report_export_profile"
+
+    # Whether to reuse the rendered background layers across reports
+    REPORT_BASEMAP_CACHE = "report_basemap_cache"
+
+    # Mechanism for generating the farmer reports, see ReportBatchMode
+    REPORT_BATCH_MODE = "report_batch_mode"
+
+    # Format of the stage timings written to the reports folder after
+    # a batch i.e. json, chrome (trace) or none.
+    REPORT_TIMINGS_FORMAT = "report_timings_format"
+
+    # Minimum level of the plugin log messages i.e. debug, info or warning
+    LOG_LEVEL = "log_level"
+
 
 class SettingsManager(QtCore.QObject):
     """Manages saving/loading settings for the plugin in QgsSettings."""
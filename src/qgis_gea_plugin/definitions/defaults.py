@@ -228,6 +228,16 @@ MASK_NAME_SEGMENT = "Mask"
 SITE_GROUP_NAME = "Drawn Areas of Interest"
 PROJECT_INSTANCES_GROUP_NAME = "Project Instances"
 
+BATCH_PROJECT_FILE_NAME = "batch_project.qgz"
+REPORT_MANIFEST_FILE_NAME = "report_manifest.jsonl"
+BATCH_JOURNAL_FILE_NAME = "batch_journal.jsonl"
+
+# Prefix of the farmer shard and log files of the report worker processes
+REPORT_WORKER_FILE_PREFIX = "batch_worker_"
+
+# Suffix of the PDF files being written, they are renamed once complete
+PARTIAL_PDF_SUFFIX = ".part"
+
 SITE_REPORT_TEMPLATE_NAME = "reforestation_site.qpt"
 PROJECT_INSTANCE_REPORT_TEMPLATE_NAME = "project_instance.qpt"
 
@@ -237,6 +247,57 @@ SATELLITE_IMAGERY = "Google Satellite (latest)"
 
 FARMER_ID_FIELD = "FarmerID"
 
+# Number of milliseconds the batch tasks wait for the results of
+# their workers before checking whether they have been cancelled.
+BATCH_POLL_INTERVAL = 200
+
+# Number of seconds a cancelled batch waits for the reports being
+# exported before abandoning them and freeing its workers.
+BATCH_CANCEL_GRACE_PERIOD = 5
+
+# Files with the stage timings of the reports in a batch
+REPORT_TIMINGS_FILE_NAME = "report_timings.json"
+REPORT_TRACE_FILE_NAME = "report_trace.json"
+
+# Summary of a batch run from the command line
+BATCH_SUMMARY_FILE_NAME = "batch_summary.json"
+
+# Name of the combined PDF of the atlas-driven farmer reports
+ATLAS_COMBINED_REPORT_NAME = "Farmer reports"
+
+# Names of the expensive report generation stages
+STAGE_PROJECT_READ = "project_read"
+STAGE_TEMPLATE_LOAD = "template_load"
+STAGE_PDF_EXPORT = "pdf_export"
+
+# Resolution (in DPI) at which the map items of a report are rendered
+# for each PDF export profile. Labels and vector overlays are not
+# rasterized and hence are not affected by the resolution.
+REPORT_EXPORT_DPI = {
+    "draft": 96,
+    "standard": 200,
+    "print": 300,
+}
+DEFAULT_REPORT_EXPORT_PROFILE = "standard"
+
+# Rendered background layers of the report map items are cached in
+# tiles of the given size in pixels, in a folder under the reports
+# folder. The memory tier holds at most the given number of tiles and
+# the disk tier at most the given number of bytes.
+BASEMAP_CACHE_DIR = ".cache/basemaps"
+BASEMAP_TILE_SIZE = 512
+BASEMAP_MEMORY_CACHE_TILES = 128
+BASEMAP_DISK_CACHE_SIZE = 1024 * 1024 * 1024
+# Maximum number of tiles composed for one map item, larger map items
+# are rendered directly.
+BASEMAP_MAX_TILES = 64
+
+# The plugin log file is flushed by a background thread and rotated
+# once it reaches the maximum size.
+LOG_FILE_MAX_SIZE = 5 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 3
+DEFAULT_LOG_LEVEL = "info"
+
 OVERVIEW_ZOOM_OUT_FACTOR = 13
 DETAILED_ZOOM_OUT_FACTOR = 3
 
@@ -253,3 +314,15 @@ REPORT_SITE_BOUNDARY_STYLE = {
 REPORT_LANDSCAPE_DESCRIPTION_SUFFIX = (
     "with and without exclusion masks and proposed site:"
 )
+
+# Field of the site and project instances layers with the area of
+# each site, in hectares.
+AREA_FIELD = "area (ha)"
+
+# Ellipsoid used to compute the areas of the sites when the current
+# project does not define one (WGS 84).
+DEFAULT_AREA_ELLIPSOID = "EPSG:7030"
+
+# Number of features of the project instances written to the
+# GeoPackage between the checks of whether the import is cancelled.
+IMPORT_BATCH_SIZE = 500
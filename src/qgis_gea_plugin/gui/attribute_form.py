@@ -11,6 +11,7 @@ from qgis.PyQt.uic import loadUiType
 
 from qgis.core import (
     Qgis,
+    QgsApplication,
     QgsEditorWidgetSetup,
     QgsField,
     QgsFillSymbol,
@@ -26,9 +27,11 @@ from qgis.core import (
     QgsVectorLayerSimpleLabeling,
 )
 
+from ..jobs.attributes import SiteAttributesTask
+from ..lib.area import create_distance_area
 from ..utils import tr
 
-from ..definitions.defaults import PROJECT_AREAS
+from ..definitions.defaults import AREA_FIELD, PROJECT_AREAS
 
 WidgetUi, _ = loadUiType(
     os.path.join(os.path.dirname(__file__), "../ui/attribute_form.ui")
@@ -38,13 +41,15 @@ WidgetUi, _ = loadUiType(
 class AttributeForm(QtWidgets.QDialog, WidgetUi):
     """Dialog for showing the attribute form."""
 
-    def __init__(self, layer, parent=None):
+    def __init__(self, layer, parent=None, areas_computed=False):
         super().__init__(
             parent, QtCore.Qt.WindowMinimizeButtonHint | QtCore.Qt.WindowCloseButtonHint
         )
         self.setupUi(self)
         self.parent = parent
         self.layer = layer
+        # True if the areas of the layer were computed when importing it
+        self.areas_computed = areas_computed
 
         self.project_cmb_box.addItems(PROJECT_AREAS)
 
@@ -59,6 +64,16 @@ class AttributeForm(QtWidgets.QDialog, WidgetUi):
         for signal in ok_signals:
             signal.connect(self.update_ok_buttons)
 
+        # Progress of the attributes being saved
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        self.verticalLayout.insertWidget(
+            self.verticalLayout.indexOf(self.buttonBox), self.progress_bar
+        )
+
+        self.attributes_task = None
+
     def update_ok_buttons(self):
         """Responsible for changing the state of the
         attribute form dialog OK button.
@@ -70,15 +85,24 @@ class AttributeForm(QtWidgets.QDialog, WidgetUi):
         self.buttonBox.button(QtWidgets.QDialogButtonBox.Ok).setEnabled(enabled_state)
 
     def accept(self):
-
-        self.layer.startEditing()
+        """Adds the missing attribute fields to the layer and starts
+        the background task writing the attributes of all the sites.
+        """
+        if self.attributes_task is not None:
+            return
 
         fields = self.layer.fields()
 
-        new_fields = ["author", "project", "area (ha)"]
+        new_fields = {
+            "author": QgsField("author", QtCore.QVariant.String),
+            "project": QgsField("project", QtCore.QVariant.String),
+            AREA_FIELD: QgsField(AREA_FIELD, QtCore.QVariant.Double, len=20, prec=2),
+        }
         attributes = []
 
         for field in new_fields:
+            if field == AREA_FIELD and self.areas_computed:
+                continue
             if fields.indexFromName(field) != -1:
                 reply = QtWidgets.QMessageBox.warning(
                     self,
@@ -93,46 +117,88 @@ class AttributeForm(QtWidgets.QDialog, WidgetUi):
                 if reply == QtWidgets.QMessageBox.Yes:
                     continue
                 else:
-                    self.layer.commitChanges()
                     return
             else:
                 # If not found in the layer add it to the list
                 # of attributes that will be added to layer fields later
-                attributes.append(QgsField(field, QtCore.QVariant.String))
+                attributes.append(new_fields[field])
 
         provider = self.layer.dataProvider()
         provider.addAttributes(attributes)
 
         self.layer.updateFields()
 
-        features = self.layer.getFeatures()
-        feature = next(features, None)
-        while feature is not None:
-            # Set attribute values
-            area = 0
-            geom = feature.geometry()
+        # Ellipsoidal areas of all the features, in hectares
+        distance_area = None
+        if not self.areas_computed:
+            distance_area = create_distance_area(
+                self.layer.crs(),
+                QgsProject.instance().transformContext(),
+                QgsProject.instance().ellipsoid(),
+            )
+        self.attributes_task = SiteAttributesTask(
+            self.layer,
+            self.report_author_le.text(),
+            self.project_cmb_box.currentText(),
+            distance_area,
+        )
+        self.attributes_task.progressChanged.connect(
+            lambda value: self.progress_bar.setValue(int(value))
+        )
+        self.attributes_task.taskCompleted.connect(self.on_attributes_saved)
+        self.attributes_task.taskTerminated.connect(self.on_attributes_terminated)
 
-            if geom is None or not geom.isGeosValid():
-                self.parent.show_message(
-                    tr(
-                        "Skipped area calculation for a feature with "
-                        "an invalid geometry."
-                    )
-                )
-            else:
-                area = geom.area() / 10000
+        self.buttonBox.button(QtWidgets.QDialogButtonBox.Ok).setEnabled(False)
+        self.report_author_le.setEnabled(False)
+        self.project_cmb_box.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
 
-            feature_area = f"{area:,.2f}"
+        QgsApplication.taskManager().addTask(self.attributes_task)
 
-            feature.setAttribute("author", self.report_author_le.text())
-            feature.setAttribute("project", self.project_cmb_box.currentText())
-            feature.setAttribute("area (ha)", feature_area)
+    def reject(self):
+        """Cancels the saving of the attributes if it is in progress,
+        the dialog is closed once the task has stopped.
+        """
+        if self.attributes_task is not None:
+            self.attributes_task.cancel()
+            return
 
-            self.layer.updateFeature(feature)
-            # Retrieve the next feature
-            feature = next(features, None)
+        super().reject()
 
-        self.layer.commitChanges()
+    def on_attributes_saved(self):
+        """Slot raised when the attributes of all the sites have been
+        written to the layer.
+        """
+        invalid_count = self.attributes_task.invalid_count
+        self.attributes_task = None
+
+        if invalid_count:
+            self.parent.show_message(
+                tr(
+                    "Skipped area calculation for {} feature(s) with "
+                    "an invalid geometry."
+                ).format(invalid_count)
+            )
+
+        # The layer has been reloaded by the task
+        self.layer.triggerRepaint()
         self.layer.setReadOnly(True)
 
         super().accept()
+
+    def on_attributes_terminated(self):
+        """Slot raised when the saving of the attributes has failed or
+        has been cancelled, the layer is left unchanged apart from the
+        added fields.
+        """
+        error = self.attributes_task.error
+        self.attributes_task = None
+
+        if error:
+            self.parent.show_message(
+                tr("Unable to save the project instance attributes: {}").format(error),
+                Qgis.Warning,
+            )
+
+        super().reject()
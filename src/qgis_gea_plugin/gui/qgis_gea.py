@@ -13,14 +13,17 @@ import uuid
 from datetime import datetime
 
 # QGIS imports
-from qgis.PyQt import QtCore, QtGui, QtNetwork, QtWidgets
+from qgis.PyQt import QtCore, QtGui, QtNetwork, QtWidgets, sip
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.uic import loadUiType
 from qgis.core import (
     Qgis,
     QgsApplication,
+    QgsCoordinateTransform,
+    QgsCsException,
     QgsEditFormConfig,
     QgsEditorWidgetSetup,
+    QgsFeatureRequest,
     QgsFeedback,
     QgsField,
     QgsFillSymbol,
@@ -42,20 +45,26 @@ from ..conf import Settings, settings_manager
 from ..definitions.defaults import (
     ANIMATION_PAUSE_ICON,
     ANIMATION_PLAY_ICON,
+    AREA_FIELD,
     PROJECT_AREAS,
     PLUGIN_ICON,
     PROJECT_INSTANCES_GROUP_NAME,
     REPORT_SITE_BOUNDARY_STYLE,
     SITE_GROUP_NAME,
-    FARMER_ID_FIELD,
     PROJECT_INSTANCE_STYLE,
     SATELLITE_IMAGERY,
 )
 from .attribute_form import AttributeForm
 from .report_progress_dialog import ReportProgressDialog
+from ..jobs.aggregation import FarmerAggregationTask
+from ..jobs.project_import import ProjectInstanceImportTask
+from ..lib.area import create_distance_area, format_area, geometry_hectares
+from ..lib.reports.journal import BatchJournal
 from ..lib.reports.manager import report_manager
-from ..models.base import IMAGERY, MapTemporalInfo
-from ..models.report import ReportSubmitResult, SiteMetadata, ProjectMetadata
+from ..lib.reports.process_pool import ProcessBatchReportTask
+from ..lib.reports.scheduler import BatchReportTask
+from ..models.base import IMAGERY, MapTemporalInfo, ReportBatchMode
+from ..models.report import ReportSubmitResult, SiteMetadata
 
 from ..utils import clean_filename, create_dir, log, tr
 from ..utils import FileUtils
@@ -182,9 +191,13 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
         # These are used to keep track of the project instances reporting
         # which we process in chunks
         self.project_instances = []
+        self.aggregation_task = None
+        self.import_task = None
         self.project_chunk_size = 10
         self.project_chunk = 0
         self.main_task = None
+        self.batch_project_path = ""
+        self.report_tasks = []
 
         self.iface.projectRead.connect(self.prepare_time_slider)
 
@@ -276,6 +289,10 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
         self.project_instances_changed()
 
     def project_instances_changed(self):
+        if self.import_task is not None:
+            self.show_message(tr("The project instances are already being imported."))
+            return
+
         self.drawing_frame.setEnabled(False)
 
         # Define file filter for shapefiles only
@@ -286,11 +303,81 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
             None, "Select Shapefile", "", file_filter
         )
 
-        instance_name = pathlib.Path(instance_path).stem
-        layer = QgsVectorLayer(instance_path, instance_name, "ogr")
+        if not instance_path:
+            return
+
+        output_path = f"{os.path.splitext(instance_path)[0]}.gpkg"
+        if os.path.normcase(os.path.abspath(instance_path)) == os.path.normcase(
+            os.path.abspath(output_path)
+        ):
+            self.show_message(
+                tr(
+                    "The project instances layer {} cannot be imported "
+                    "to itself, select a shapefile."
+                ).format(instance_path)
+            )
+            return
+
+        for map_layer in QgsProject.instance().mapLayers().values():
+            source_path = map_layer.source().split("|")[0]
+            if os.path.normpath(source_path) == os.path.normpath(output_path):
+                self.show_message(
+                    tr(
+                        "The project instances have already been imported "
+                        "to {}, remove the layer to import them again."
+                    ).format(output_path)
+                )
+                return
+
+        if os.path.exists(output_path):
+            reply = QtWidgets.QMessageBox.warning(
+                self,
+                tr("QGIS EPAL PLUGIN"),
+                tr(
+                    "The file {} already exists. "
+                    "Do you want to proceed and overwrite it?"
+                ).format(output_path),
+                QtWidgets.QMessageBox.Yes,
+                QtWidgets.QMessageBox.No,
+            )
+            if reply != QtWidgets.QMessageBox.Yes:
+                return
+
+        # The layer is converted to an indexed GeoPackage in the
+        # background and added to the project once converted.
+        self.import_task = ProjectInstanceImportTask(
+            instance_path,
+            output_path,
+            QgsProject.instance().transformContext(),
+            QgsProject.instance().ellipsoid(),
+        )
+        self.import_task.taskCompleted.connect(self.on_project_instances_imported)
+        self.import_task.taskTerminated.connect(
+            self.on_project_instances_import_terminated
+        )
+        self.show_task_progress(self.import_task, tr("Importing project instances"))
+        QgsApplication.taskManager().addTask(self.import_task)
+
+    def on_project_instances_imported(self):
+        """Slot raised when the project instances layer has been
+        imported, adds the layer to the project.
+        """
+        self.message_bar.clearWidgets()
+        import_task = self.import_task
+        self.import_task = None
+
+        layer = QgsVectorLayer(import_task.layer_uri, import_task.layer_name, "ogr")
 
         if layer.isValid():
 
+            if import_task.invalid_count:
+                self.show_message(
+                    tr(
+                        "Skipped area calculation for {} feature(s) with "
+                        "an invalid geometry."
+                    ).format(import_task.invalid_count)
+                )
+
             style_file = FileUtils.style_file_path(PROJECT_INSTANCE_STYLE)
             layer.loadNamedStyle(style_file)
             layer.triggerRepaint()
@@ -315,9 +402,36 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
             # Add the layer to the group
             group.addLayer(layer)
 
-            self.load_attribute_form(layer)
+            # The extent of the sites was computed by the import
+            if not import_task.extent.isNull():
+                canvas = self.iface.mapCanvas()
+                transform = QgsCoordinateTransform(
+                    layer.crs(),
+                    canvas.mapSettings().destinationCrs(),
+                    QgsProject.instance(),
+                )
+                try:
+                    canvas.setExtent(transform.transformBoundingBox(import_task.extent))
+                    canvas.refresh()
+                except QgsCsException as e:
+                    log(f"Unable to zoom to the project instances, {e}", info=False)
 
-    def load_attribute_form(self, layer):
+            self.load_attribute_form(layer, areas_computed=True)
+
+    def on_project_instances_import_terminated(self):
+        """Slot raised when the import of the project instances layer
+        has failed or has been cancelled.
+        """
+        self.message_bar.clearWidgets()
+        error = self.import_task.error
+        self.import_task = None
+
+        self.show_message(
+            tr("Unable to import the project instances. {}").format(error),
+            Qgis.Warning,
+        )
+
+    def load_attribute_form(self, layer, areas_computed=False):
 
         wkb_type = layer.wkbType()
 
@@ -336,7 +450,9 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
             )
             return
 
-        attribute_form = AttributeForm(layer, parent=self)
+        attribute_form = AttributeForm(
+            layer, parent=self, areas_computed=areas_computed
+        )
         attribute_form.exec_()
 
     def project_folder_changed(self):
@@ -577,7 +693,7 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
                 QgsField("country", QVariant.String),
                 QgsField("inception_date", QVariant.String),
                 QgsField("capture_date", QVariant.String),
-                QgsField("area (ha)", QVariant.String),
+                QgsField(AREA_FIELD, QVariant.Double, len=20, prec=2),
             ]
         )
         self.drawing_layer.updateFields()
@@ -837,7 +953,7 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
             "country",
             "inception_date",
             "capture_date",
-            "area (ha)",
+            AREA_FIELD,
         ]
 
         # Disable editing for the specified fields
@@ -847,12 +963,14 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
         first_feature = next(features, None)  # Retrieve the first feature
 
         if first_feature:
-            feature_area = None
-            geom = first_feature.geometry()
-            if geom is not None and geom.isGeosValid():
-                area = geom.area() / 10000
-                feature_area = f"{area:,.2f}"
-                self.last_computed_area = feature_area
+            distance_area = create_distance_area(
+                self.drawing_layer.crs(),
+                QgsProject.instance().transformContext(),
+                QgsProject.instance().ellipsoid(),
+            )
+            feature_area = geometry_hectares(first_feature.geometry(), distance_area)
+            if feature_area is not None:
+                self.last_computed_area = format_area(feature_area)
 
             # Set attribute values
             first_feature.setAttribute("id", 1)
@@ -864,7 +982,7 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
                 "inception_date", selected_date_time.toString("MMyy")
             )
             first_feature.setAttribute("capture_date", self.capture_date)
-            first_feature.setAttribute("area (ha)", feature_area)
+            first_feature.setAttribute(AREA_FIELD, feature_area)
 
             self.drawing_layer.updateFeature(first_feature)
 
@@ -1165,10 +1283,11 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
 
         self.current_project_layer.setSubsetString("")
 
-        site_features = site_layer.getFeatures()
-        features = list(site_features)
+        first_feature = next(
+            site_layer.getFeatures(QgsFeatureRequest().setLimit(1)), None
+        )
 
-        if len(features) == 0:
+        if first_feature is None:
             tr_msg = tr("The project area is empty.")
             QtWidgets.QMessageBox.critical(self, self.tr("Generate Report"), tr_msg)
             log(message=tr_msg, info=False)
@@ -1181,103 +1300,21 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
         )
 
         if group == PROJECT_INSTANCES_GROUP_NAME:
-            project_folder = os.path.dirname(site_layer.dataProvider().dataSourceUri())
-
-            farmer_map = {}
-
-            for site_feature in site_layer.getFeatures():
-                id = site_feature.id()
-                farmer_id = site_feature[FARMER_ID_FIELD]
-                area = float(site_feature["area (ha)"])
-
-                if farmer_id in farmer_map:
-                    farmer_map[farmer_id]["area"] += area
-                else:
-                    farmer_map[farmer_id] = {}
-                    farmer_map[farmer_id]["id"] = id
-                    farmer_map[farmer_id]["area"] = area
-                    try:
-                        farmer_map[farmer_id]["incep_date"] = site_feature["IncepDate"]
-                    except KeyError:
-                        try:
-                            farmer_map[farmer_id]["incep_date"] = site_feature[
-                                "StartDate"
-                            ]
-                        except KeyError:
-                            log(
-                                f"Key 'StartDate' or 'IncepDate' not found in feature {site_feature.id()}. "
-                            )
-                    farmer_map[farmer_id]["author"] = site_feature["author"]
-                    farmer_map[farmer_id]["project"] = site_feature["project"]
-            log("Farmer map: " + str(len(farmer_map.keys())))
-            self.project_instances = []
-
-            for farmer_id, farmer_map_items in farmer_map.items():
-
-                metadata = ProjectMetadata(
-                    farmer_id=farmer_id,
-                    inception_date=farmer_map_items["incep_date"],
-                    author=farmer_map_items["author"],
-                    project=farmer_map_items["project"],
-                    total_area=f"{farmer_map_items['area']:,.2f}",
-                )
-
-                self.project_instances.append(metadata)
-            log("Project instances: " + str(len(self.project_instances)))
-            tasks = []
-            self.main_task = QgsTask.fromFunction(
-                "Report task", self.main_report_task, on_finished=self.main_report_task
+            # The sites are aggregated in the background, the reports
+            # are submitted once the aggregation has completed.
+            self.aggregation_task = FarmerAggregationTask(site_layer)
+            self.aggregation_task.taskCompleted.connect(
+                lambda: self.on_farmers_aggregated(site_layer, temporal_info)
             )
-            log("Main task created")
-            self.feedback = QgsFeedback()
-
-            self.main_task.progressChanged.connect(self.report_progress_changed)
-            self.main_task.taskTerminated.connect(self.report_terminated)
-            self.project_chunk = 0
-            self.project_dir = project_folder
-
-            for metadata in self.project_instances:
-
-                submit_result = report_manager.generate_site_report(
-                    metadata, project_folder, temporal_info
-                )
-                if not submit_result.success:
-                    self.message_bar.pushWarning(
-                        tr("Report Error"),
-                        tr(
-                            "Unable to submit request "
-                            "for report. See logs for more details."
-                        ),
-                    )
-
-                    return
-
-                last_sub_task = tasks[-1] if tasks else None
-                if last_sub_task:
-                    self.main_task.addSubTask(
-                        submit_result.task,
-                        dependencies=[last_sub_task],
-                        subTaskDependency=QgsTask.ParentDependsOnSubTask,
-                    )
-                else:  # This is the first task so run it without dependencies
-                    self.main_task.addSubTask(submit_result.task)
-                tasks.append(submit_result.task)
-
-            log("Tasks added to main task:" + str(len(tasks)))
-            QgsApplication.taskManager().addTask(self.main_task)
-
-            result = ReportSubmitResult(True, self.feedback, None, self.main_task)
-
-            progress_message = tr(
-                f"Generating {len(self.project_instances)} report(s) ..."
+            self.aggregation_task.taskTerminated.connect(
+                self.on_farmers_aggregation_terminated
             )
-            self.report_progress_dialog = ReportProgressDialog(
-                result, project_folder, True, message=progress_message
+            self.show_task_progress(
+                self.aggregation_task, tr("Aggregating farmer sites")
             )
-            self.report_progress_dialog.setModal(False)
-            # remove the wait cursor
+            self.report_btn.setEnabled(False)
+            QgsApplication.taskManager().addTask(self.aggregation_task)
             self.setCursor(QtCore.Qt.ArrowCursor)
-            self.report_progress_dialog.show()
 
         elif group == SITE_GROUP_NAME:
             message = tr(
@@ -1296,11 +1333,11 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
                 return
 
             # Get capture date and area
-            feature = features[0]
+            feature = first_feature
 
             # If shapefile, some attribute names are truncated
             capture_date = feature["capture_da"]
-            area = feature["area (ha)"]
+            area = format_area(feature[AREA_FIELD])
 
             if self.capture_date is None:
                 self.capture_date = capture_date
@@ -1341,15 +1378,186 @@ class QgisGeaPlugin(QtWidgets.QDockWidget, WidgetUi):
             self.report_progress_dialog.setModal(False)
             self.report_progress_dialog.show()
 
+    def show_task_progress(self, task: QgsTask, message: str):
+        """Shows the progress of a background task in the message bar.
+
+        :param task: Background task.
+        :type task: QgsTask
+
+        :param message: Message shown next to the progress bar.
+        :type message: str
+        """
+        self.message_bar.clearWidgets()
+        progress_bar = QtWidgets.QProgressBar()
+        progress_bar.setRange(0, 100)
+        message_item = self.message_bar.createMessage(message)
+        message_item.layout().addWidget(progress_bar)
+        self.message_bar.pushWidget(message_item, Qgis.Info)
+        task.progressChanged.connect(lambda value: progress_bar.setValue(int(value)))
+
+    def on_farmers_aggregation_terminated(self):
+        """Slot raised when the farmer aggregation has failed or
+        has been cancelled.
+        """
+        self.message_bar.clearWidgets()
+        self.report_btn.setEnabled(True)
+        self.current_project_layer.setSubsetString(self.layer_subset_string)
+        self.show_message(tr("Aggregation of the farmer sites failed."), Qgis.Warning)
+
+    def on_farmers_aggregated(
+        self, site_layer: QgsVectorLayer, temporal_info: MapTemporalInfo
+    ):
+        """Slot raised when the sites of the project instances layer
+        have been aggregated, submits the farmer reports.
+
+        :param site_layer: Project instances layer.
+        :type site_layer: QgsVectorLayer
+
+        :param temporal_info: Datetime range in the map canvas.
+        :type temporal_info: MapTemporalInfo
+        """
+        self.message_bar.clearWidgets()
+        self.report_btn.setEnabled(True)
+
+        project_folder = os.path.dirname(site_layer.dataProvider().dataSourceUri())
+        self.project_instances = self.aggregation_task.farmers
+        log("Project instances: " + str(len(self.project_instances)))
+        tasks = []
+        self.main_task = QgsTask.fromFunction(
+            "Report task", self.main_report_task, on_finished=self.main_report_finished
+        )
+        log("Main task created")
+        self.feedback = QgsFeedback()
+
+        self.main_task.progressChanged.connect(self.report_progress_changed)
+        self.main_task.taskTerminated.connect(self.report_terminated)
+        self.project_chunk = 0
+        self.project_dir = project_folder
+
+        log(
+            f"Generating farmer reports using "
+            f"{report_manager.worker_count()} worker(s)"
+        )
+
+        # Serialize the project once, it is shared by all the reports
+        self.batch_project_path = report_manager.prepare_batch_project(project_folder)
+        if not self.batch_project_path:
+            self.message_bar.pushWarning(
+                tr("Report Error"),
+                tr(
+                    "Unable to prepare the project for the "
+                    "reports. See logs for more details."
+                ),
+            )
+            return
+
+        batch_mode = report_manager.batch_mode()
+        if batch_mode in (ReportBatchMode.ATLAS, ReportBatchMode.ATLAS_COMBINED):
+            # Generate all the farmer reports using one layout atlas
+            submit_result = report_manager.generate_atlas_report(
+                self.project_instances,
+                project_folder,
+                temporal_info,
+                self.batch_project_path,
+                batch_mode == ReportBatchMode.ATLAS_COMBINED,
+            )
+        elif batch_mode == ReportBatchMode.PROCESSES:
+            # Reports are generated by headless QGIS processes, each
+            # one loading the batch project once.
+            submit_result = report_manager.generate_process_batch_report(
+                self.project_instances,
+                project_folder,
+                temporal_info,
+                self.batch_project_path,
+                site_layer.dataProvider().dataSourceUri().split("|")[0],
+            )
+        else:
+            # Reports are created lazily by the batch task, which only
+            # keeps a bounded number of them in memory.
+            submit_result = report_manager.generate_batch_report(
+                iter(self.project_instances),
+                project_folder,
+                temporal_info,
+                self.batch_project_path,
+                len(self.project_instances),
+            )
+
+        if not submit_result.success:
+            self.message_bar.pushWarning(
+                tr("Report Error"),
+                tr("Unable to submit request for report. See logs for more details."),
+            )
+
+            return
+
+        # The reports of all the farmers are queued in the journal of the
+        # reports folder, the report tasks of every batch mode record
+        # the state of each farmer report in it.
+        BatchJournal.for_directory(f"{project_folder}/reports").queue(
+            farmer.farmer_id for farmer in self.project_instances
+        )
+
+        self.main_task.addSubTask(
+            submit_result.task,
+            subTaskDependency=QgsTask.ParentDependsOnSubTask,
+        )
+        tasks.append(submit_result.task)
+
+        self.report_tasks = tasks
+        log("Tasks added to main task:" + str(len(tasks)))
+        QgsApplication.taskManager().addTask(self.main_task)
+
+        result = ReportSubmitResult(True, self.feedback, None, self.main_task)
+
+        progress_message = tr(f"Generating {len(self.project_instances)} report(s) ...")
+        self.report_progress_dialog = ReportProgressDialog(
+            result, project_folder, True, message=progress_message
+        )
+        self.report_progress_dialog.setModal(False)
+        # remove the wait cursor
+        self.setCursor(QtCore.Qt.ArrowCursor)
+        self.report_progress_dialog.show()
+
     def report_progress_changed(self, progress):
         self.feedback.setProgress(progress)
 
     def report_terminated(self):
         self.current_project_layer.setSubsetString(self.layer_subset_string)
 
-    def main_report_task(self, exception, result=None):
+    def main_report_task(self, task: QgsTask):
+        """Function of the main report task, it completes once its
+        report subtasks have completed. It runs in a background thread
+        hence the results are collected in `main_report_finished`.
+
+        :param task: Main report task.
+        :type task: QgsTask
+        """
+        return None
+
+    def main_report_finished(self, exception, result=None):
+        """Slot raised in the main thread when the main report task
+        has finished, summarizes the results of the report tasks.
+
+        :param exception: Exception raised by the task function, if any.
+        :type exception: Exception
+
+        :param result: Value returned by the task function.
+        :type result: typing.Any
+        """
         self.report_progress_dialog._on_report_finished()
         self.current_project_layer.setSubsetString(self.layer_subset_string)
+        report_results = []
+        for task in self.report_tasks:
+            if sip.isdeleted(task):
+                continue
+            if isinstance(task, (BatchReportTask, ProcessBatchReportTask)):
+                report_results.extend(task.results)
+            elif task.result is not None:
+                report_results.append(task.result)
+        log(report_manager.export_summary(report_results))
+        log(f"Report cache statistics: {report_manager.cache_stats()}")
+        report_manager.export_timings(report_results, self.project_dir)
+        self.report_tasks = []
 
     def site_report_finished(self):
         self.current_project_layer.setSubsetString(self.layer_subset_string)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Background aggregation of the project instances by farmer.
+"""
+
+import typing
+
+from qgis.core import QgsFeedback, QgsTask, QgsVectorLayer, QgsVectorLayerFeatureSource
+
+from ..lib.reports.farmers import aggregate_farmer_features, ensure_farmer_id_index
+from ..models.report import ProjectMetadata
+from ..utils import log, tr
+
+
+class FarmerAggregationTask(QgsTask):
+    """Aggregates the sites of the project instances layer by farmer
+    in a background thread.
+
+    The features are read from a snapshot of the layer taken when the
+    task is created, the layer itself is not accessed by the task. The
+    index on the farmer ID field used by the reports is also created
+    by the task, through a separate layer on the same data source.
+    """
+
+    def __init__(self, site_layer: QgsVectorLayer):
+        """
+        :param site_layer: Project instances layer.
+        :type site_layer: QgsVectorLayer
+        """
+        super().__init__(tr("Aggregating farmer sites"))
+        self._source = QgsVectorLayerFeatureSource(site_layer)
+        self._fields = site_layer.fields()
+        self._feature_count = site_layer.featureCount()
+        self._layer_source = site_layer.source()
+        self._provider_type = site_layer.providerType()
+        self._farmers: typing.List[ProjectMetadata] = []
+        self._feedback = QgsFeedback()
+        self._feedback.progressChanged.connect(self.setProgress)
+
+    @property
+    def farmers(self) -> typing.List[ProjectMetadata]:
+        """Gets the metadata of the farmers once the task has completed.
+
+        :returns: Metadata of each farmer, in the order the farmers
+        appear in the layer.
+        :rtype: list
+        """
+        return self._farmers
+
+    def cancel(self):
+        """Cancels the aggregation."""
+        self._feedback.cancel()
+
+        super().cancel()
+
+    def run(self) -> bool:
+        """Aggregates the features of the layer.
+
+        :returns: True if the farmers were aggregated, else False.
+        :rtype: bool
+        """
+        # Only file based layers can be opened again from their source
+        if self._provider_type == "ogr":
+            index_layer = QgsVectorLayer(
+                self._layer_source, "project_instances", self._provider_type
+            )
+            if index_layer.isValid():
+                ensure_farmer_id_index(index_layer)
+
+        self._farmers = aggregate_farmer_features(
+            self._source, self._fields, self._feature_count, self._feedback
+        )
+        log(f"Aggregated {len(self._farmers)} farmer(s).")
+
+        return not self.isCanceled()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Background write of the attributes of the project instances.
+"""
+
+import typing
+
+from qgis.core import (
+    QgsDistanceArea,
+    QgsFeatureRequest,
+    QgsFeedback,
+    QgsTask,
+    QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
+)
+
+from ..definitions.defaults import AREA_FIELD
+from ..lib.area import compute_areas
+from ..utils import log, tr
+
+
+class SiteAttributesTask(QgsTask):
+    """Sets the author, project and area of all the sites of the
+    project instances layer in a background thread.
+
+    The areas are computed from a snapshot of the layer taken when the
+    task is created, then all the values are written with a single
+    change of the attributes through a separate layer opened on the
+    same data source in the task thread, bypassing the edit buffer of
+    the layer. The layer is reloaded once the task has finished and
+    nothing is written if the task is cancelled. The layer should not
+    be edited while the task is running.
+    """
+
+    def __init__(
+        self,
+        layer: QgsVectorLayer,
+        author: str,
+        project: str,
+        distance_area: typing.Optional[QgsDistanceArea] = None,
+    ):
+        """
+        :param layer: File based project instances layer, with the
+        author, project and area fields.
+        :type layer: QgsVectorLayer
+
+        :param author: Author of the sites.
+        :type author: str
+
+        :param project: Project of the sites.
+        :type project: str
+
+        :param distance_area: Area calculator for the CRS of the layer,
+        None to keep the areas of the layer when they have been computed
+        by the import of the layer.
+        :type distance_area: QgsDistanceArea
+        """
+        super().__init__(tr("Saving project instance attributes"))
+        self._layer = layer
+        self._source = QgsVectorLayerFeatureSource(layer)
+        self._layer_source = layer.source()
+        self._provider_type = layer.providerType()
+        self._feature_count = layer.featureCount()
+        self._author = author
+        self._project = project
+        self._distance_area = distance_area
+        self._invalid_count = 0
+        self._error = ""
+
+        # The area computation takes most of the time, the progress of
+        # the write to the data provider is not reported.
+        self._feedback = QgsFeedback()
+        self._feedback.progressChanged.connect(
+            lambda value: self.setProgress(value * 0.9)
+        )
+
+    @property
+    def invalid_count(self) -> int:
+        """Gets the number of sites whose area could not be computed
+        because of an invalid geometry, once the task has completed.
+
+        :returns: Number of sites with an invalid geometry.
+        :rtype: int
+        """
+        return self._invalid_count
+
+    @property
+    def error(self) -> str:
+        """Gets the error of the data provider if the attributes could
+        not be written.
+
+        :returns: Error message or an empty string.
+        :rtype: str
+        """
+        return self._error
+
+    def cancel(self):
+        """Cancels the task, the attributes are not written if the
+        data provider has not been updated yet.
+        """
+        self._feedback.cancel()
+
+        super().cancel()
+
+    def run(self) -> bool:
+        """Computes and writes the attributes of the sites.
+
+        :returns: True if the attributes were written, else False.
+        :rtype: bool
+        """
+        # The data provider of the layer belongs to the main thread
+        layer = QgsVectorLayer(
+            self._layer_source, "project_instances", self._provider_type
+        )
+        if not layer.isValid():
+            self._error = tr("Unable to open the project instances layer.")
+            return False
+
+        provider = layer.dataProvider()
+        fields = provider.fields()
+        author_index, project_index, area_index = (
+            fields.lookupField("author"),
+            fields.lookupField("project"),
+            fields.lookupField(AREA_FIELD),
+        )
+        if -1 in (author_index, project_index, area_index):
+            self._error = tr("The layer is missing the attribute fields.")
+            return False
+
+        attribute_map = {}
+        if self._distance_area is None:
+            request = QgsFeatureRequest()
+            request.setNoAttributes()
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+            for feature in self._source.getFeatures(request):
+                attribute_map[feature.id()] = {
+                    author_index: self._author,
+                    project_index: self._project,
+                }
+        else:
+            areas = compute_areas(
+                self._source, self._distance_area, self._feature_count, self._feedback
+            )
+            for feature_id, area in areas.items():
+                if area is None:
+                    self._invalid_count += 1
+                attribute_map[feature_id] = {
+                    author_index: self._author,
+                    project_index: self._project,
+                    area_index: 0.0 if area is None else area,
+                }
+
+        if self.isCanceled():
+            return False
+
+        if not provider.changeAttributeValues(attribute_map):
+            self._error = "\n".join(provider.errors())
+            log(
+                f"Unable to save the project instance attributes, {self._error}",
+                info=False,
+            )
+            return False
+
+        self.setProgress(100.0)
+        log(f"Saved the attributes of {len(attribute_map)} site(s).")
+
+        return True
+
+    def finished(self, result: bool):
+        """Reloads the layer from its data source once the attributes
+        have been written.
+
+        :param result: Whether the task was successful.
+        :type result: bool
+        """
+        if result:
+            self._layer.reload()
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Background import of the project instances layer.
+"""
+
+import os
+import typing
+
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsFeatureSink,
+    QgsField,
+    QgsFields,
+    QgsRectangle,
+    QgsTask,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+    QgsWkbTypes,
+)
+
+from qgis.PyQt import QtCore
+
+from ..definitions.defaults import AREA_FIELD, FARMER_ID_FIELD, IMPORT_BATCH_SIZE
+from ..lib.area import create_distance_area, geometry_hectares
+from ..lib.reports.farmers import ensure_farmer_id_index
+from ..utils import log, tr
+
+
+class ProjectInstanceImportTask(QgsTask):
+    """Imports a project instances layer, usually a shapefile, in a
+    background thread.
+
+    The layer is validated and copied to a GeoPackage next to it with
+    a spatial index and an index on the farmer ID field, so that the
+    map renders and the report queries only read the features they
+    need. The ellipsoidal area of each site is computed while copying
+    the features and stored in the area field, the extent of the sites
+    is also computed so that the map can be zoomed to the imported
+    layer without reading its features again.
+    """
+
+    def __init__(
+        self,
+        source_path: str,
+        output_path: str,
+        transform_context: QgsCoordinateTransformContext,
+        ellipsoid: str = "",
+    ):
+        """
+        :param source_path: Path of the project instances layer.
+        :type source_path: str
+
+        :param output_path: Path of the GeoPackage to create, it is
+        overwritten if it exists.
+        :type output_path: str
+
+        :param transform_context: Context of the coordinate transforms
+        of the current project.
+        :type transform_context: QgsCoordinateTransformContext
+
+        :param ellipsoid: Ellipsoid of the current project, used for
+        the areas.
+        :type ellipsoid: str
+        """
+        super().__init__(tr("Importing project instances"))
+        self._source_path = source_path
+        self._output_path = output_path
+        self._layer_name = os.path.splitext(os.path.basename(source_path))[0]
+        self._transform_context = transform_context
+        self._ellipsoid = ellipsoid
+        self._extent = QgsRectangle()
+        self._feature_count = 0
+        self._invalid_count = 0
+        self._error = ""
+
+    @property
+    def layer_name(self) -> str:
+        """Gets the name of the imported layer.
+
+        :returns: Name of the layer, which is the name of the source
+        file without its extension.
+        :rtype: str
+        """
+        return self._layer_name
+
+    @property
+    def layer_uri(self) -> str:
+        """Gets the data source of the imported layer.
+
+        :returns: OGR data source of the layer in the GeoPackage.
+        :rtype: str
+        """
+        return f"{self._output_path}|layername={self._layer_name}"
+
+    @property
+    def extent(self) -> QgsRectangle:
+        """Gets the extent of the imported layer in its CRS, once the
+        task has completed.
+
+        :returns: Extent of the layer.
+        :rtype: QgsRectangle
+        """
+        return self._extent
+
+    @property
+    def feature_count(self) -> int:
+        """Gets the number of imported sites.
+
+        :returns: Number of sites.
+        :rtype: int
+        """
+        return self._feature_count
+
+    @property
+    def invalid_count(self) -> int:
+        """Gets the number of sites whose area could not be computed
+        because of an invalid geometry.
+
+        :returns: Number of sites with an invalid geometry.
+        :rtype: int
+        """
+        return self._invalid_count
+
+    @property
+    def error(self) -> str:
+        """Gets the reason why the layer could not be imported.
+
+        :returns: Error message or an empty string.
+        :rtype: str
+        """
+        return self._error
+
+    def _validate(self, source_layer: QgsVectorLayer) -> bool:
+        """Checks that the source layer can be imported and sets the
+        error otherwise.
+        """
+        if not source_layer.isValid():
+            self._error = tr("The selected layer is invalid.")
+            return False
+
+        if QgsWkbTypes.flatType(source_layer.wkbType()) not in (
+            QgsWkbTypes.Polygon,
+            QgsWkbTypes.MultiPolygon,
+        ):
+            self._error = tr("Selected layer doesn't have a polygon geometry type.")
+            return False
+
+        if source_layer.fields().lookupField(FARMER_ID_FIELD) == -1:
+            self._error = tr("Selected layer doesn't have a {} field.").format(
+                FARMER_ID_FIELD
+            )
+            return False
+
+        return True
+
+    @classmethod
+    def _output_fields(cls, source_layer: QgsVectorLayer) -> QgsFields:
+        """Returns the fields of the GeoPackage, the fields of the source
+        layer with a numeric area field.
+        """
+        fields = QgsFields()
+        for field in source_layer.fields():
+            if field.name() == AREA_FIELD:
+                # Earlier versions of the plugin stored the area as text
+                continue
+            if field.name().lower() == "fid":
+                # Reserved for the feature IDs of the GeoPackage
+                continue
+            fields.append(field)
+        fields.append(QgsField(AREA_FIELD, QtCore.QVariant.Double, len=20, prec=2))
+
+        return fields
+
+    def _create_writer(
+        self, source_layer: QgsVectorLayer, fields: QgsFields
+    ) -> typing.Optional[QgsVectorFileWriter]:
+        """Creates the writer of the GeoPackage, the geometries are
+        stored as multi polygons as shapefiles mix both types.
+        """
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "GPKG"
+        options.fileEncoding = "UTF-8"
+        options.layerName = self._layer_name
+        options.layerOptions = ["SPATIAL_INDEX=YES"]
+        options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteFile
+
+        writer = QgsVectorFileWriter.create(
+            self._output_path,
+            fields,
+            QgsWkbTypes.multiType(source_layer.wkbType()),
+            source_layer.crs(),
+            self._transform_context,
+            options,
+        )
+        if writer.hasError() != QgsVectorFileWriter.NoError:
+            self._error = writer.errorMessage()
+            return None
+
+        return writer
+
+    def run(self) -> bool:
+        """Imports the project instances layer.
+
+        :returns: True if the layer was imported, else False.
+        :rtype: bool
+        """
+        source_layer = QgsVectorLayer(self._source_path, self._layer_name, "ogr")
+        if not self._validate(source_layer):
+            log(f"Unable to import {self._source_path}, {self._error}", info=False)
+            return False
+
+        fields = self._output_fields(source_layer)
+        source_indexes = [
+            source_layer.fields().lookupField(field.name()) for field in fields
+        ]
+        writer = self._create_writer(source_layer, fields)
+        if writer is None:
+            log(f"Unable to create {self._output_path}, {self._error}", info=False)
+            return False
+
+        distance_area = create_distance_area(
+            source_layer.crs(), self._transform_context, self._ellipsoid
+        )
+        total_count = max(1, source_layer.featureCount())
+
+        batch = []
+        for source_feature in source_layer.getFeatures():
+            geometry = source_feature.geometry()
+            area = geometry_hectares(geometry, distance_area)
+            if area is None:
+                self._invalid_count += 1
+            if not geometry.isNull():
+                self._extent.combineExtentWith(geometry.boundingBox())
+                geometry.convertToMultiType()
+
+            source_attributes = source_feature.attributes()
+            feature = QgsFeature(fields)
+            feature.setGeometry(geometry)
+            feature.setAttributes(
+                [source_attributes[index] for index in source_indexes[:-1]]
+                + [0.0 if area is None else area]
+            )
+            batch.append(feature)
+
+            if len(batch) < IMPORT_BATCH_SIZE:
+                continue
+
+            if self.isCanceled() or not self._write_batch(writer, batch):
+                break
+            self.setProgress(min(90.0, self._feature_count * 90 / total_count))
+
+        if batch and not self.isCanceled() and not self._error:
+            self._write_batch(writer, batch)
+
+        # Flushes the features and closes the GeoPackage
+        del writer
+
+        if self.isCanceled() or self._error:
+            return False
+
+        layer = QgsVectorLayer(self.layer_uri, self._layer_name, "ogr")
+        if not layer.isValid():
+            self._error = tr("The GeoPackage of the project instances is invalid.")
+            return False
+        ensure_farmer_id_index(layer)
+
+        self.setProgress(100.0)
+        log(
+            f"Imported {self._feature_count} project instance(s) "
+            f"to {self._output_path}."
+        )
+
+        return True
+
+    def _write_batch(
+        self, writer: QgsVectorFileWriter, batch: typing.List[QgsFeature]
+    ) -> bool:
+        """Writes a batch of features to the GeoPackage and clears it.
+
+        :returns: True if the features were written, else False.
+        :rtype: bool
+        """
+        if not writer.addFeatures(batch, QgsFeatureSink.FastInsert):
+            self._error = writer.lastError() or writer.errorMessage()
+            return False
+
+        self._feature_count += len(batch)
+        batch.clear()
+
+        return True
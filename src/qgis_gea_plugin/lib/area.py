@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Ellipsoidal area of the site features.
+"""
+
+import typing
+
+from qgis.core import (
+    QgsAbstractFeatureSource,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsDistanceArea,
+    QgsFeatureRequest,
+    QgsFeatureSource,
+    QgsFeedback,
+    QgsGeometry,
+    QgsUnitTypes,
+)
+
+from ..definitions.defaults import DEFAULT_AREA_ELLIPSOID
+
+
+def create_distance_area(
+    crs: QgsCoordinateReferenceSystem,
+    transform_context: QgsCoordinateTransformContext,
+    ellipsoid: str = "",
+) -> QgsDistanceArea:
+    """Creates the calculator of the ellipsoidal areas of the geometries
+    in the given CRS.
+
+    :param crs: CRS of the geometries.
+    :type crs: QgsCoordinateReferenceSystem
+
+    :param transform_context: Context of the coordinate transforms,
+    usually the one of the current project.
+    :type transform_context: QgsCoordinateTransformContext
+
+    :param ellipsoid: Acronym or authority ID of the ellipsoid. The
+    WGS 84 ellipsoid is used if it is empty or if the ellipsoidal
+    calculations are disabled ("NONE") as the areas are always
+    ellipsoidal.
+    :type ellipsoid: str
+
+    :returns: Area calculator.
+    :rtype: QgsDistanceArea
+    """
+    if not ellipsoid or ellipsoid == "NONE":
+        ellipsoid = DEFAULT_AREA_ELLIPSOID
+
+    distance_area = QgsDistanceArea()
+    distance_area.setSourceCrs(crs, transform_context)
+    if not distance_area.setEllipsoid(ellipsoid):
+        distance_area.setEllipsoid(DEFAULT_AREA_ELLIPSOID)
+
+    return distance_area
+
+
+def geometry_hectares(
+    geometry: QgsGeometry, distance_area: QgsDistanceArea
+) -> typing.Optional[float]:
+    """Computes the ellipsoidal area of a geometry in hectares.
+
+    :param geometry: Geometry whose area is to be computed.
+    :type geometry: QgsGeometry
+
+    :param distance_area: Area calculator created by
+    `create_distance_area` for the CRS of the geometry.
+    :type distance_area: QgsDistanceArea
+
+    :returns: Area of the geometry in hectares or None if the geometry
+    is empty or invalid.
+    :rtype: float
+    """
+    if geometry is None or geometry.isEmpty() or not geometry.isGeosValid():
+        return None
+
+    return distance_area.convertAreaMeasurement(
+        distance_area.measureArea(geometry), QgsUnitTypes.AreaHectares
+    )
+
+
+def compute_areas(
+    source: typing.Union[QgsFeatureSource, QgsAbstractFeatureSource],
+    distance_area: QgsDistanceArea,
+    feature_count: int = 0,
+    feedback: typing.Optional[QgsFeedback] = None,
+) -> typing.Dict[int, typing.Optional[float]]:
+    """Computes the ellipsoidal areas of all the features of a source
+    in a single pass, only the geometries are read.
+
+    The source can be a layer or a snapshot of a layer, in which case
+    the areas can be computed in a background thread.
+
+    :param source: Source of the features.
+    :type source: QgsFeatureSource
+
+    :param distance_area: Area calculator created by
+    `create_distance_area` for the CRS of the source.
+    :type distance_area: QgsDistanceArea
+
+    :param feature_count: Number of features in the source, used to
+    report the progress.
+    :type feature_count: int
+
+    :param feedback: Feedback used to report the progress and cancel
+    the computation.
+    :type feedback: QgsFeedback
+
+    :returns: Area in hectares (value) of each feature (key), the area
+    is None for the features with an empty or invalid geometry. Returns
+    an empty dictionary if cancelled.
+    :rtype: dict
+    """
+    request = QgsFeatureRequest()
+    request.setNoAttributes()
+    if feedback is not None:
+        request.setFeedback(feedback)
+
+    areas = {}
+    progress_step = max(1, feature_count // 100)
+
+    for index, feature in enumerate(source.getFeatures(request)):
+        if feedback is not None and index % progress_step == 0:
+            if feedback.isCanceled():
+                return {}
+            if feature_count:
+                feedback.setProgress(min(100.0, index * 100 / feature_count))
+
+        areas[feature.id()] = geometry_hectares(feature.geometry(), distance_area)
+
+    if feedback is not None and feedback.isCanceled():
+        return {}
+
+    return areas
+
+
+def area_value(value: typing.Any) -> float:
+    """Returns the area stored in a site feature as a number.
+
+    The areas are stored in a numeric field, the layers created by
+    earlier versions of the plugin store them as text formatted with
+    thousands separators.
+
+    :param value: Value of the area field.
+    :type value: typing.Any
+
+    :returns: Area in hectares, zero if the value is not set.
+    :rtype: float
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    if value is None or not str(value).strip():
+        return 0.0
+
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        # NULL values of the layer
+        return 0.0
+
+
+def format_area(value: typing.Optional[float]) -> str:
+    """Formats an area for display in the reports.
+
+    :param value: Area in hectares.
+    :type value: float
+
+    :returns: Area with two decimals and thousands separators.
+    :rtype: str
+    """
+    return f"{area_value(value):,.2f}"
@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+"""
+Atlas-driven generator of the project instance (farmer) reports.
+"""
+
+import collections
+import hashlib
+import os
+import time
+import typing
+
+from qgis.core import (
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsLayoutExporter,
+    QgsLayoutItemMap,
+    QgsLayoutObject,
+    QgsMemoryProviderUtils,
+    QgsPalLayerSettings,
+    QgsProperty,
+    QgsRuleBasedLabeling,
+    QgsRuleBasedRenderer,
+    QgsVectorLayer,
+    QgsVectorLayerSimpleLabeling,
+    QgsWkbTypes,
+)
+
+from qgis.PyQt import QtCore
+from qgis.PyQt.QtCore import QVariant
+
+from .generator import SiteReportReportGeneratorTask, split_farmer_id
+from .journal import BatchJournal
+from .manifest import ReportManifest
+from ...definitions.defaults import (
+    ADMIN_AREAS_GROUP_NAME,
+    ATLAS_COMBINED_REPORT_NAME,
+    DETAILED_ZOOM_OUT_FACTOR,
+    FARMER_ID_FIELD,
+    OVERVIEW_ZOOM_OUT_FACTOR,
+    PARTIAL_PDF_SUFFIX,
+    PROJECT_INSTANCE_STYLE,
+    STAGE_PDF_EXPORT,
+)
+from ...models.report import ProjectMetadata, ReportOutputResult, SiteReportContext
+from ...utils import (
+    clean_filename,
+    commit_partial_pdf,
+    FileUtils,
+    log,
+    partial_pdf_path,
+    tr,
+)
+
+
+class ProjectInstanceAtlasTask(SiteReportReportGeneratorTask):
+    """Generates the reports of several farmers using one project
+    and one layout whose atlas is driven by a FarmerID coverage layer.
+
+    The reports can either be exported to one combined PDF or to one
+    PDF per farmer, named as the reports of the per-farmer tasks. In
+    the latter case, only the reports whose inputs have changed are
+    exported.
+
+    The state of each farmer report is recorded in the batch journal,
+    the report of a farmer without sites or whose PDF could not be
+    written is recorded as failed without affecting the other farmers.
+    """
+
+    def __init__(
+        self,
+        context: SiteReportContext,
+        farmers: typing.List[ProjectMetadata],
+        combined: bool = False,
+        journal: typing.Optional[BatchJournal] = None,
+    ):
+        super().__init__(context)
+        self._farmers = farmers
+        self._combined = combined
+        self._coverage_layer = None
+        self._exported_count = 0
+        self._journal = journal or BatchJournal.for_directory(context.report_dir)
+        # IDs of the farmers whose reports were up to date, were
+        # exported by the atlas and the errors specific to a farmer.
+        self._current_farmer_ids: typing.Set[str] = set()
+        self._exported_farmer_ids: typing.Set[str] = set()
+        self._farmer_errors: typing.Dict[str, typing.List[str]] = {}
+        self.report_name = (
+            ATLAS_COMBINED_REPORT_NAME
+            if combined
+            else f"{len(farmers)} {tr('farmer reports')}"
+        )
+
+        self.setDescription(f"{tr('Generating atlas for')}: {self.report_name}")
+
+    @property
+    def exported_count(self) -> int:
+        """Gets the number of farmer pages exported by the atlas.
+
+        :returns: Number of exported farmer pages.
+        :rtype: int
+        """
+        return self._exported_count
+
+    @classmethod
+    def farmer_report_name(cls, metadata: ProjectMetadata) -> str:
+        """Returns the name of the report of the given farmer, which is
+        consistent with the one used by the per-farmer report tasks.
+
+        :param metadata: Metadata of the farmer.
+        :type metadata: ProjectMetadata
+
+        :returns: Name of the farmer report.
+        :rtype: str
+        """
+        return f"Farmer ID {metadata.farmer_id}"
+
+    def _generate_report(self) -> bool:
+        """Generates the farmer reports using the layout atlas and
+        records the state of each farmer report in the journal.
+
+        :returns: Returns True if the process succeeded, else False.
+        :rtype: bool
+        """
+        start_time = time.perf_counter()
+        success = self._generate_atlas()
+        self._journal_farmers(time.perf_counter() - start_time)
+
+        return success
+
+    def _generate_atlas(self) -> bool:
+        """Generates the farmer reports using the layout atlas.
+
+        :returns: Returns True if the process succeeded, else False.
+        :rtype: bool
+        """
+        log(f"Starting atlas generation for {len(self._farmers)} farmer(s)...")
+        if self._check_feedback_cancelled_or_set_progress(0):
+            return False
+
+        with self._profiler.span("set_project"):
+            self._set_project()
+        if self._project is None:
+            return False
+
+        with self._profiler.span("set_layers"):
+            self._set_site_layer()
+            self._set_landscape_layer()
+            self._set_2015_layer()
+
+        if self._site_layer is None:
+            tr_msg = tr("Project layer not found or shapefile is invalid")
+            self._error_messages.append(tr_msg)
+            return False
+
+        if self._check_feedback_cancelled_or_set_progress(20):
+            return False
+
+        manifest = ReportManifest.for_directory(self._context.report_dir)
+        fingerprints = {}
+        with self._profiler.span("fingerprint"):
+            farmer_geometries = self._farmer_geometries()
+            for metadata in self._farmers:
+                report_name = (
+                    ATLAS_COMBINED_REPORT_NAME
+                    if self._combined
+                    else self.farmer_report_name(metadata)
+                )
+                fingerprints[metadata.farmer_id] = self._compute_fingerprint(
+                    report_name,
+                    metadata,
+                    farmer_geometries.get(metadata.farmer_id, []),
+                )
+
+        if self._combined:
+            pdf_path = self._pdf_path(ATLAS_COMBINED_REPORT_NAME)
+            combined_fingerprint = self._combined_fingerprint(fingerprints)
+            if manifest.is_current(
+                ATLAS_COMBINED_REPORT_NAME, combined_fingerprint, pdf_path
+            ):
+                log(f"PDF file {pdf_path} is up to date, skipping generation.")
+                self._current_farmer_ids = {
+                    str(metadata.farmer_id) for metadata in self._farmers
+                }
+                self._set_result()
+                return True
+            stale_farmers = list(self._farmers)
+        else:
+            stale_farmers = [
+                metadata
+                for metadata in self._farmers
+                if not manifest.is_current(
+                    self.farmer_report_name(metadata),
+                    fingerprints[metadata.farmer_id],
+                    self._pdf_path(self.farmer_report_name(metadata)),
+                )
+            ]
+            log(f"{len(stale_farmers)} farmer report(s) need to be generated.")
+            stale_ids = {str(metadata.farmer_id) for metadata in stale_farmers}
+            self._current_farmer_ids = {
+                str(metadata.farmer_id)
+                for metadata in self._farmers
+                if str(metadata.farmer_id) not in stale_ids
+            }
+            if not stale_farmers:
+                self._set_result()
+                return True
+
+        for metadata in stale_farmers:
+            self._journal.start(metadata.farmer_id)
+
+        with self._profiler.span("create_coverage_layer"):
+            self._coverage_layer = self._create_coverage_layer(
+                stale_farmers, farmer_geometries
+            )
+        self._project.addMapLayer(self._coverage_layer, False)
+        try:
+            with self._profiler.span("load_template"):
+                if not self._load_template() or self._layout is None:
+                    return False
+
+            if self._check_feedback_cancelled_or_set_progress(35):
+                return False
+
+            with self._profiler.span("configure_atlas"):
+                self._set_metadata_values()
+                self._configure_map_items_zoom_level()
+                self._configure_atlas()
+
+            if self._check_feedback_cancelled_or_set_progress(50):
+                return False
+
+            with self._profiler.span("export_pdf"):
+                if not self._export_atlas():
+                    return False
+        finally:
+            self._layout = None
+            self._project.removeMapLayer(self._coverage_layer.id())
+            self._coverage_layer = None
+
+        if self._combined:
+            manifest.update(ATLAS_COMBINED_REPORT_NAME, combined_fingerprint, pdf_path)
+        else:
+            for metadata in stale_farmers:
+                if str(metadata.farmer_id) not in self._exported_farmer_ids:
+                    continue
+                report_name = self.farmer_report_name(metadata)
+                manifest.update(
+                    report_name,
+                    fingerprints[metadata.farmer_id],
+                    self._pdf_path(report_name),
+                )
+
+        if self._check_feedback_cancelled_or_set_progress(100):
+            return False
+
+        self._set_result()
+        log("Atlas generation completed successfully.")
+
+        return True
+
+    def _journal_farmers(self, duration: float):
+        """Records the outcome of the report of each farmer in the
+        journal.
+
+        The duration of the atlas run is shared equally by the farmers
+        whose reports were not up to date.
+
+        :param duration: Duration of the atlas run, in seconds.
+        :type duration: float
+        """
+        farmer_specific_errors = {
+            error for errors in self._farmer_errors.values() for error in errors
+        }
+        errors = [
+            error
+            for error in self._error_messages
+            if error not in farmer_specific_errors
+        ]
+        farmer_duration = duration / max(
+            1, len(self._farmers) - len(self._current_farmer_ids)
+        )
+        for metadata in self._farmers:
+            farmer_id = str(metadata.farmer_id)
+            if farmer_id in self._current_farmer_ids:
+                self._journal.finish(metadata.farmer_id, True, 0.0)
+            elif farmer_id in self._farmer_errors:
+                self._journal.finish(
+                    metadata.farmer_id,
+                    False,
+                    farmer_duration,
+                    self._farmer_errors[farmer_id],
+                )
+            else:
+                self._journal.finish(
+                    metadata.farmer_id,
+                    farmer_id in self._exported_farmer_ids,
+                    farmer_duration,
+                    errors,
+                )
+
+    def _set_result(self):
+        """Sets the successful result of the atlas generation."""
+        self._result = ReportOutputResult(
+            True,
+            self._context.report_dir,
+            self.report_name,
+            tuple(self._error_messages),
+            self._export_duration,
+            self._pdf_size,
+            self._profiler.timings(),
+        )
+
+    def _pdf_path(self, report_name: str) -> str:
+        """Returns the path of the PDF file of the given report."""
+        return f"{self._context.report_dir}/{clean_filename(report_name)}.pdf"
+
+    def _combined_fingerprint(self, fingerprints: typing.Dict[str, str]) -> str:
+        """Returns the fingerprint of the combined report of the farmers."""
+        hasher = hashlib.sha256()
+        for metadata in self._farmers:
+            hasher.update(fingerprints[metadata.farmer_id].encode("utf-8"))
+
+        return hasher.hexdigest()
+
+    def _set_site_layer(self):
+        """Sets the project instances layer, which is rendered for all
+        the farmers but only shows the features of the current atlas
+        farmer.
+        """
+        site_layer = self._find_site_layer()
+        if site_layer is None:
+            return
+
+        # The layer may have been filtered by a previous report
+        site_layer.setSubsetString("")
+        style_file = FileUtils.style_file_path(PROJECT_INSTANCE_STYLE)
+        site_layer.loadNamedStyle(style_file)
+        _filter_to_atlas_farmer(site_layer)
+
+        self._site_layer = site_layer
+
+    def _farmer_geometries(self) -> typing.Dict[str, typing.List[QgsGeometry]]:
+        """Reads the geometries of the site features of each farmer in
+        one pass over the project instances layer.
+
+        :returns: Geometries (value) indexed by the farmer ID (key).
+        :rtype: dict
+        """
+        farmer_ids = {metadata.farmer_id for metadata in self._farmers}
+        geometries = collections.defaultdict(list)
+        request = QgsFeatureRequest()
+        request.setSubsetOfAttributes([FARMER_ID_FIELD], self._site_layer.fields())
+        for feature in self._site_layer.getFeatures(request):
+            farmer_id = feature[FARMER_ID_FIELD]
+            if farmer_id in farmer_ids:
+                geometries[farmer_id].append(feature.geometry())
+
+        return geometries
+
+    def _create_coverage_layer(
+        self,
+        farmers: typing.List[ProjectMetadata],
+        farmer_geometries: typing.Dict[str, typing.List[QgsGeometry]],
+    ) -> QgsVectorLayer:
+        """Creates the atlas coverage layer with one feature per farmer.
+
+        :param farmers: Farmers to include in the atlas.
+        :type farmers: list
+
+        :param farmer_geometries: Site geometries of each farmer.
+        :type farmer_geometries: dict
+
+        :returns: Memory layer with the farmer metadata and the
+        collected geometry of the farmer sites.
+        :rtype: QgsVectorLayer
+        """
+        fields = QgsFields()
+        for name in (
+            FARMER_ID_FIELD,
+            "farmer_name",
+            "farmer_number",
+            "file_name",
+            "author",
+            "project",
+            "inception_date",
+            "total_area",
+        ):
+            fields.append(QgsField(name, QVariant.String))
+
+        coverage_layer = QgsMemoryProviderUtils.createMemoryLayer(
+            "farmer_coverage",
+            fields,
+            QgsWkbTypes.multiType(self._site_layer.wkbType()),
+            self._site_layer.crs(),
+        )
+
+        features = []
+        for metadata in farmers:
+            geometries = farmer_geometries.get(metadata.farmer_id, [])
+            if not geometries:
+                tr_msg = tr("No site features found for farmer")
+                error = f"{tr_msg} {metadata.farmer_id}"
+                self._error_messages.append(error)
+                self._farmer_errors[str(metadata.farmer_id)] = [error]
+                continue
+
+            inception_date = metadata.inception_date
+            if isinstance(inception_date, QtCore.QDate):
+                inception_date = inception_date.toString("yyyy-MM-dd")
+
+            farmer_name, farmer_number = split_farmer_id(metadata.farmer_id)
+            feature = QgsFeature(fields)
+            feature.setGeometry(QgsGeometry.collectGeometry(geometries))
+            feature.setAttributes(
+                [
+                    metadata.farmer_id,
+                    farmer_name,
+                    farmer_number,
+                    clean_filename(self.farmer_report_name(metadata)),
+                    metadata.author,
+                    metadata.project,
+                    str(inception_date) if inception_date else "",
+                    f"{metadata.total_area} ha" if metadata.total_area else "",
+                ]
+            )
+            features.append(feature)
+
+        coverage_layer.dataProvider().addFeatures(features)
+        coverage_layer.updateExtents()
+
+        return coverage_layer
+
+    def _set_metadata_values(self):
+        """Sets the report labels to the attributes of the current
+        atlas farmer.
+        """
+        for label_id, field_name in (
+            ("farmer_id_label", "farmer_name"),
+            ("farmer_number_label", "farmer_number"),
+            ("report_author_label", "author"),
+            ("project_label", "project"),
+            ("inception_date_label", "inception_date"),
+            ("area_label", "total_area"),
+        ):
+            self.set_label_value(label_id, f'[% "{field_name}" %]')
+
+        # Hide the number box for farmer IDs without a number
+        number_label = self._layout.itemById("farmer_number_label")
+        if number_label is not None:
+            number_label.dataDefinedProperties().setProperty(
+                QgsLayoutObject.ExcludeFromExports,
+                QgsProperty.fromExpression("coalesce(\"farmer_number\", '') = ''"),
+            )
+
+    def _configure_atlas(self):
+        """Enables the layout atlas and lets the map items follow the
+        current atlas farmer.
+        """
+        atlas = self._layout.atlas()
+        atlas.setCoverageLayer(self._coverage_layer)
+        atlas.setHideCoverage(True)
+        atlas.setPageNameExpression(f'"{FARMER_ID_FIELD}"')
+        atlas.setFilenameExpression('"file_name"')
+        atlas.setEnabled(True)
+
+        # The overview map shows the extent of the admin areas, if
+        # available, for all the farmers.
+        has_admin_layer = (
+            self._layer_index.first_layer_in_group(ADMIN_AREAS_GROUP_NAME) is not None
+        )
+        for item in self._layout.items():
+            if not isinstance(item, QgsLayoutItemMap):
+                continue
+
+            if item.id() == "site_location_overview_map":
+                if has_admin_layer:
+                    continue
+                margin = OVERVIEW_ZOOM_OUT_FACTOR - 1
+            else:
+                margin = DETAILED_ZOOM_OUT_FACTOR - 1
+
+            item.setAtlasDriven(True)
+            item.setAtlasScalingMode(QgsLayoutItemMap.Auto)
+            item.setAtlasMargin(margin)
+
+    def _export_atlas(self) -> bool:
+        """Exports the atlas to one combined PDF or to one PDF per
+        farmer.
+
+        :returns: True if the atlas was successfully exported,
+        else False.
+        :rtype: bool
+        """
+        atlas = self._layout.atlas()
+        settings = self._pdf_export_settings()
+        self._stage_counts[STAGE_PDF_EXPORT] += 1
+
+        # The PDFs are written to partial files and then renamed so that
+        # an interrupted export never leaves incomplete reports.
+        start_time = time.perf_counter()
+        if self._combined:
+            output_path = self._pdf_path(ATLAS_COMBINED_REPORT_NAME)
+            result, error = QgsLayoutExporter.exportToPdf(
+                atlas, partial_pdf_path(output_path), settings
+            )
+            farmer_paths = {
+                str(feature[FARMER_ID_FIELD]): output_path
+                for feature in self._coverage_layer.getFeatures()
+            }
+            output_paths = [output_path]
+        else:
+            # The file name is evaluated for each farmer, only the
+            # directory of the base path is used.
+            output_path = os.path.join(self._context.report_dir, "atlas.pdf")
+            atlas.setFilenameExpression(f"\"file_name\" || '{PARTIAL_PDF_SUFFIX}'")
+            result, error = QgsLayoutExporter.exportToPdfs(atlas, output_path, settings)
+            atlas.setFilenameExpression('"file_name"')
+            report_dir = self._context.report_dir
+            farmer_paths = {
+                str(
+                    feature[FARMER_ID_FIELD]
+                ): f"{report_dir}/{feature['file_name']}.pdf"
+                for feature in self._coverage_layer.getFeatures()
+            }
+            output_paths = list(farmer_paths.values())
+
+        if result != QgsLayoutExporter.ExportResult.Success:
+            tr_msg = tr("Could not export the farmer reports to PDF")
+            self._error_messages.append(f"{tr_msg}: {error}")
+            return False
+
+        committed_paths = {path for path in output_paths if commit_partial_pdf(path)}
+        self._exported_farmer_ids = {
+            farmer_id
+            for farmer_id, path in farmer_paths.items()
+            if path in committed_paths
+        }
+        if len(committed_paths) != len(output_paths):
+            self._error_messages.append(
+                tr("Could not move the exported farmer reports to the reports folder")
+            )
+            return False
+
+        self._export_duration = time.perf_counter() - start_time
+        self._exported_count = self._coverage_layer.featureCount()
+        self._pdf_size = sum(
+            os.path.getsize(path) for path in output_paths if os.path.exists(path)
+        )
+        log(
+            f"Exported {self._exported_count} farmer page(s) using the "
+            f"'{self._context.export_profile.value}' profile in "
+            f"{self._export_duration:.2f}s, {self._pdf_size} bytes"
+        )
+
+        return True
+
+
+def _filter_to_atlas_farmer(layer: QgsVectorLayer):
+    """Restricts the rendering and labeling of the layer to the features
+    of the current atlas farmer.
+
+    :param layer: Project instances layer.
+    :type layer: QgsVectorLayer
+    """
+    expression = (
+        f"\"{FARMER_ID_FIELD}\" = attribute(@atlas_feature, '{FARMER_ID_FIELD}')"
+    )
+
+    renderer = QgsRuleBasedRenderer.convertFromRenderer(layer.renderer())
+    if renderer is not None:
+        for rule in renderer.rootRule().children():
+            filter_expression = rule.filterExpression()
+            rule.setFilterExpression(
+                f"({filter_expression}) AND {expression}"
+                if filter_expression
+                else expression
+            )
+        layer.setRenderer(renderer)
+
+    labeling = layer.labeling()
+    if isinstance(labeling, QgsVectorLayerSimpleLabeling):
+        label_rule = QgsRuleBasedLabeling.Rule(QgsPalLayerSettings(labeling.settings()))
+        label_rule.setFilterExpression(expression)
+        root_rule = QgsRuleBasedLabeling.Rule(None)
+        root_rule.appendChild(label_rule)
+        layer.setLabeling(QgsRuleBasedLabeling(root_rule))
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of the rendered background layers of the report map items.
+"""
+
+import collections
+import hashlib
+import math
+import os
+import threading
+import typing
+from xml.sax.saxutils import escape
+
+from qgis.core import (
+    QgsBilinearRasterResampler,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsFeedback,
+    QgsMapLayer,
+    QgsMapLayerStyle,
+    QgsMapRendererCustomPainterJob,
+    QgsMapSettings,
+    QgsRasterLayer,
+    QgsRectangle,
+)
+
+from qgis.PyQt import QtCore, QtGui
+
+from ...definitions.defaults import (
+    BASEMAP_DISK_CACHE_SIZE,
+    BASEMAP_MAX_TILES,
+    BASEMAP_MEMORY_CACHE_TILES,
+    BASEMAP_TILE_SIZE,
+)
+from ...utils import log
+
+
+def layer_signature(layer: QgsMapLayer) -> str:
+    """Computes a signature of the layer which changes when the
+    rendered output of the layer could change.
+
+    :param layer: Map layer.
+    :type layer: QgsMapLayer
+
+    :returns: Signature based on the layer source, style and, for
+    local files, the modification time of the file.
+    :rtype: str
+    """
+    style = QgsMapLayerStyle()
+    style.readFromLayer(layer)
+    hasher = hashlib.sha256()
+    hasher.update(f"{layer.id()}|{layer.source()}|{layer.opacity()}".encode("utf-8"))
+    hasher.update(style.xmlData().encode("utf-8"))
+
+    source_path = layer.source().split("|")[0]
+    if os.path.isfile(source_path):
+        hasher.update(str(os.path.getmtime(source_path)).encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+class BasemapCache:
+    """Two-tier cache of rendered basemap tiles.
+
+    Background layers are rendered in fixed size tiles aligned to a
+    grid whose resolution is snapped to a power of two map units per
+    pixel, so that the map items of neighbouring sites reuse the same
+    tiles. Tiles are kept in a memory tier and in a disk tier, both
+    evicting the least recently used tiles when full. The tiles
+    covering a map item are then composed into a georeferenced image
+    that replaces the background layers in the map item.
+    """
+
+    def __init__(
+        self,
+        memory_tiles: int = BASEMAP_MEMORY_CACHE_TILES,
+        disk_size: int = BASEMAP_DISK_CACHE_SIZE,
+    ):
+        self._lock = threading.Lock()
+        self._memory_tiles = memory_tiles
+        self._disk_size = disk_size
+
+        # Tile image (value) indexed by the tile key (key), ordered from
+        # the least to the most recently used.
+        self._memory: typing.OrderedDict[str, QtGui.QImage] = collections.OrderedDict()
+
+        # Size of the tile files (value) indexed by file path (key) for
+        # each cache directory, ordered from the least to the most
+        # recently used.
+        self._disk: typing.Dict[str, typing.OrderedDict[str, int]] = {}
+
+        self._stats = collections.Counter()
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        """Gets the number of tiles read from memory, read from disk
+        and rendered.
+
+        :returns: Number of memory hits, disk hits and rendered tiles.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "memory_hits": self._stats["memory_hits"],
+                "disk_hits": self._stats["disk_hits"],
+                "renders": self._stats["renders"],
+            }
+
+    def clear(self):
+        """Removes all the tiles in the memory tier."""
+        with self._lock:
+            self._memory.clear()
+            self._stats.clear()
+
+    def _disk_index(self, cache_dir: str) -> typing.OrderedDict[str, int]:
+        """Returns the index of the tile files in the cache directory.
+        Should be called while holding the lock.
+        """
+        index = self._disk.get(cache_dir)
+        if index is not None:
+            return index
+
+        entries = []
+        if os.path.isdir(cache_dir):
+            with os.scandir(cache_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(".png"):
+                        stat = entry.stat()
+                        entries.append((stat.st_atime, entry.path, stat.st_size))
+
+        index = collections.OrderedDict(
+            (path, size) for _, path, size in sorted(entries)
+        )
+        self._disk[cache_dir] = index
+
+        return index
+
+    def _get(self, key: str, cache_dir: str) -> typing.Optional[QtGui.QImage]:
+        """Gets the tile image from the memory or disk tier."""
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return image
+
+            tile_path = os.path.join(cache_dir, f"{key}.png")
+            index = self._disk_index(cache_dir)
+            if tile_path not in index:
+                return None
+            index.move_to_end(tile_path)
+
+        image = QtGui.QImage(tile_path)
+        if image.isNull():
+            with self._lock:
+                _ = self._disk_index(cache_dir).pop(tile_path, None)
+            return None
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._add_to_memory(key, image)
+
+        return image
+
+    def _add_to_memory(self, key: str, image: QtGui.QImage):
+        """Adds the tile to the memory tier. Should be called while
+        holding the lock.
+        """
+        self._memory[key] = image
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_tiles:
+            _ = self._memory.popitem(last=False)
+
+    def _put(self, key: str, image: QtGui.QImage, cache_dir: str):
+        """Adds the rendered tile to the memory and disk tiers."""
+        tile_path = os.path.join(cache_dir, f"{key}.png")
+        os.makedirs(cache_dir, exist_ok=True)
+        saved = image.save(tile_path, "PNG")
+
+        with self._lock:
+            self._add_to_memory(key, image)
+            if not saved:
+                log(f"Unable to save basemap tile {tile_path}", info=False)
+                return
+
+            index = self._disk_index(cache_dir)
+            index[tile_path] = os.path.getsize(tile_path)
+            index.move_to_end(tile_path)
+
+            disk_usage = sum(index.values())
+            while disk_usage > self._disk_size and len(index) > 1:
+                evicted_path, size = index.popitem(last=False)
+                disk_usage -= size
+                try:
+                    os.remove(evicted_path)
+                except OSError:
+                    pass
+
+    def _render_tile(
+        self,
+        layers: typing.List[QgsMapLayer],
+        extent: QgsRectangle,
+        dpi: float,
+        crs: QgsCoordinateReferenceSystem,
+        transform_context: QgsCoordinateTransformContext,
+    ) -> QtGui.QImage:
+        """Renders the layers in the given tile extent.
+
+        The tile is rendered synchronously in the calling thread, which
+        can be a plain Python thread without a Qt event loop. A
+        cancelled report stops before rendering the next tile.
+        """
+        settings = QgsMapSettings()
+        settings.setLayers(layers)
+        settings.setDestinationCrs(crs)
+        settings.setTransformContext(transform_context)
+        settings.setExtent(extent)
+        settings.setOutputSize(QtCore.QSize(BASEMAP_TILE_SIZE, BASEMAP_TILE_SIZE))
+        settings.setOutputDpi(dpi)
+        settings.setBackgroundColor(QtGui.QColor(0, 0, 0, 0))
+        settings.setFlag(QgsMapSettings.Antialiasing, True)
+
+        image = QtGui.QImage(
+            BASEMAP_TILE_SIZE,
+            BASEMAP_TILE_SIZE,
+            QtGui.QImage.Format_ARGB32_Premultiplied,
+        )
+        image.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(image)
+        try:
+            job = QgsMapRendererCustomPainterJob(settings, painter)
+            job.renderSynchronously()
+        finally:
+            painter.end()
+
+        with self._lock:
+            self._stats["renders"] += 1
+
+        return image
+
+    def basemap_layer(
+        self,
+        layers: typing.List[QgsMapLayer],
+        extent: QgsRectangle,
+        width: int,
+        height: int,
+        dpi: float,
+        crs: QgsCoordinateReferenceSystem,
+        transform_context: QgsCoordinateTransformContext,
+        cache_dir: str,
+        output_path: str,
+        feedback: typing.Optional[QgsFeedback] = None,
+    ) -> typing.Optional[QgsRasterLayer]:
+        """Creates a raster layer with the rendered layers covering the
+        given extent, using the cached tiles where available.
+
+        :param layers: Background layers, from top to bottom.
+        :type layers: list
+
+        :param extent: Extent of the map item in the given CRS.
+        :type extent: QgsRectangle
+
+        :param width: Width of the map item in pixels.
+        :type width: int
+
+        :param height: Height of the map item in pixels.
+        :type height: int
+
+        :param dpi: Resolution used to render the layers.
+        :type dpi: float
+
+        :param crs: CRS of the map item.
+        :type crs: QgsCoordinateReferenceSystem
+
+        :param transform_context: Transform context of the project.
+        :type transform_context: QgsCoordinateTransformContext
+
+        :param cache_dir: Directory of the disk tier.
+        :type cache_dir: str
+
+        :param output_path: Path of the PNG file to write the composed
+        basemap to.
+        :type output_path: str
+
+        :param feedback: Feedback of the report, no more tiles are
+        rendered once it is cancelled.
+        :type feedback: QgsFeedback
+
+        :returns: Raster layer of the composed basemap or None if the
+        basemap could not be created, in which case the layers should
+        be rendered directly, or if the feedback was cancelled.
+        :rtype: QgsRasterLayer
+        """
+        if not layers or extent.isEmpty() or width <= 0 or height <= 0:
+            return None
+
+        # Snap to the next finer resolution level so that the tiles are
+        # never upsampled in the map item.
+        map_units_per_pixel = min(extent.width() / width, extent.height() / height)
+        resolution = 2.0 ** math.floor(math.log2(map_units_per_pixel))
+        span = resolution * BASEMAP_TILE_SIZE
+        min_col = math.floor(extent.xMinimum() / span)
+        max_col = max(min_col, math.ceil(extent.xMaximum() / span) - 1)
+        min_row = math.floor(extent.yMinimum() / span)
+        max_row = max(min_row, math.ceil(extent.yMaximum() / span) - 1)
+        columns = max_col - min_col + 1
+        rows = max_row - min_row + 1
+        if columns * rows > BASEMAP_MAX_TILES:
+            log(
+                f"Basemap requires {columns * rows} tiles, "
+                f"rendering the layers directly."
+            )
+            return None
+
+        hasher = hashlib.sha256()
+        for layer in layers:
+            hasher.update(layer_signature(layer).encode("utf-8"))
+        hasher.update(f"{crs.toWkt()}|{dpi}|{BASEMAP_TILE_SIZE}".encode("utf-8"))
+        layers_key = hasher.hexdigest()
+
+        mosaic = QtGui.QImage(
+            columns * BASEMAP_TILE_SIZE,
+            rows * BASEMAP_TILE_SIZE,
+            QtGui.QImage.Format_ARGB32_Premultiplied,
+        )
+        mosaic.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(mosaic)
+        try:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    key = hashlib.sha1(
+                        f"{layers_key}|{resolution!r}|{col}|{row}".encode("utf-8")
+                    ).hexdigest()
+                    if feedback is not None and feedback.isCanceled():
+                        return None
+
+                    image = self._get(key, cache_dir)
+                    if image is None:
+                        tile_extent = QgsRectangle(
+                            col * span, row * span, (col + 1) * span, (row + 1) * span
+                        )
+                        image = self._render_tile(
+                            layers, tile_extent, dpi, crs, transform_context
+                        )
+                        self._put(key, image, cache_dir)
+                    painter.drawImage(
+                        (col - min_col) * BASEMAP_TILE_SIZE,
+                        (max_row - row) * BASEMAP_TILE_SIZE,
+                        image,
+                    )
+        finally:
+            painter.end()
+
+        # Favour writing speed over size since the file is temporary
+        if not mosaic.save(output_path, "PNG", 100):
+            log(f"Unable to save basemap {output_path}", info=False)
+            return None
+
+        _write_georeference(
+            output_path, min_col * span, (max_row + 1) * span, resolution, crs
+        )
+
+        options = QgsRasterLayer.LayerOptions(loadDefaultStyle=False)
+        options.skipCrsValidation = True
+        basemap_layer = QgsRasterLayer(output_path, "basemap", "gdal", options)
+        if not basemap_layer.isValid():
+            log(f"Basemap {output_path} is invalid", info=False)
+            return None
+
+        basemap_layer.setCrs(crs)
+        basemap_layer.resampleFilter().setZoomedOutResampler(
+            QgsBilinearRasterResampler()
+        )
+        basemap_layer.resampleFilter().setZoomedInResampler(
+            QgsBilinearRasterResampler()
+        )
+
+        return basemap_layer
+
+
+def _write_georeference(
+    image_path: str,
+    x_min: float,
+    y_max: float,
+    resolution: float,
+    crs: QgsCoordinateReferenceSystem,
+):
+    """Writes the world file and the auxiliary file with the CRS of
+    the given PNG image.
+    """
+    with open(f"{os.path.splitext(image_path)[0]}.pgw", "w") as world_file:
+        world_file.write(
+            f"{resolution!r}\n0.0\n0.0\n{-resolution!r}\n"
+            f"{x_min + resolution / 2!r}\n{y_max - resolution / 2!r}\n"
+        )
+
+    with open(f"{image_path}.aux.xml", "w") as aux_file:
+        aux_file.write(f"<PAMDataset><SRS>{escape(crs.toWkt())}</SRS></PAMDataset>\n")
+
+
+def remove_basemap_files(image_path: str):
+    """Removes the composed basemap image and its georeference files.
+
+    :param image_path: Path of the basemap PNG file.
+    :type image_path: str
+    """
+    for path in (
+        image_path,
+        f"{os.path.splitext(image_path)[0]}.pgw",
+        f"{image_path}.aux.xml",
+    ):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+basemap_cache = BasemapCache()
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Extraction of the farmer metadata from the project instances layer.
+"""
+
+import hashlib
+import typing
+
+from qgis.core import (
+    QgsAbstractFeatureSource,
+    QgsFeatureRequest,
+    QgsFeedback,
+    QgsFields,
+    QgsRectangle,
+    QgsVectorDataProvider,
+    QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
+)
+
+from ..area import area_value
+from ...definitions.defaults import AREA_FIELD, FARMER_ID_FIELD
+from ...models.report import ProjectMetadata
+from ...utils import log
+
+
+def aggregate_farmers(
+    site_layer: QgsVectorLayer, feedback: typing.Optional[QgsFeedback] = None
+) -> typing.List[ProjectMetadata]:
+    """Aggregates the features of the project instances layer by
+    farmer in a single pass over the layer.
+
+    Besides the total area of the farmer sites, the extent, number
+    of sites and a digest of the site geometries are computed so that
+    the report tasks do not need to scan the layer again. The inception
+    date, author and project are taken from the first feature of each
+    farmer.
+
+    :param site_layer: Project instances layer.
+    :type site_layer: QgsVectorLayer
+
+    :param feedback: Feedback for reporting the progress, the
+    aggregation stops when it is cancelled.
+    :type feedback: QgsFeedback
+
+    :returns: Metadata of each farmer, in the order the farmers
+    appear in the layer, or an empty list if cancelled.
+    :rtype: list
+    """
+    return aggregate_farmer_features(
+        QgsVectorLayerFeatureSource(site_layer),
+        site_layer.fields(),
+        site_layer.featureCount(),
+        feedback,
+    )
+
+
+def aggregate_farmer_features(
+    source: QgsAbstractFeatureSource,
+    fields: QgsFields,
+    feature_count: int = 0,
+    feedback: typing.Optional[QgsFeedback] = None,
+) -> typing.List[ProjectMetadata]:
+    """Aggregates the features of the project instances layer by
+    farmer, see `aggregate_farmers`.
+
+    The features are read from a feature source so that the aggregation
+    can run in a background thread.
+
+    :param source: Feature source of the project instances layer.
+    :type source: QgsAbstractFeatureSource
+
+    :param fields: Fields of the project instances layer.
+    :type fields: QgsFields
+
+    :param feature_count: Number of features, used for the progress.
+    :type feature_count: int
+
+    :param feedback: Feedback for reporting the progress, the
+    aggregation stops when it is cancelled.
+    :type feedback: QgsFeedback
+
+    :returns: Metadata of each farmer, in the order the farmers
+    appear in the layer, or an empty list if cancelled.
+    :rtype: list
+    """
+    field_names = [
+        name
+        for name in (
+            FARMER_ID_FIELD,
+            AREA_FIELD,
+            "IncepDate",
+            "StartDate",
+            "author",
+            "project",
+        )
+        if fields.lookupField(name) != -1
+    ]
+    # The geometries are only read for the extents and digests
+    request = QgsFeatureRequest()
+    request.setSubsetOfAttributes(field_names, fields)
+    if feedback is not None:
+        request.setFeedback(feedback)
+
+    farmer_map = {}
+    progress_step = max(1, feature_count // 100)
+
+    for index, site_feature in enumerate(source.getFeatures(request)):
+        if feedback is not None and index % progress_step == 0:
+            if feedback.isCanceled():
+                break
+            if feature_count:
+                feedback.setProgress(min(100.0, index * 100 / feature_count))
+
+        id = site_feature.id()
+        farmer_id = site_feature[FARMER_ID_FIELD]
+        area = area_value(site_feature[AREA_FIELD])
+
+        if farmer_id in farmer_map:
+            farmer_map[farmer_id]["area"] += area
+        else:
+            farmer_map[farmer_id] = {}
+            farmer_map[farmer_id]["id"] = id
+            farmer_map[farmer_id]["area"] = area
+            farmer_map[farmer_id]["extent"] = QgsRectangle()
+            farmer_map[farmer_id]["count"] = 0
+            farmer_map[farmer_id]["digest"] = hashlib.sha256()
+            try:
+                farmer_map[farmer_id]["incep_date"] = site_feature["IncepDate"]
+            except KeyError:
+                try:
+                    farmer_map[farmer_id]["incep_date"] = site_feature["StartDate"]
+                except KeyError:
+                    log(
+                        f"Key 'StartDate' or 'IncepDate' not found in feature {site_feature.id()}. "
+                    )
+            farmer_map[farmer_id]["author"] = site_feature["author"]
+            farmer_map[farmer_id]["project"] = site_feature["project"]
+
+        farmer_map[farmer_id]["count"] += 1
+        geometry = site_feature.geometry()
+        if not geometry.isNull():
+            if farmer_map[farmer_id]["extent"].isNull():
+                farmer_map[farmer_id]["extent"] = geometry.boundingBox()
+            else:
+                farmer_map[farmer_id]["extent"].combineExtentWith(
+                    geometry.boundingBox()
+                )
+            farmer_map[farmer_id]["digest"].update(bytes(geometry.asWkb()))
+    if feedback is not None and feedback.isCanceled():
+        log("Aggregation of the farmers cancelled.")
+        return []
+
+    log("Farmer map: " + str(len(farmer_map.keys())))
+
+    farmers = []
+    for farmer_id, farmer_map_items in farmer_map.items():
+        extent = farmer_map_items["extent"]
+        metadata = ProjectMetadata(
+            farmer_id=farmer_id,
+            inception_date=farmer_map_items.get("incep_date"),
+            author=farmer_map_items["author"],
+            project=farmer_map_items["project"],
+            total_area=f"{farmer_map_items['area']:,.2f}",
+            site_extent=(
+                None
+                if extent.isNull()
+                else (
+                    extent.xMinimum(),
+                    extent.yMinimum(),
+                    extent.xMaximum(),
+                    extent.yMaximum(),
+                )
+            ),
+            feature_count=farmer_map_items["count"],
+            geometry_digest=farmer_map_items["digest"].hexdigest(),
+        )
+        farmers.append(metadata)
+
+    return farmers
+
+
+def ensure_farmer_id_index(site_layer: QgsVectorLayer) -> bool:
+    """Creates an attribute index on the farmer ID field of the
+    project instances layer if it does not exist.
+
+    The reports filter the layer by farmer ID, with the index the
+    data provider only reads the features of the given farmer instead
+    of scanning the whole layer. For shapefiles, the index is persisted
+    in the .idx and .ind files next to the layer. The index is always
+    requested from the provider since an existing index file might
+    cover a different field, OGR does not rebuild an existing index.
+
+    :param site_layer: Project instances layer.
+    :type site_layer: QgsVectorLayer
+
+    :returns: True if the index exists or was created, else False.
+    :rtype: bool
+    """
+    field_index = site_layer.fields().lookupField(FARMER_ID_FIELD)
+    if field_index == -1:
+        log(f"Field {FARMER_ID_FIELD} not found, index not created.", info=False)
+        return False
+
+    provider = site_layer.dataProvider()
+    if not provider.capabilities() & QgsVectorDataProvider.CreateAttributeIndex:
+        log(f"{site_layer.name()} layer does not support attribute indexes.")
+        return False
+
+    if not provider.createAttributeIndex(field_index):
+        log(f"Unable to create the {FARMER_ID_FIELD} index.", info=False)
+        return False
+
+    log(f"Created the {FARMER_ID_FIELD} index of {site_layer.name()}.")
+
+    return True
@@ -2,17 +2,24 @@
 """
 Site report generator.
 """
+import collections
+import dataclasses
+import hashlib
+import json
 from numbers import Number
 import os
 from pathlib import Path
 import traceback
 import typing
 import re
+import uuid
+import time
 
 from qgis.core import (
     QgsCoordinateReferenceSystem,
-    QgsCoordinateTransform,
+    QgsFeatureRequest,
     QgsFillSymbol,
+    QgsGeometry,
     QgsLayoutExporter,
     QgsLayoutItemMap,
     QgsMapLayer,
@@ -20,19 +27,19 @@ from qgis.core import (
     QgsProject,
     QgsRasterLayer,
     QgsReadWriteContext,
+    QgsRenderContext,
     QgsRectangle,
     QgsTask,
+    QgsUnitTypes,
     QgsVectorLayer,
     QgsProject,
-    QgsLayerTreeGroup,
-    QgsLayerTreeLayer,
 )
 
-from qgis.PyQt import QtCore, QtXml
+from qgis.PyQt import QtCore
 
-from ...conf import settings_manager, Settings
 from ...definitions.defaults import (
     ADMIN_AREAS_GROUP_NAME,
+    BASEMAP_CACHE_DIR,
     DETAILED_ZOOM_OUT_FACTOR,
     EXCLUSION_MASK_GROUP_NAME,
     GOOGLE_LAYER_NAME,
@@ -42,8 +49,19 @@ from ...definitions.defaults import (
     OVERVIEW_ZOOM_OUT_FACTOR,
     REPORT_SITE_BOUNDARY_STYLE,
     PROJECT_INSTANCE_STYLE,
+    REPORT_EXPORT_DPI,
+    STAGE_PDF_EXPORT,
+    STAGE_PROJECT_READ,
+    STAGE_TEMPLATE_LOAD,
 )
-from ...models.base import LayerNodeSearch
+from .basemap_cache import basemap_cache, remove_basemap_files
+from .layer_index import LayerTreeIndex
+from .manifest import file_digest, ReportManifest
+from .profiler import ReportProfiler
+from .project_pool import ReportProjectPool
+from .template_cache import read_template_document, template_cache
+from .transform_cache import transform_cache
+from ...models.base import ExportProfile, LayerNodeSearch, LogLevel
 from qgis.PyQt.QtCore import QDate
 from ...models.report import (
     SiteReportContext,
@@ -53,27 +71,45 @@ from ...models.report import (
 )
 from ...utils import (
     clean_filename,
+    commit_partial_pdf,
     FileUtils,
+    is_log_enabled,
     log,
+    partial_pdf_path,
     tr,
 )
 
 
 class SiteReportReportGeneratorTask(QgsTask):
-    """Class for generating the site report."""
+    """Class for generating the site report.
 
-    _lock = QtCore.QMutex()
+    Each task reads its own copy of the QGIS project so that several
+    reports can be generated concurrently. The reports of a batch are
+    not added to the task manager, the batch task generates them in
+    its own worker threads using `generate_report`.
+    """
 
-    def __init__(self, context: SiteReportContext):
+    def __init__(
+        self,
+        context: SiteReportContext,
+        project_pool: typing.Optional[ReportProjectPool] = None,
+    ):
         super().__init__()
         self._context = context
+        self._project_pool = project_pool
+        self._stage_counts = collections.Counter()
+        self._profiler = ReportProfiler()
         self._metadata = self._context.metadata
         self._feedback = self._context.feedback
         self._result = None
         self._layout = None
         self._project = None
+        self._layer_index: typing.Optional[LayerTreeIndex] = None
         self._error_messages: typing.List[str] = []
         self._output_layout_path = ""
+        self._basemap_layers: typing.List[QgsRasterLayer] = []
+        self._export_duration = 0.0
+        self._pdf_size = 0
         self._base_layout_name = ""
         self._output_report_layout = None
         self._site_layer = None
@@ -88,45 +124,53 @@ class SiteReportReportGeneratorTask(QgsTask):
         self.setDescription(f"{tr('Generating report for')}: {self.report_name}")
 
         # Log class properties and their types
-        log_verbose = False
-        if log_verbose:
-            log("SiteReportReportGeneratorTask initialized with:", to_file=True)
+        if is_log_enabled(LogLevel.DEBUG):
+            log("SiteReportReportGeneratorTask initialized with:", level=LogLevel.DEBUG)
             log(
                 f"-----------------------------------------------------------",
-                to_file=True,
+                level=LogLevel.DEBUG,
             )
-            log(f"  _context: {type(self._context).__name__}", to_file=True)
-            log(f"  _metadata: {type(self._metadata).__name__}", to_file=True)
-            log(f"  _feedback: {type(self._feedback).__name__}", to_file=True)
-            log(f"  _result: {type(self._result).__name__}", to_file=True)
-            log(f"  _layout: {type(self._layout).__name__}", to_file=True)
-            log(f"  _project: {type(self._project).__name__}", to_file=True)
+            log(f"  _context: {type(self._context).__name__}", level=LogLevel.DEBUG)
+            log(f"  _metadata: {type(self._metadata).__name__}", level=LogLevel.DEBUG)
+            log(f"  _feedback: {type(self._feedback).__name__}", level=LogLevel.DEBUG)
+            log(f"  _result: {type(self._result).__name__}", level=LogLevel.DEBUG)
+            log(f"  _layout: {type(self._layout).__name__}", level=LogLevel.DEBUG)
+            log(f"  _project: {type(self._project).__name__}", level=LogLevel.DEBUG)
             log(
                 f"  _error_messages: {type(self._error_messages).__name__}",
-                to_file=True,
+                level=LogLevel.DEBUG,
             )
             log(
                 f"  _output_layout_path: {type(self._output_layout_path).__name__}",
-                to_file=True,
+                level=LogLevel.DEBUG,
             )
             log(
                 f"  _base_layout_name: {type(self._base_layout_name).__name__}",
-                to_file=True,
+                level=LogLevel.DEBUG,
             )
             log(
                 f"  _output_report_layout: {type(self._output_report_layout).__name__}",
-                to_file=True,
+                level=LogLevel.DEBUG,
+            )
+            log(
+                f"  _site_layer: {type(self._site_layer).__name__}",
+                level=LogLevel.DEBUG,
             )
-            log(f"  _site_layer: {type(self._site_layer).__name__}", to_file=True)
             log(
                 f"  _landscape_layer: {type(self._landscape_layer).__name__}",
-                to_file=True,
+                level=LogLevel.DEBUG,
+            )
+            log(
+                f"  _2015_layer: {type(self._2015_layer).__name__}",
+                level=LogLevel.DEBUG,
+            )
+            log(
+                f"  report_name: {type(self.report_name).__name__}",
+                level=LogLevel.DEBUG,
             )
-            log(f"  _2015_layer: {type(self._2015_layer).__name__}", to_file=True)
-            log(f"  report_name: {type(self.report_name).__name__}", to_file=True)
             log(
                 f"-----------------------------------------------------------",
-                to_file=True,
+                level=LogLevel.DEBUG,
             )
 
     @property
@@ -164,6 +208,17 @@ class SiteReportReportGeneratorTask(QgsTask):
         """
         return self._output_layout_path
 
+    @property
+    def stage_counts(self) -> typing.Dict[str, int]:
+        """Gets the number of times each expensive stage of the
+        report generation process has been executed i.e. reading
+        the project, loading the template and exporting the PDF.
+
+        :returns: Number of executions indexed by the stage name.
+        :rtype: dict
+        """
+        return dict(self._stage_counts)
+
     @property
     def layout(self) -> QgsPrintLayout:
         """Gets the output report layout.
@@ -191,25 +246,27 @@ class SiteReportReportGeneratorTask(QgsTask):
         or False it if failed.
         :rtype: bool
         """
-        log("Starting report run... ")
+        return self.generate()
+
+    def generate(self) -> bool:
+        """Generates the report in the calling thread.
 
-        if not self._lock.tryLock():
-            log("Another report task is already running.")
-            self._error_messages.append("Another report is already being generated.")
+        The report is cancelled through the feedback of its context,
+        which is also the one used to report the progress.
+
+        :returns: True if the report was generated, else False.
+        :rtype: bool
+        """
+        if self._feedback.isCanceled():
+            self._error_messages.append(tr("Generation of report has been cancelled."))
+            self._result = self._get_failed_result()
             return False
-        if self.isCanceled():
+
+        if not self._generate_report():
+            self._result = self._get_failed_result()
             return False
-        else:
-            try:
-                log("Acquired lock, starting report...")
-                if not self._generate_report():
-                    self._result = self._get_failed_result()
-                    return False
-            finally:
-                log("Releasing report generation lock...")
-                self._lock.unlock()
 
-            return True
+        return True
 
     def finished(self, result: bool):
         """If successful, add the layout to the project.
@@ -221,17 +278,12 @@ class SiteReportReportGeneratorTask(QgsTask):
         """
         log("Report generation process finished.")
 
-        if self.isCanceled():
-            return
-        try:
-            if not self._generate_report():
-                self._result = self._get_failed_result()
-
-        except Exception as ex:
-            # Last resort to capture general exceptions.
-            exc_info = "".join(traceback.TracebackException.from_exception(ex).format())
-            self._error_messages.append(exc_info)
-            self._result = self._get_failed_result()
+        # All the heavy lifting has been done in the worker thread, here
+        # we only adopt the result of the run.
+        if self.isCanceled() or not result:
+            log(f"Report for {self.report_name} was not generated.", info=False)
+            for err in self._error_messages:
+                log(f"{err}\n", info=False)
             return
 
         if self._result and len(self._result.errors) > 0:
@@ -245,10 +297,15 @@ class SiteReportReportGeneratorTask(QgsTask):
                 err_msg = f"{err}\n"
                 log(err_msg, info=False)
             return
+
+        if not self._output_layout_path:
+            # The report was up to date, there is no new layout to add.
+            return
+
         # Load layout
         project = QgsProject.instance()
         self._output_report_layout = _load_layout_from_file(
-            self._output_layout_path, project
+            self._output_layout_path, project, use_cache=False
         )
         if self._output_report_layout is None:
             log("Could not load output report from file.", info=False)
@@ -272,7 +329,7 @@ class SiteReportReportGeneratorTask(QgsTask):
         :returns: Returns True if the process was cancelled else False.
         :rtype: bool
         """
-        log(f"Setting progress to {value}%.")
+        log(f"Setting progress to {value}%.", level=LogLevel.DEBUG)
         if self._feedback.isCanceled():
             tr_msg = tr("Generation of report has been cancelled.")
             self._error_messages.append(tr_msg)
@@ -287,9 +344,36 @@ class SiteReportReportGeneratorTask(QgsTask):
         """Creates the report result object."""
         log("Report generation failed, setting result.")
         return ReportOutputResult(
-            False, "", self.report_name, tuple(self._error_messages)
+            False,
+            "",
+            self.report_name,
+            tuple(self._error_messages),
+            timings=self._profiler.timings(),
         )
 
+    def _pdf_export_settings(self) -> QgsLayoutExporter.PdfExportSettings:
+        """Creates the PDF export settings for the export profile in
+        the report context.
+
+        Only the items that require it, such as the imagery in the map
+        items, are rasterized at the resolution of the export profile,
+        the labels and vector overlays are kept as vectors.
+
+        :returns: Settings for exporting the layout to PDF.
+        :rtype: QgsLayoutExporter.PdfExportSettings
+        """
+        export_profile = self._context.export_profile
+        settings = QgsLayoutExporter.PdfExportSettings()
+        settings.dpi = REPORT_EXPORT_DPI[export_profile.value]
+        settings.rasterizeWholeImage = False
+        settings.forceVectorOutput = False
+        settings.textRenderFormat = QgsRenderContext.TextFormatAlwaysText
+        settings.simplifyGeometries = export_profile != ExportProfile.PRINT
+        settings.appendGeoreference = export_profile != ExportProfile.DRAFT
+        settings.exportMetadata = export_profile != ExportProfile.DRAFT
+
+        return settings
+
     def _export_to_pdf(self) -> bool:
         """Exports the report to a PDF file in the output
         directory using the layout name as the file name.
@@ -305,28 +389,55 @@ class SiteReportReportGeneratorTask(QgsTask):
         pdf_path = f"{self._context.report_dir}/{clean_report_name}.pdf"
         log(f"Exporting report to PDF...:{pdf_path}")
 
-        # check if the pdf already exists, if it does, skip
-        if os.path.exists(pdf_path):
-            log(f"PDF file {pdf_path} already exists, skipping export.")
-            return True
-
         exporter = QgsLayoutExporter(self._layout)
+        self._stage_counts[STAGE_PDF_EXPORT] += 1
         log(f"Path when exporting pdf {pdf_path}")
 
         # Ensure all map items are rendered before exporting
         for item in self._layout.items():
             if isinstance(item, QgsLayoutItemMap):
-                log(f"Waiting for map item '{item.id()}' to render...")
+                log(
+                    f"Waiting for map item '{item.id()}' to render...",
+                    level=LogLevel.DEBUG,
+                )
                 item.refresh()
 
         # Export the layout to PDF
-        settings = QgsLayoutExporter.PdfExportSettings()
-        settings.rasterizeWholeImage = True
+        export_profile = self._context.export_profile
+        settings = self._pdf_export_settings()
         self._layout.refresh()
 
-        result = exporter.exportToPdf(pdf_path, settings)
-        if result == QgsLayoutExporter.ExportResult.Success:
-            log(f"PDF successfully exported to {pdf_path}")
+        # The exporter cannot be interrupted, this is the last point
+        # where a cancelled report is stopped.
+        if self._feedback.isCanceled():
+            self._error_messages.append(tr("Generation of report has been cancelled."))
+            return False
+
+        # The PDF is written to a partial file and then renamed so that
+        # an interrupted export never leaves an incomplete report.
+        start_time = time.perf_counter()
+        result = exporter.exportToPdf(partial_pdf_path(pdf_path), settings)
+
+        # A report cancelled during the export is discarded, it could
+        # otherwise replace the PDF of a later batch.
+        if self._feedback.isCanceled():
+            try:
+                os.remove(partial_pdf_path(pdf_path))
+            except OSError:
+                pass
+            self._error_messages.append(tr("Generation of report has been cancelled."))
+            return False
+
+        if result == QgsLayoutExporter.ExportResult.Success and commit_partial_pdf(
+            pdf_path
+        ):
+            self._export_duration = time.perf_counter() - start_time
+            self._pdf_size = os.path.getsize(pdf_path)
+            log(
+                f"PDF successfully exported to {pdf_path} using the "
+                f"'{export_profile.value}' profile in "
+                f"{self._export_duration:.2f}s, {self._pdf_size} bytes"
+            )
             return True
         else:
             tr_msg = tr(
@@ -343,33 +454,49 @@ class SiteReportReportGeneratorTask(QgsTask):
         :returns: Returns True if the process succeeded, else False.
         :rtype: bool
         """
-        log("Starting report generation process...XXX")
-        log(f"Report name: {self.report_name}")
+        log(f"Report name: {self.report_name}", level=LogLevel.DEBUG)
         if self._check_feedback_cancelled_or_set_progress(0):
             return False
 
-        # Early check to see if the output already exists so we can skip the generation
-        clean_report_name = clean_filename(self.report_name)
-        pdf_path = f"{self._context.report_dir}/{clean_report_name}.pdf"
-        verbose = False
-        if verbose:
-            log(f"Early check of PDF file {pdf_path} checking...")
-
-        if os.path.exists(pdf_path):
-            log(f"PDF file {pdf_path} already exists, skipping export.")
-            return True
-
         # Set QGIS project
-        self._set_project()
+        with self._profiler.span("set_project"):
+            self._set_project()
         if self._project is None:
             return False
 
+        with self._profiler.span("set_layers"):
+            self._set_site_layer()
+            log("Site layer set in report layout.", level=LogLevel.DEBUG)
+
+            self._set_landscape_layer()
+            self._set_2015_layer()
+            log("Landscape layers set in report layout.", level=LogLevel.DEBUG)
+
         if self._check_feedback_cancelled_or_set_progress(25):
             return False
 
+        # Skip the report if its inputs have not changed since the
+        # existing PDF was generated.
+        clean_report_name = clean_filename(self.report_name)
+        pdf_path = f"{self._context.report_dir}/{clean_report_name}.pdf"
+        manifest = ReportManifest.for_directory(self._context.report_dir)
+        with self._profiler.span("fingerprint"):
+            fingerprint = self._report_fingerprint()
+        if manifest.is_current(self.report_name, fingerprint, pdf_path):
+            log(f"PDF file {pdf_path} is up to date, skipping generation.")
+            self._result = ReportOutputResult(
+                True,
+                self._context.report_dir,
+                self.report_name,
+                tuple(self._error_messages),
+                timings=self._profiler.timings(),
+            )
+            return True
+
         # Load report template
-        if not self._load_template():
-            return False
+        with self._profiler.span("load_template"):
+            if not self._load_template():
+                return False
 
         # Assert template has been set
         if self._layout is None:
@@ -377,47 +504,52 @@ class SiteReportReportGeneratorTask(QgsTask):
 
         if self._check_feedback_cancelled_or_set_progress(35):
             return False
-        log("Report template loaded successfully.")
-
-        self._set_metadata_values()
-        log("Metadata values set in report layout.")
-        if self._check_feedback_cancelled_or_set_progress(45):
-            return False
-
-        self._set_site_layer()
-        log("Site layer set in report layout.")
-
-        if self._check_feedback_cancelled_or_set_progress(50):
-            return False
-
-        self._set_landscape_layer()
-        self._set_2015_layer()
-        log("Landscape layers set in report layout.")
+        log("Report template loaded successfully.", level=LogLevel.DEBUG)
 
+        with self._profiler.span("set_metadata_values"):
+            self._set_metadata_values()
+        log("Metadata values set in report layout.", level=LogLevel.DEBUG)
         if self._check_feedback_cancelled_or_set_progress(55):
             return False
 
-        self._configure_map_items_zoom_level()
-        log("Map items zoom levels configured.")
+        with self._profiler.span("configure_map_items"):
+            self._configure_map_items_zoom_level()
+        log("Map items zoom levels configured.", level=LogLevel.DEBUG)
 
         if self._check_feedback_cancelled_or_set_progress(75):
             return False
-        log("Map items zoom levels configured.")
 
         # Save report layout in temporary file
-        if not self._save_layout_to_file():
-            return False
-        log("Report layout saved to file.")
+        if self._context.adopt_layout:
+            with self._profiler.span("save_layout"):
+                if not self._save_layout_to_file():
+                    return False
+            log("Report layout saved to file.", level=LogLevel.DEBUG)
 
         if self._check_feedback_cancelled_or_set_progress(80):
             return False
 
-        log("Report layout saved to file.")
-        # Export report to PDF
-        if not self._export_to_pdf():
+        try:
+            # The layout is saved with the source layers, the cached
+            # basemaps are only used for the PDF.
+            with self._profiler.span("basemap_cache"):
+                self._apply_basemap_cache()
+
+            if self._check_feedback_cancelled_or_set_progress(90):
+                return False
+
+            # Export report to PDF
+            with self._profiler.span("export_pdf"):
+                exported = self._export_to_pdf()
+        finally:
+            self._release_basemap_layers()
+
+        if not exported:
             return False
 
-        log("Report exported to PDF.")
+        log("Report exported to PDF.", level=LogLevel.DEBUG)
+        manifest.update(self.report_name, fingerprint, pdf_path)
+
         if self._check_feedback_cancelled_or_set_progress(100):
             return False
 
@@ -426,17 +558,99 @@ class SiteReportReportGeneratorTask(QgsTask):
         self._result = ReportOutputResult(
             True,
             self._context.report_dir,
-            self._base_layout_name,
+            self.report_name,
             tuple(self._error_messages),
+            self._export_duration,
+            self._pdf_size,
+            self._profiler.timings(),
         )
-        log("Report generation result set successfully.")
+        log("Report generation result set successfully.", level=LogLevel.DEBUG)
         return True
 
+    def _report_fingerprint(self) -> str:
+        """Computes the fingerprint of the inputs of the report.
+
+        :returns: Returns the hexadecimal fingerprint or an empty
+        string if the site layer has not been set.
+        :rtype: str
+        """
+        if self._site_layer is None:
+            return ""
+
+        # The geometries of the farmer sites have been digested by the
+        # batch planner, the digest is part of the metadata.
+        if isinstance(self._metadata, ProjectMetadata) and (
+            self._metadata.geometry_digest
+        ):
+            return self._compute_fingerprint(self.report_name, self._metadata, [])
+
+        request = QgsFeatureRequest()
+        request.setNoAttributes()
+        geometries = [
+            feature.geometry() for feature in self._site_layer.getFeatures(request)
+        ]
+
+        return self._compute_fingerprint(self.report_name, self._metadata, geometries)
+
+    def _compute_fingerprint(
+        self,
+        report_name: str,
+        metadata: typing.Union[SiteMetadata, ProjectMetadata],
+        geometries: typing.List[QgsGeometry],
+    ) -> str:
+        """Computes the fingerprint of the inputs of a report i.e. the
+        metadata, the template, the export profile, the sources of the
+        map layers and the geometry of the site features.
+
+        :param report_name: Name of the report.
+        :type report_name: str
+
+        :param metadata: Metadata of the report.
+        :type metadata: typing.Union[SiteMetadata, ProjectMetadata]
+
+        :param geometries: Geometries of the site features.
+        :type geometries: list
+
+        :returns: Returns the hexadecimal fingerprint.
+        :rtype: str
+        """
+        hasher = hashlib.sha256()
+        hasher.update(report_name.encode("utf-8"))
+        hasher.update(
+            json.dumps(
+                dataclasses.asdict(metadata), sort_keys=True, default=str
+            ).encode("utf-8")
+        )
+        hasher.update(file_digest(self._context.template_path).encode("utf-8"))
+        hasher.update(self._context.export_profile.value.encode("utf-8"))
+
+        map_layers = [
+            self._site_layer,
+            self._landscape_layer,
+            self._2015_layer,
+            self._layer_index.layer_by_node_name(GOOGLE_LAYER_NAME),
+            self._layer_index.first_layer_in_group(ADMIN_AREAS_GROUP_NAME),
+        ]
+        map_layers.extend(self._layer_index.group_layers(EXCLUSION_MASK_GROUP_NAME))
+        for layer in map_layers:
+            if layer is None:
+                hasher.update(b"-")
+                continue
+            hasher.update(f"{layer.id()}|{layer.source()}".encode("utf-8"))
+            source_path = layer.source().split("|")[0]
+            if os.path.isfile(source_path):
+                hasher.update(str(os.path.getmtime(source_path)).encode("utf-8"))
+
+        for geometry in geometries:
+            hasher.update(bytes(geometry.asWkb()))
+
+        return hasher.hexdigest()
+
     def _set_metadata_values(self):
         """Set the report metadata values."""
-        log("Setting metadata values in report layout...")
+        log("Setting metadata values in report layout...", level=LogLevel.DEBUG)
         if isinstance(self._metadata, SiteMetadata):
-            log("Setting metadata values for SiteMetadata.")
+            log("Setting metadata values for SiteMetadata.", level=LogLevel.DEBUG)
             self.set_label_value("inception_date_label", self._metadata.inception_date)
             self.set_label_value("site_version_label", self._metadata.version)
             self.set_label_value("site_reference_label", self._metadata.site_reference)
@@ -447,104 +661,105 @@ class SiteReportReportGeneratorTask(QgsTask):
                 "site_area_label", f"{self._metadata.computed_area} ha"
             )
         elif isinstance(self._metadata, ProjectMetadata):
-            log("Setting metadata values for ProjectMetadata.")
-            # Check if the farmer_id ends with an integer and if so split it off
-            # and use it for the ID label
-            # The ending integer is used as the farmer number
-            # we use a regex to strip off the whole multidigit number at the start or end of the string
-
-            start_match_regex = r"^(\d+)"
-            start_match = re.search(start_match_regex, self._metadata.farmer_id)
-
-            end_match_regex = r"(\d+)$"
-            end_match = re.search(end_match_regex, self._metadata.farmer_id)
-            if start_match:
-                log(f"Farmer ID starts with an integer: {start_match.group(0)}")
-                farmer_number = str(start_match.group(0))
-                farmer_name = self._metadata.farmer_id.replace(
-                    farmer_number, ""
-                ).strip()
-                self.set_label_value("farmer_id_label", f"{farmer_name}")
-                self.set_label_value("farmer_number_label", f"{farmer_number}")
-            elif end_match:
-                log(f"Farmer ID ends with an integer: {end_match.group(0)}")
-                farmer_name = self._metadata.farmer_id[: end_match.start()]
-                farmer_number = end_match.group(0)
-                self.set_label_value("farmer_id_label", f"{farmer_name}")
+            log("Setting metadata values for ProjectMetadata.", level=LogLevel.DEBUG)
+            # Check if the farmer_id starts or ends with an integer and
+            # if so split it off and use it as the farmer number.
+            farmer_name, farmer_number = split_farmer_id(self._metadata.farmer_id)
+            self.set_label_value("farmer_id_label", f"{farmer_name}")
+            if farmer_number:
                 self.set_label_value("farmer_number_label", f"{farmer_number}")
             else:
-                log("Farmer ID does not start or end with an integer.")
-                # If the farmer_id does not start or end with an integer, use it as is
-                self.set_label_value("farmer_id_label", f"{self._metadata.farmer_id}")
-                # and hide the number box
+                # Hide the number box
                 label_item = self._layout.itemById("farmer_number_label")
                 label_item.hide()
-            log("Setting report label values for ProjectMetadata.")
+            log(
+                "Setting report label values for ProjectMetadata.", level=LogLevel.DEBUG
+            )
             try:
                 if self._metadata.author:
-                    log("report_author_label: " f"{self._metadata.author}")
+                    log(
+                        "report_author_label: " f"{self._metadata.author}",
+                        level=LogLevel.DEBUG,
+                    )
                     self.set_label_value("report_author_label", self._metadata.author)
                 else:
-                    log("report_author_label: Not set")
+                    log("report_author_label: Not set", level=LogLevel.DEBUG)
             except AttributeError as e:
                 log(
                     f"Error setting report author label value: {e}. "
-                    "Author metadata attribute may be missing."
+                    "Author metadata attribute may be missing.",
+                    info=False,
                 )
             try:
                 if self._metadata.project:
-                    log("project_label: " f"{self._metadata.project}")
+                    log(
+                        "project_label: " f"{self._metadata.project}",
+                        level=LogLevel.DEBUG,
+                    )
                     self.set_label_value("project_label", self._metadata.project)
                 else:
-                    log("project_label: Not set")
+                    log("project_label: Not set", level=LogLevel.DEBUG)
             except AttributeError as e:
                 log(
                     f"Error setting project label value: {e}. "
-                    "Project metadata attribute may be missing."
+                    "Project metadata attribute may be missing.",
+                    info=False,
                 )
             try:
                 if self._metadata.inception_date:
-                    log("inception_date_label: " f"{self._metadata.inception_date}")
+                    log(
+                        "inception_date_label: " f"{self._metadata.inception_date}",
+                        level=LogLevel.DEBUG,
+                    )
                     # Check if inception_date is a QDate, convert to string if needed
                     inception_date = self._metadata.inception_date
                     if isinstance(inception_date, QDate):
                         inception_date = inception_date.toString("yyyy-MM-dd")
                     self.set_label_value("inception_date_label", inception_date)
                 else:
-                    log("inception_date_label: Not set")
+                    log("inception_date_label: Not set", level=LogLevel.DEBUG)
             except AttributeError as e:
                 log(
                     f"Error setting inception date label value: {e}. "
-                    "Inception date metadata attribute may be missing."
+                    "Inception date metadata attribute may be missing.",
+                    info=False,
                 )
             try:
                 if self._metadata.capture_date:
-                    log("capture_date_label: " f"{self._metadata.capture_date}")
+                    log(
+                        "capture_date_label: " f"{self._metadata.capture_date}",
+                        level=LogLevel.DEBUG,
+                    )
                     self.set_label_value(
                         "capture_date_label", self._metadata.capture_date
                     )
                 else:
-                    log("capture_date_label: Not set")
+                    log("capture_date_label: Not set", level=LogLevel.DEBUG)
             except AttributeError as e:
 
                 log(
                     f"Error setting capture date label value: {e}. "
-                    "Capture date metadata attribute may be missing."
+                    "Capture date metadata attribute may be missing.",
+                    info=False,
                 )
             try:
                 if self._metadata.total_area:
-                    log("area_label: " f"{self._metadata.total_area} ha")
+                    log(
+                        "area_label: " f"{self._metadata.total_area} ha",
+                        level=LogLevel.DEBUG,
+                    )
                     self.set_label_value(
                         "area_label", f"{self._metadata.total_area} ha"
                     )
                 else:
-                    log("area_label: Not set")
+                    log("area_label: Not set", level=LogLevel.DEBUG)
             except AttributeError as e:
                 log(
                     f"Error setting area label value: {e}. "
-                    "Area metadata attribute may be missing."
+                    "Area metadata attribute may be missing.",
+                    info=False,
                 )
-            log("Report label values set successfully.")
+            log("Report label values set successfully.", level=LogLevel.DEBUG)
 
     def _get_layer_from_node_name(
         self,
@@ -571,56 +786,18 @@ class SiteReportReportGeneratorTask(QgsTask):
         not found.
         :rtype: QgsMapLayer
         """
-        log(f"Searching for layer node: {node_name} in group: {group_name}")
-        root_tree = self._project.layerTreeRoot()
-
-        matching_node = None
-        last_group = FileNotFoundError
-        for node in root_tree.findLayers():
-            # log(f"Checking Node: {matching_node} for {node_name}")
-            if group_name:
-                if group_name != last_group:
-                    log(f"Group: {group_name}")
-                last_group = group_name
-                if node.parent() and node.parent().name() == group_name:
-                    for child in node.parent().children():
-                        log(f"Child: {child.name()}")
-                        if (
-                            search_type == LayerNodeSearch.EXACT_MATCH
-                            and child.name() == node_name
-                        ):
-                            log(f"Exact match found for {child.name()}")
-                            matching_node = child
-                            break
-                        elif (
-                            search_type == LayerNodeSearch.CONTAINS
-                            and node_name in child.name()
-                        ):
-                            log(f"Partial match found for {child.name()}")
-                            matching_node = child
-                            break
-            else:
-                if (
-                    search_type == LayerNodeSearch.EXACT_MATCH
-                    and node.name() == node_name
-                ):
-                    log(f"Exact match found for {node.name()}")
-                    matching_node = node
-                    break
-                elif (
-                    search_type == LayerNodeSearch.CONTAINS and node_name in node.name()
-                ):
-                    log(f"Partial match found for {node.name()}")
-                    matching_node = node
-                    break
-
-        if matching_node is None:
+        log(
+            f"Searching for layer node: {node_name} in group: {group_name}",
+            level=LogLevel.DEBUG,
+        )
+        layer = self._layer_index.layer_by_node_name(node_name, search_type, group_name)
+        if layer is None:
             tr_msg = tr("layer node not found.")
             log(f"{tr_msg}, node name {node_name} using search mode: {search_type}")
             self._error_messages.append(f"{node_name} {tr_msg}")
             return None
 
-        return matching_node.layer()
+        return layer
 
     def _get_map_item_by_id(self, map_id: str) -> typing.Optional[QgsLayoutItemMap]:
         """Gets a map item corresponding to the given identifier.
@@ -632,7 +809,7 @@ class SiteReportReportGeneratorTask(QgsTask):
         given ID else None if not found.
         :rtype: QgsLayoutItemMap
         """
-        log(f"Searching for map item with ID: {map_id}")
+        log(f"Searching for map item with ID: {map_id}", level=LogLevel.DEBUG)
         map_item = self._layout.itemById(map_id)
         if map_item is None:
             tr_msg = tr("not found in report template.")
@@ -641,40 +818,49 @@ class SiteReportReportGeneratorTask(QgsTask):
 
         return map_item
 
-    def _set_site_layer(self):
-        """Fetch the project boundary layer."""
-        log("Setting site layer for the report...")
-        site_path = (
-            settings_manager.get_value(Settings.LAST_SITE_LAYER_PATH, default="")
-            if isinstance(self._context.metadata, SiteMetadata)
-            else settings_manager.get_value(
-                Settings.CURRENT_PROJECT_LAYER_PATH, default=""
-            )
-        )
-        log(f"Site layer path: {site_path}")
+    def _find_site_layer(self) -> typing.Optional[QgsVectorLayer]:
+        """Finds the site or project instances layer in the report
+        project.
+
+        :returns: Returns the valid site layer or None if not found.
+        :rtype: QgsVectorLayer
+        """
+        site_path = self._context.site_layer_path
+        log(f"Site layer path: {site_path}", level=LogLevel.DEBUG)
         path = Path(site_path)
-        if not path.exists():
+        if not site_path or not path.exists():
             tr_msg = tr("Report layer shapefile does not exist")
             log(tr_msg)
             self._error_messages.append(f"{tr_msg} {site_path}")
-            return
+            return None
 
         site_layer = self.find_layer_by_name(path.stem)
 
         if site_layer is None:
-            return
-        log(f"Found site layer: {site_layer.name()}")
+            return None
+        if is_log_enabled(LogLevel.DEBUG):
+            log(f"Found site layer: {site_layer.name()}", level=LogLevel.DEBUG)
         if not site_layer.isValid():
             tr_msg = tr("Report layer shapefile is invalid")
             log(tr_msg)
             self._error_messages.append(tr_msg)
+            return None
+        log("Site layer is valid.", level=LogLevel.DEBUG)
+
+        return site_layer
+
+    def _set_site_layer(self):
+        """Fetch the project boundary layer."""
+        log("Setting site layer for the report...", level=LogLevel.DEBUG)
+        site_layer = self._find_site_layer()
+        if site_layer is None:
             return
-        log("Site layer is valid.")
+
         if isinstance(self._context.metadata, SiteMetadata):
             site_symbol = QgsFillSymbol.createSimple(REPORT_SITE_BOUNDARY_STYLE)
             site_layer.renderer().setSymbol(site_symbol)
             site_layer.triggerRepaint()
-            log("Site layer style set successfully.")
+            log("Site layer style set successfully.", level=LogLevel.DEBUG)
         else:
             style_file = FileUtils.style_file_path(PROJECT_INSTANCE_STYLE)
             site_layer.loadNamedStyle(style_file)
@@ -686,30 +872,38 @@ class SiteReportReportGeneratorTask(QgsTask):
             site_layer.setSubsetString(f"\"FarmerID\" = '{safe_id}'")
 
             site_layer.triggerRepaint()
-            log("Project layer style set successfully.")
+            log("Project layer style set successfully.", level=LogLevel.DEBUG)
 
         self._site_layer = site_layer
 
     def find_layer_by_name(self, layer_name):
-        log(f"Searching for layer: {layer_name}")
-        layers = QgsProject.instance().mapLayers()
+        """Gets the layer in the report project whose cleaned name
+        matches the given name.
 
-        for layer_id, layer in layers.items():
-            if clean_filename(layer.name()) == layer_name:
-                return layer
-        return None
+        The lookup is done in the task's own project and not the
+        current project, otherwise concurrent tasks would change
+        the subset string of the same layer.
+
+        :param layer_name: Name of the layer as used in file names.
+        :type layer_name: str
+
+        :returns: Returns the first matching layer or None if not found.
+        :rtype: QgsMapLayer
+        """
+        log(f"Searching for layer: {layer_name}", level=LogLevel.DEBUG)
+        return self._layer_index.layer_by_clean_name(layer_name)
 
     def _set_landscape_layer(self):
         """Set the landscape layer i.e. Landsat depending on the
         information in the TemporalInfo object.
         """
-        log("Setting landscape layer for the report...")
+        log("Setting landscape layer for the report...", level=LogLevel.DEBUG)
         landsat_2013_layer = self.get_first_matching_layer_in_group(
             LANDSAT_IMAGERY_GROUP_NAME, LANDSAT_2013_LAYER_SEGMENT
         )
 
         if landsat_2013_layer is not None:
-            log("Landsat 2013 layer set .... OK")
+            log("Landsat 2013 layer set .... OK", level=LogLevel.DEBUG)
             self._landscape_layer = landsat_2013_layer
 
         if self._landscape_layer is None:
@@ -720,13 +914,13 @@ class SiteReportReportGeneratorTask(QgsTask):
         """Set the 2015 layer i.e. Landsat depending on the
         information in the TemporalInfo object.
         """
-        log("Setting 2015 Landsat layer for the report...")
+        log("Setting 2015 Landsat layer for the report...", level=LogLevel.DEBUG)
         landsat_2015_layer = self.get_first_matching_layer_in_group(
             LANDSAT_IMAGERY_GROUP_NAME, LANDSAT_2015_LAYER_SEGMENT
         )
 
         if landsat_2015_layer is not None:
-            log("Landsat 2015 layer set .... OK")
+            log("Landsat 2015 layer set .... OK", level=LogLevel.DEBUG)
             self._2015_layer = landsat_2015_layer
 
         if self._2015_layer is None:
@@ -735,7 +929,7 @@ class SiteReportReportGeneratorTask(QgsTask):
 
     def _configure_map_items_zoom_level(self):
         """Set layers and zoom levels of map items."""
-        log("Configuring map items zoom levels...")
+        log("Configuring map items zoom levels...", level=LogLevel.DEBUG)
         if self._site_layer is None:
             tr_msg = tr("Project layer not found or shapefile is invalid")
             self._error_messages.append(tr_msg)
@@ -766,7 +960,7 @@ class SiteReportReportGeneratorTask(QgsTask):
         :param mask_layers: Exclusion mask layers
         :type mask_layers: list
         """
-        log("Configuring landscape maps...")
+        log("Configuring landscape maps...", level=LogLevel.DEBUG)
         if self._landscape_layer is None:
             tr_msg = tr(
                 "Landscape layer is missing, landscape maps will not "
@@ -776,7 +970,10 @@ class SiteReportReportGeneratorTask(QgsTask):
 
         # landscape layer with mask map
         historic_masked_map = self._get_map_item_by_id("2013_historic_mask_map")
-        log("Setting up historic map with mask for 2013 landscape imagery")
+        log(
+            "Setting up historic map with mask for 2013 landscape imagery",
+            level=LogLevel.DEBUG,
+        )
         if historic_masked_map and detailed_extent:
             # Transform extent
             landscape_imagery_extent = self._transform_extent(
@@ -790,29 +987,31 @@ class SiteReportReportGeneratorTask(QgsTask):
                 self._error_messages.append(tr_msg)
                 log(tr_msg)
             else:
-                log("Historic mask layer extent is set")
+                log("Historic mask layer extent is set", level=LogLevel.DEBUG)
                 landscape_mask_layers = [self._site_layer]
                 landscape_mask_layers.extend(mask_layers)
                 if self._landscape_layer is not None:
-                    log(
-                        f"Historic Landscape layer is set to {self._landscape_layer.name()}"
-                    )
-                    log(
-                        f"Historic Landscape layer source {self._landscape_layer.source()}"
-                    )
+                    if is_log_enabled(LogLevel.DEBUG):
+                        log(
+                            f"Historic Landscape layer is set to {self._landscape_layer.name()}",
+                            level=LogLevel.DEBUG,
+                        )
+                        log(
+                            f"Historic Landscape layer source {self._landscape_layer.source()}",
+                            level=LogLevel.DEBUG,
+                        )
                     landscape_mask_layers.append(self._landscape_layer)
-                historic_masked_map.setFollowVisibilityPreset(False)
-                historic_masked_map.setFollowVisibilityPresetName("")
-                historic_masked_map.setLayers(landscape_mask_layers)
-                historic_masked_map.zoomToExtent(landscape_imagery_extent)
-                historic_masked_map.refresh()
+                self._set_map_layers(
+                    historic_masked_map, landscape_mask_layers, landscape_imagery_extent
+                )
 
         # Landscape with no-mask map
         historic_no_mask_map = self._get_map_item_by_id("2013_historic_no_mask_map")
         if historic_no_mask_map and detailed_extent:
             # Transform extent
             log(
-                "Setting up historic landscape map with NO mask for 2013 landscape imagery"
+                "Setting up historic landscape map with NO mask for 2013 landscape imagery",
+                level=LogLevel.DEBUG,
             )
             landscape_no_mask_extent = self._transform_extent(
                 detailed_extent, self._site_layer.crs(), historic_no_mask_map.crs()
@@ -825,28 +1024,34 @@ class SiteReportReportGeneratorTask(QgsTask):
                 )
                 self._error_messages.append(tr_msg)
             else:
-                log("Historic mask layer extent is set")
+                log("Historic mask layer extent is set", level=LogLevel.DEBUG)
                 landscape_no_mask_layers = [self._site_layer]
                 if self._landscape_layer is not None:
-                    log(
-                        f"Historic Landscape layer is set to {self._landscape_layer.name()}"
-                    )
-                    log(
-                        f"Historic Landscape layer source {self._landscape_layer.source()}"
-                    )
+                    if is_log_enabled(LogLevel.DEBUG):
+                        log(
+                            f"Historic Landscape layer is set to {self._landscape_layer.name()}",
+                            level=LogLevel.DEBUG,
+                        )
+                        log(
+                            f"Historic Landscape layer source {self._landscape_layer.source()}",
+                            level=LogLevel.DEBUG,
+                        )
 
                     landscape_no_mask_layers.append(self._landscape_layer)
 
-                historic_no_mask_map.setFollowVisibilityPreset(False)
-                historic_no_mask_map.setFollowVisibilityPresetName("")
-                historic_no_mask_map.setLayers(landscape_no_mask_layers)
-                historic_no_mask_map.zoomToExtent(landscape_no_mask_extent)
-                historic_no_mask_map.refresh()
+                self._set_map_layers(
+                    historic_no_mask_map,
+                    landscape_no_mask_layers,
+                    landscape_no_mask_extent,
+                )
 
         # landscape layer with mask map
         landscape_masked_map_2015 = self._get_map_item_by_id("2015_historic_mask_map")
         if landscape_masked_map_2015 and detailed_extent:
-            log("Setting up historic map WITH mask for 2015 imagery")
+            log(
+                "Setting up historic map WITH mask for 2015 imagery",
+                level=LogLevel.DEBUG,
+            )
             # Transform extent
             landscape_imagery_extent = self._transform_extent(
                 detailed_extent, self._site_layer.crs(), landscape_masked_map_2015.crs()
@@ -859,25 +1064,35 @@ class SiteReportReportGeneratorTask(QgsTask):
                 self._error_messages.append(tr_msg)
                 log(tr_msg)
             else:
-                log("Historic mask layer extent is set")
+                log("Historic mask layer extent is set", level=LogLevel.DEBUG)
                 landscape_mask_layers = [self._site_layer]
                 landscape_mask_layers.extend(mask_layers)
                 if self._2015_layer is not None:
-                    log(f"2015 Landscape layer is set to {self._2015_layer.name()}")
-                    log(f"2015 Landscape layer source {self._2015_layer.source()}")
+                    if is_log_enabled(LogLevel.DEBUG):
+                        log(
+                            f"2015 Landscape layer is set to {self._2015_layer.name()}",
+                            level=LogLevel.DEBUG,
+                        )
+                        log(
+                            f"2015 Landscape layer source {self._2015_layer.source()}",
+                            level=LogLevel.DEBUG,
+                        )
                     landscape_mask_layers.append(self._2015_layer)
-                landscape_masked_map_2015.setFollowVisibilityPreset(False)
-                landscape_masked_map_2015.setFollowVisibilityPresetName("")
-                landscape_masked_map_2015.setLayers(landscape_mask_layers)
-                landscape_masked_map_2015.zoomToExtent(landscape_imagery_extent)
-                landscape_masked_map_2015.refresh()
+                self._set_map_layers(
+                    landscape_masked_map_2015,
+                    landscape_mask_layers,
+                    landscape_imagery_extent,
+                )
 
         # Landscape with no-mask map
         landscape_no_mask_map_2015 = self._get_map_item_by_id(
             "2015_historic_no_mask_map"
         )
         if landscape_no_mask_map_2015 and detailed_extent:
-            log("Setting up landscape map with NO mask for 2015 landscape imagery")
+            log(
+                "Setting up landscape map with NO mask for 2015 landscape imagery",
+                level=LogLevel.DEBUG,
+            )
             # Transform extent
             landscape_no_mask_extent = self._transform_extent(
                 detailed_extent,
@@ -892,17 +1107,24 @@ class SiteReportReportGeneratorTask(QgsTask):
                 )
                 self._error_messages.append(tr_msg)
             else:
-                log("Historic mask layer extent is set")
+                log("Historic mask layer extent is set", level=LogLevel.DEBUG)
                 landscape_no_mask_layers = [self._site_layer]
                 if self._2015_layer is not None:
-                    log(f"2015 Landscape layer is set to {self._2015_layer.name()}")
-                    log(f"2015 Landscape layer source {self._2015_layer.source()}")
+                    if is_log_enabled(LogLevel.DEBUG):
+                        log(
+                            f"2015 Landscape layer is set to {self._2015_layer.name()}",
+                            level=LogLevel.DEBUG,
+                        )
+                        log(
+                            f"2015 Landscape layer source {self._2015_layer.source()}",
+                            level=LogLevel.DEBUG,
+                        )
                     landscape_no_mask_layers.append(self._2015_layer)
-                landscape_no_mask_map_2015.setFollowVisibilityPreset(False)
-                landscape_no_mask_map_2015.setFollowVisibilityPresetName("")
-                landscape_no_mask_map_2015.setLayers(landscape_no_mask_layers)
-                landscape_no_mask_map_2015.zoomToExtent(landscape_imagery_extent)
-                landscape_no_mask_map_2015.refresh()
+                self._set_map_layers(
+                    landscape_no_mask_map_2015,
+                    landscape_no_mask_layers,
+                    landscape_imagery_extent,
+                )
 
     def _configure_current_maps(
         self, detailed_extent: QgsRectangle, mask_layers: typing.List[QgsMapLayer]
@@ -915,7 +1137,7 @@ class SiteReportReportGeneratorTask(QgsTask):
         :param mask_layers: Exclusion mask layers
         :type mask_layers: list
         """
-        log("Configuring current imagery maps...")
+        log("Configuring current imagery maps...", level=LogLevel.DEBUG)
         google_layer = self._get_layer_from_node_name(
             GOOGLE_LAYER_NAME, LayerNodeSearch.EXACT_MATCH
         )
@@ -938,11 +1160,9 @@ class SiteReportReportGeneratorTask(QgsTask):
                 current_mask_layers = [self._site_layer]
                 current_mask_layers.extend(mask_layers)
                 current_mask_layers.append(google_layer)
-                current_mask_map.setFollowVisibilityPreset(False)
-                current_mask_map.setFollowVisibilityPresetName("")
-                current_mask_map.setLayers(current_mask_layers)
-                current_mask_map.zoomToExtent(current_imagery_extent)
-                current_mask_map.refresh()
+                self._set_map_layers(
+                    current_mask_map, current_mask_layers, current_imagery_extent
+                )
 
         # Current imagery with no-mask map
         current_no_mask_map = self._get_map_item_by_id("current_no_mask_map")
@@ -960,11 +1180,11 @@ class SiteReportReportGeneratorTask(QgsTask):
                 self._error_messages.append(tr_msg)
             else:
                 current_no_mask_layers = [self._site_layer, google_layer]
-                current_no_mask_map.setFollowVisibilityPreset(False)
-                current_no_mask_map.setFollowVisibilityPresetName("")
-                current_no_mask_map.setLayers(current_no_mask_layers)
-                current_no_mask_map.zoomToExtent(current_no_mask_imagery_extent)
-                current_no_mask_map.refresh()
+                self._set_map_layers(
+                    current_no_mask_map,
+                    current_no_mask_layers,
+                    current_no_mask_imagery_extent,
+                )
 
     def get_first_layer_in_group(self, group_name: str) -> typing.Optional[QgsMapLayer]:
         """Get the first layer in the group with the given name.
@@ -974,42 +1194,23 @@ class SiteReportReportGeneratorTask(QgsTask):
         ..addedby: Tim Sutton, 4 May 2025
 
         I added this method because the original method returned layers with the incorrect source.
-        This method is a recursive function that searches for the first layer
-        in the group with the given name.
+        The search uses the layer index of the report project, see `LayerTreeIndex`.
 
         :param group_name: Name of the group to search for.
         :type group_name: str
         :returns: Returns the first layer found in the group or None if not found.
         :rtype: QgsMapLayer
         """
-        log(f"Searching for first layer in group: {group_name}")
-
-        def recurse(node, indent="", parent=None):
-            if isinstance(node, QgsLayerTreeGroup):
-                if node.name() == group_name:
-                    for child in node.children():
-                        if isinstance(child, QgsLayerTreeLayer):
-                            layer = child.layer()
-                            if layer:
-                                log(
-                                    f"{indent}🗃️  Found Layer in group '{group_name}': {layer.name()}"
-                                )
-                                log(f"{indent}🚛  ↳ Source: {layer.source()}")
-                                log(f"{indent}🛍️  ↳ Provider: {layer.providerType()}")
-                                log(
-                                    "-----------------------------------------------------------"
-                                )
-                                return layer
-                    return None  # Group matched, but no layer found
-                else:
-                    for child in node.children():
-                        found = recurse(child, indent + "  ", node)
-                        if found:
-                            return found
-            return None
+        log(f"Searching for first layer in group: {group_name}", level=LogLevel.DEBUG)
+        layer = self._layer_index.first_layer_in_group(group_name)
+        if layer is not None:
+            log(
+                f"🗃️  Found Layer in group '{group_name}': {layer.name()}",
+                level=LogLevel.DEBUG,
+            )
+            log(f"🚛  ↳ Source: {layer.source()}", level=LogLevel.DEBUG)
 
-        root = QgsProject.instance().layerTreeRoot()
-        return recurse(root)
+        return layer
 
     def get_first_matching_layer_in_group(
         self, group_name: str, search_string: str
@@ -1021,8 +1222,7 @@ class SiteReportReportGeneratorTask(QgsTask):
         ..addedby: Tim Sutton, 4 May 2025
 
         I added this method because the original method returned layers with the incorrect source.
-        This method is a recursive function that searches for the first layer
-        in the group with the given name.
+        The search uses the layer index of the report project, see `LayerTreeIndex`.
 
 
         :param group_name: Name of the group to search for.
@@ -1033,38 +1233,23 @@ class SiteReportReportGeneratorTask(QgsTask):
         :rtype: QgsMapLayer
         """
         log(
-            f"Searching for first layer in group: {group_name} with search string: {search_string}"
+            f"Searching for first layer in group: {group_name} with search string: {search_string}",
+            level=LogLevel.DEBUG,
         )
+        layer = self._layer_index.first_matching_layer_in_group(
+            group_name, search_string
+        )
+        if layer is not None:
+            log(
+                f"🗃️  Found Layer in group '{group_name}': {layer.name()}",
+                level=LogLevel.DEBUG,
+            )
+            log(f"🚛  ↳ Source: {layer.source()}", level=LogLevel.DEBUG)
 
-        def recurse(node, indent="", parent=None):
-            if isinstance(node, QgsLayerTreeGroup):
-                if node.name() == group_name:
-                    for child in node.children():
-                        if isinstance(child, QgsLayerTreeLayer):
-                            layer = child.layer()
-                            if search_string in layer.name():
-                                log(
-                                    f"{indent}🗃️  Found Layer in group '{group_name}': {layer.name()}"
-                                )
-                                log(f"{indent}🚛  ↳ Source: {layer.source()}")
-                                log(f"{indent}🛍️  ↳ Provider: {layer.providerType()}")
-                                log(
-                                    "-----------------------------------------------------------"
-                                )
-                                return layer
-                    return None  # Group matched, but no layer found
-                else:
-                    for child in node.children():
-                        found = recurse(child, indent + "  ", node)
-                        if found:
-                            return found
-            return None
-
-        root = QgsProject.instance().layerTreeRoot()
-        return recurse(root)
+        return layer
 
     def _get_layers_in_group(self, group_name: str) -> typing.List[QgsMapLayer]:
-        """Gets all map layers in the group with the given name, recursively.
+        """Gets the map layers in the first group with the given name.
 
         .. versionadded:: 1.5
         .. addedby:: Tim Sutton, 4 May 2025
@@ -1075,38 +1260,23 @@ class SiteReportReportGeneratorTask(QgsTask):
         :returns: List of all valid QgsMapLayer instances found in the group.
         :rtype: list
         """
-        log(f"Searching for layers in group: {group_name}")
-        result_layer_names: typing.List[str] = []
-        result_layers: typing.List[QgsMapLayer] = []
-
-        def recurse(node, indent=""):
-            if isinstance(node, QgsLayerTreeGroup):
-                if node.name() == group_name:
-                    log(f"📁 Found group: {group_name}")
-                    # Collect layers within this group only
-                    for child in node.children():
-                        if isinstance(child, QgsLayerTreeLayer):
-                            layer = child.layer()
-                            try:
-                                log(f"{indent}🗃️  Layer: {layer.name()}")
-                                result_layer_names.append(layer.name())
-                            except:
-                                log(
-                                    f"{indent}⚠️ Invalid or missing layer in group '{group_name}'"
-                                )
-                    return True  # Found and processed the group — stop recursion
-                else:
-                    for child in node.children():
-                        if recurse(child, indent + "  "):
-                            return True  # Early exit once group is found
-                return False
+        log(f"Searching for layers in group: {group_name}", level=LogLevel.DEBUG)
+        return self._layer_index.group_layers(group_name, first_group_only=True)
+
+    def _site_extent(self) -> QgsRectangle:
+        """Gets the extent of the site features.
+
+        The extent of the farmer sites is precomputed by the batch
+        planner, otherwise it is computed from the site layer.
 
-        root = self._project.layerTreeRoot()
-        recurse(root)
-        for layer_name in result_layer_names:
-            layer = self.get_first_matching_layer_in_group(group_name, layer_name)
-            result_layers.append(layer)
-        return result_layers
+        :returns: Extent of the site features in the site layer CRS.
+        :rtype: QgsRectangle
+        """
+        site_extent = getattr(self._metadata, "site_extent", None)
+        if site_extent is not None:
+            return QgsRectangle(*site_extent)
+
+        return self._site_layer.extent()
 
     def _configure_site_maps(self) -> QgsRectangle:
         """Set the zoom level and layers for the overview and detailed maps.
@@ -1114,8 +1284,8 @@ class SiteReportReportGeneratorTask(QgsTask):
         :returns: Returns the extent of the detailed map.
         :rtype: QgsRectangle
         """
-        log("Configuring site maps...")
-        site_extent = self._site_layer.extent()
+        log("Configuring site maps...", level=LogLevel.DEBUG)
+        site_extent = self._site_extent()
 
         google_layer = self._get_layer_from_node_name(
             GOOGLE_LAYER_NAME, LayerNodeSearch.EXACT_MATCH
@@ -1136,26 +1306,49 @@ class SiteReportReportGeneratorTask(QgsTask):
             # ensure we do not zoom out beyond the national extent.
             admin_extent = None
             overview_extent = None
-            log(f"Overview map CRS: {overview_map.crs().authid()}")
-            if admin_layer:
-                extent = admin_layer.extent()
-                log(
-                    f"Admin layer CRS: {admin_layer.crs().authid() if admin_layer else 'None'}"
-                )
-                log(f"Admin layer extent: {extent.toString()}")
+            if is_log_enabled(LogLevel.DEBUG):
                 log(
-                    f"Using reference admin layer for site_location_overview_map {admin_layer.name()}"
+                    f"Overview map CRS: {overview_map.crs().authid()}",
+                    level=LogLevel.DEBUG,
                 )
+            if admin_layer:
+                extent = admin_layer.extent()
+                if is_log_enabled(LogLevel.DEBUG):
+                    log(
+                        f"Admin layer CRS: {admin_layer.crs().authid() if admin_layer else 'None'}",
+                        level=LogLevel.DEBUG,
+                    )
+                    log(
+                        f"Admin layer extent: {extent.toString()}", level=LogLevel.DEBUG
+                    )
+                    log(
+                        f"Using reference admin layer for site_location_overview_map {admin_layer.name()}",
+                        level=LogLevel.DEBUG,
+                    )
 
                 admin_extent = self._transform_extent(
                     extent, admin_layer.crs(), overview_map.crs()
                 )
-                log(f"Admin layer extent after transform: {admin_extent.toString()}")
+                if is_log_enabled(LogLevel.DEBUG):
+                    log(
+                        f"Admin layer extent after transform: {admin_extent.toString()}",
+                        level=LogLevel.DEBUG,
+                    )
             else:
-                log("Reference admin layer not found, using site layer extent")
+                log(
+                    "Reference admin layer not found, using site layer extent",
+                    level=LogLevel.DEBUG,
+                )
 
-                log(f"Site layer CRS: {self._site_layer.crs().authid()}")
-                log(f"Site layer extent: {self._site_layer.extent().toString()}")
+                if is_log_enabled(LogLevel.DEBUG):
+                    log(
+                        f"Site layer CRS: {self._site_layer.crs().authid()}",
+                        level=LogLevel.DEBUG,
+                    )
+                    log(
+                        f"Site layer extent: {site_extent.toString()}",
+                        level=LogLevel.DEBUG,
+                    )
                 # Transform extent
                 overview_extent = self._transform_extent(
                     site_extent, self._site_layer.crs(), overview_map.crs()
@@ -1168,22 +1361,28 @@ class SiteReportReportGeneratorTask(QgsTask):
                 overview_extent.scale(OVERVIEW_ZOOM_OUT_FACTOR)
 
             if admin_extent:
-                log("Admin extent is set")
+                log("Admin extent is set", level=LogLevel.DEBUG)
                 if overview_extent and admin_extent.contains(overview_extent):
-                    log("Admin extent contains overview extent")
+                    log("Admin extent contains overview extent", level=LogLevel.DEBUG)
                     overview_map.zoomToExtent(overview_extent)
                 else:
-                    log("Admin extent does not contain overview extent")
+                    log(
+                        "Admin extent does not contain overview extent",
+                        level=LogLevel.DEBUG,
+                    )
                     overview_map.zoomToExtent(admin_extent)
             else:
-                log("Admin extent is not set, using overview extent")
+                log(
+                    "Admin extent is not set, using overview extent",
+                    level=LogLevel.DEBUG,
+                )
                 overview_map.zoomToExtent(overview_extent)
-            log(f"Overview map extent: {overview_map.extent().toString()}")
-            # Visibiity presets are the same thing as map themes
-            overview_map.setFollowVisibilityPreset(False)
-            overview_map.setFollowVisibilityPresetName("")
-            overview_map.setLayers(map_item_layers)
-            overview_map.refresh()
+            if is_log_enabled(LogLevel.DEBUG):
+                log(
+                    f"Overview map extent: {overview_map.extent().toString()}",
+                    level=LogLevel.DEBUG,
+                )
+            self._set_map_layers(overview_map, map_item_layers)
 
         # Detailed site map
         detailed_map = self._get_map_item_by_id("site_location_detailed_map")
@@ -1198,17 +1397,108 @@ class SiteReportReportGeneratorTask(QgsTask):
                 tr_msg = tr("Invalid extent for setting in the detailed map.")
                 self._error_messages.append(tr_msg)
             else:
-                detailed_map.setFollowVisibilityPreset(False)
-                detailed_map.setFollowVisibilityPresetName("")
-                detailed_map.setLayers(map_item_layers)
-
                 # Zoom out by factor
                 detailed_extent.scale(DETAILED_ZOOM_OUT_FACTOR)
-                detailed_map.zoomToExtent(detailed_extent)
-                detailed_map.refresh()
+                self._set_map_layers(detailed_map, map_item_layers, detailed_extent)
 
         return detailed_extent
 
+    def _set_map_layers(
+        self,
+        map_item: QgsLayoutItemMap,
+        layers: typing.List[QgsMapLayer],
+        extent: typing.Optional[QgsRectangle] = None,
+    ):
+        """Sets the layers and, optionally, the extent of a map item.
+
+        :param map_item: Map item in the report layout.
+        :type map_item: QgsLayoutItemMap
+
+        :param layers: Layers to render in the map item, from top
+        to bottom.
+        :type layers: list
+
+        :param extent: Extent to zoom the map item to.
+        :type extent: QgsRectangle
+        """
+        with self._profiler.span(map_item.id(), "map_item"):
+            # Visibility presets are the same thing as map themes
+            map_item.setFollowVisibilityPreset(False)
+            map_item.setFollowVisibilityPresetName("")
+            map_item.setLayers([layer for layer in layers if layer is not None])
+            if extent is not None:
+                map_item.zoomToExtent(extent)
+            map_item.refresh()
+
+    def _apply_basemap_cache(self):
+        """Replaces the background layers of the map items with the
+        corresponding cached basemaps.
+
+        The contiguous raster layers at the bottom of each map item are
+        rendered once and reused across reports, the layers above them,
+        such as the site boundary, are still rendered for each report.
+        The tile renders are stopped when the report is cancelled.
+        """
+        if not self._context.basemap_cache or self._layout is None:
+            return
+
+        cache_dir = os.path.normpath(f"{self._context.report_dir}/{BASEMAP_CACHE_DIR}")
+        dpi = REPORT_EXPORT_DPI[self._context.export_profile.value]
+        for item in self._layout.items():
+            if self._feedback.isCanceled():
+                return
+
+            if not isinstance(item, QgsLayoutItemMap) or item.mapRotation():
+                continue
+
+            layers = item.layers()
+            overlay_count = len(layers)
+            while overlay_count > 0 and isinstance(
+                layers[overlay_count - 1], QgsRasterLayer
+            ):
+                overlay_count -= 1
+
+            background_layers = layers[overlay_count:]
+            if not background_layers:
+                continue
+
+            width = self._layout.convertFromLayoutUnits(
+                item.rect().width(), QgsUnitTypes.LayoutInches
+            ).length()
+            height = self._layout.convertFromLayoutUnits(
+                item.rect().height(), QgsUnitTypes.LayoutInches
+            ).length()
+            output_path = os.path.join(
+                cache_dir, f"{uuid.uuid4().hex}_{clean_filename(item.id())}.png"
+            )
+            with self._profiler.span(item.id(), "basemap"):
+                basemap_layer = basemap_cache.basemap_layer(
+                    background_layers,
+                    item.extent(),
+                    int(round(width * dpi)),
+                    int(round(height * dpi)),
+                    dpi,
+                    item.crs(),
+                    self._project.transformContext(),
+                    cache_dir,
+                    output_path,
+                    self._feedback,
+                )
+            if basemap_layer is None:
+                continue
+
+            self._basemap_layers.append(basemap_layer)
+            item.setLayers(layers[:overlay_count] + [basemap_layer])
+            item.refresh()
+
+        log(f"Basemap cache statistics: {basemap_cache.stats}", level=LogLevel.DEBUG)
+
+    def _release_basemap_layers(self):
+        """Removes the basemaps composed for the map items."""
+        for basemap_layer in self._basemap_layers:
+            remove_basemap_files(basemap_layer.source())
+        self._basemap_layers = []
+
     def _get_layers_in_theme(self, theme_name: str) -> typing.List[QgsMapLayer]:
         """Returns the visible map layers in the given theme.
 
@@ -1218,7 +1508,7 @@ class SiteReportReportGeneratorTask(QgsTask):
         :returns: Returns the list of visible map layers or an empty list.
         :rtype: list
         """
-        log(f"Getting layers in theme: {theme_name}")
+        log(f"Getting layers in theme: {theme_name}", level=LogLevel.DEBUG)
         theme_collection = self._project.mapThemeCollection()
         theme = theme_collection.mapThemeState(theme_name)
         if theme is None:
@@ -1246,9 +1536,6 @@ class SiteReportReportGeneratorTask(QgsTask):
         :returns: Returns the reprojected extent.
         :rtype: QgsRectangle
         """
-        log(
-            f"Transforming extent {extent.toString()} from {source_crs.authid()} to {target_crs.authid()}"
-        )
         if source_crs == target_crs:
             return extent
 
@@ -1256,8 +1543,8 @@ class SiteReportReportGeneratorTask(QgsTask):
             return extent
 
         try:
-            coordinate_xform = QgsCoordinateTransform(
-                source_crs, target_crs, self._project
+            coordinate_xform = transform_cache.transform(
+                source_crs, target_crs, self._project.transformContext()
             )
             return coordinate_xform.transformBoundingBox(extent)
         except Exception as e:
@@ -1268,7 +1555,7 @@ class SiteReportReportGeneratorTask(QgsTask):
 
     def _set_project(self):
         """Deserialize the project from the report context."""
-        log("Setting project for the report...")
+        log("Setting project for the report...", level=LogLevel.DEBUG)
         if not self._context.qgs_project_path:
             tr_msg = tr("Project file not specified")
             self._error_messages.append(tr_msg)
@@ -1290,7 +1577,17 @@ class SiteReportReportGeneratorTask(QgsTask):
                 )
                 return
 
+        # Reuse the batch project previously read in this thread
+        use_pool = self._context.shared_project and self._project_pool is not None
+        if use_pool:
+            shared_project = self._project_pool.get(self._context.qgs_project_path)
+            if shared_project is not None:
+                log("Using shared batch project.", level=LogLevel.DEBUG)
+                self._project, self._layer_index = shared_project
+                return
+
         project = QgsProject()
+        self._stage_counts[STAGE_PROJECT_READ] += 1
         result = project.read(self._context.qgs_project_path)
         if not result:
             tr_msg = tr("Unable to read the project file")
@@ -1302,7 +1599,12 @@ class SiteReportReportGeneratorTask(QgsTask):
             self._error_messages.append(f"{tr_msg}: {project.error()}")
             return
 
+        layer_index = LayerTreeIndex(project)
+        if use_pool:
+            self._project_pool.add(self._context.qgs_project_path, project, layer_index)
+
         self._project = project
+        self._layer_index = layer_index
 
     def _load_template(self) -> bool:
         """Loads the template defined in the report context.
@@ -1311,12 +1613,13 @@ class SiteReportReportGeneratorTask(QgsTask):
         else False.
         :rtype: bool
         """
-        log("Loading report template...")
+        log("Loading report template...", level=LogLevel.DEBUG)
         if self._project is None:
             tr_msg = tr("Project not set.")
             self._error_messages.append(tr_msg)
             return False
 
+        self._stage_counts[STAGE_TEMPLATE_LOAD] += 1
         report_layout = _load_layout_from_file(
             self._context.template_path, self._project, self._error_messages
         )
@@ -1337,7 +1640,7 @@ class SiteReportReportGeneratorTask(QgsTask):
 
     def _save_layout_to_file(self) -> bool:
         """Serialize the updated report layout to a temporary file."""
-        log("Saving report layout to a temporary file...")
+        log("Saving report layout to a temporary file...", level=LogLevel.DEBUG)
         temp_layout_file = QtCore.QTemporaryFile()
         if not temp_layout_file.open():
             tr_msg = tr("Could not open temporary file to write the report.")
@@ -1369,7 +1672,9 @@ class SiteReportReportGeneratorTask(QgsTask):
         :param value: Value to be set in the label.
         :type value: str
         """
-        log(f"Setting label value for ID: {label_id} to '{value}'")
+        log(
+            f"Setting label value for ID: {label_id} to '{value}'", level=LogLevel.DEBUG
+        )
         if self._layout is None:
             tr_msg = tr("Unable to set label value, layout not found.")
             self._error_messages.append(tr_msg)
@@ -1384,46 +1689,81 @@ class SiteReportReportGeneratorTask(QgsTask):
         label_item.setText(value)
 
 
+def generate_report(
+    context: SiteReportContext, project_pool: typing.Optional[ReportProjectPool] = None
+) -> ReportOutputResult:
+    """Generates a report in the calling thread, outside of the task
+    manager.
+
+    :param context: Context of the report, it is cancelled through
+    its feedback.
+    :type context: SiteReportContext
+
+    :param project_pool: Pool of the batch projects read by the
+    calling thread, used if the project of the context is shared.
+    :type project_pool: ReportProjectPool
+
+    :returns: Result of the report.
+    :rtype: ReportOutputResult
+    """
+    generator = SiteReportReportGeneratorTask(context, project_pool)
+    generator.generate()
+
+    return generator.result
+
+
+def split_farmer_id(farmer_id: str) -> typing.Tuple[str, str]:
+    """Splits the farmer ID into the farmer name and the farmer number
+    i.e. the whole multi-digit number at the start or end of the ID.
+
+    :param farmer_id: Farmer ID.
+    :type farmer_id: str
+
+    :returns: Tuple of the farmer name and the farmer number, the
+    number is an empty string if the ID does not start or end with
+    an integer.
+    :rtype: tuple
+    """
+    start_match = re.search(r"^(\d+)", farmer_id)
+    if start_match:
+        log(f"Farmer ID starts with an integer: {start_match.group(0)}")
+        farmer_number = str(start_match.group(0))
+        return farmer_id.replace(farmer_number, "").strip(), farmer_number
+
+    end_match = re.search(r"(\d+)$", farmer_id)
+    if end_match:
+        log(f"Farmer ID ends with an integer: {end_match.group(0)}")
+        return farmer_id[: end_match.start()], end_match.group(0)
+
+    log("Farmer ID does not start or end with an integer.")
+    return farmer_id, ""
+
+
 def _load_layout_from_file(
-    template_path: str, project: QgsProject, error_messages: list = None
+    template_path: str,
+    project: QgsProject,
+    error_messages: list = None,
+    use_cache: bool = True,
 ) -> typing.Union[QgsPrintLayout, None]:
     """Util for loading layout templates from a file. It supports
     an optional argument for list to write error messages.
+
+    Report templates are read from the process-wide template cache,
+    one-off layout files should set `use_cache` to False.
     """
     log(f"Loading layout from file: {template_path}")
-    p = Path(template_path)
-    if not p.exists():
-        if error_messages:
-            tr_msg = tr("Template file does not exist")
-            error_messages.append(f"{tr_msg} {template_path}.")
-        return None
+    if use_cache:
+        doc = template_cache.document(template_path, error_messages)
+    else:
+        doc = read_template_document(template_path, error_messages)
 
-    template_file = QtCore.QFile(template_path)
-    doc = QtXml.QDomDocument()
-    doc_status = True
-    try:
-        if not template_file.open(QtCore.QIODevice.ReadOnly):
-            if error_messages:
-                tr_msg = tr("Unable to read template file")
-                error_messages.append(f"{tr_msg} {template_path}")
-            doc_status = False
-
-        if doc_status:
-            if not doc.setContent(template_file):
-                if error_messages:
-                    tr_msg = tr("Failed to parse template file contents")
-                    error_messages.append(f"{tr_msg} {template_path}")
-                doc_status = False
-    finally:
-        template_file.close()
-
-    if not doc_status:
+    if doc is None:
         return None
 
     layout = QgsPrintLayout(project)
     _, load_status = layout.loadFromTemplate(doc, QgsReadWriteContext())
     if not load_status:
-        if error_messages:
+        if error_messages is not None:
             tr_msg = tr("Could not load template from")
             error_messages.append(f"{tr_msg} {template_path}")
         return None
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Journal of the state of the farmer reports in a batch.
+"""
+
+import datetime
+import typing
+
+from .jsonl_store import JsonlStore
+from ...definitions.defaults import BATCH_JOURNAL_FILE_NAME
+from ...models.base import JournalState
+
+
+class BatchJournal(JsonlStore):
+    """Records the state, number of attempts and duration of each
+    farmer report so that an interrupted batch can be resumed.
+
+    A line is appended on each state change of a report, keyed by the
+    farmer ID. A report which is still running when the journal is
+    loaded was interrupted, for instance by a crash, and is considered
+    unfinished.
+    """
+
+    file_name = BATCH_JOURNAL_FILE_NAME
+    key_field = "farmer_id"
+    description = "batch journal"
+    sync_writes = True
+
+    def _update(
+        self, farmer_ids: typing.Iterable[typing.Any], state: JournalState, **values
+    ):
+        """Sets the state and the given values of the farmer entries."""
+        updated = datetime.datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._refresh()
+            entries = []
+            for farmer_id in farmer_ids:
+                key = str(farmer_id)
+                entry = dict(self._entries.get(key, {"farmer_id": key, "attempts": 0}))
+                entry.update(values, state=state.value, updated=updated)
+                if state == JournalState.RUNNING:
+                    entry["attempts"] += 1
+                entries.append(entry)
+            self._append(entries)
+
+    def state(self, farmer_id: typing.Any) -> typing.Optional[JournalState]:
+        """Gets the state of the report of the given farmer.
+
+        :param farmer_id: ID of the farmer.
+        :type farmer_id: typing.Any
+
+        :returns: State of the report or None if the farmer is not
+        in the journal.
+        :rtype: JournalState
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(str(farmer_id))
+
+        return JournalState(entry["state"]) if entry else None
+
+    def entry(self, farmer_id: typing.Any) -> dict:
+        """Gets the journal entry of the given farmer.
+
+        :param farmer_id: ID of the farmer.
+        :type farmer_id: typing.Any
+
+        :returns: Copy of the entry with the state, attempts, duration
+        and errors of the report, empty if the farmer is not in the
+        journal.
+        :rtype: dict
+        """
+        with self._lock:
+            self._refresh()
+            return dict(self._entries.get(str(farmer_id), {}))
+
+    def counts(self) -> typing.Dict[str, int]:
+        """Gets the number of reports in each state.
+
+        :returns: Number of reports (value) indexed by state (key).
+        :rtype: dict
+        """
+        counts = {state.value: 0 for state in JournalState}
+        with self._lock:
+            self._refresh()
+            for entry in self._entries.values():
+                counts[entry["state"]] = counts.get(entry["state"], 0) + 1
+
+        return counts
+
+    def is_done(self, farmer_id: typing.Any) -> bool:
+        """Checks whether the report of the given farmer was generated.
+
+        :param farmer_id: ID of the farmer.
+        :type farmer_id: typing.Any
+
+        :returns: True if the report is done, False if it is unfinished,
+        failed or not in the journal.
+        :rtype: bool
+        """
+        return self.state(farmer_id) == JournalState.DONE
+
+    def queue(self, farmer_ids: typing.Iterable[typing.Any]):
+        """Records the reports of the given farmers as queued.
+
+        :param farmer_ids: IDs of the farmers in the batch.
+        :type farmer_ids: typing.Iterable
+        """
+        self._update(farmer_ids, JournalState.QUEUED)
+
+    def start(self, farmer_id: typing.Any):
+        """Records the report of the given farmer as running.
+
+        :param farmer_id: ID of the farmer.
+        :type farmer_id: typing.Any
+        """
+        self._update([farmer_id], JournalState.RUNNING, errors=[])
+
+    def finish(
+        self,
+        farmer_id: typing.Any,
+        success: bool,
+        duration: float,
+        errors: typing.Iterable[str] = (),
+    ):
+        """Records the outcome of the report of the given farmer.
+
+        :param farmer_id: ID of the farmer.
+        :type farmer_id: typing.Any
+
+        :param success: Whether the report was generated.
+        :type success: bool
+
+        :param duration: Duration of the attempt, in seconds.
+        :type duration: float
+
+        :param errors: Error messages of the attempt.
+        :type errors: typing.Iterable
+        """
+        self._update(
+            [farmer_id],
+            JournalState.DONE if success else JournalState.FAILED,
+            duration=round(duration, 3),
+            errors=list(errors),
+        )
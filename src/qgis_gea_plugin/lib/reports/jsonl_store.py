@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Append-only JSON lines files in the reports folder.
+"""
+
+import json
+import os
+import threading
+import typing
+
+from ...utils import log
+
+
+class JsonlStore:
+    """Base class of the records kept as JSON lines files in the
+    reports folder.
+
+    A line is appended to the file on each change of a record and the
+    last line for a given key takes precedence, the file is compacted
+    when it is loaded and contains superseded lines. Use `for_directory`
+    to get the instance shared by all the report tasks writing to a
+    folder.
+
+    The file can also be written by other processes, such as the report
+    workers of a batch, so it is read again whenever its modification
+    time or size differ from the ones of the last read or write.
+    Subclasses call `_refresh` with the lock held before using the
+    entries.
+
+    Subclasses set the name of the file, the entry field used as the
+    key and a description of the store used in the log messages.
+    """
+
+    file_name = ""
+    key_field = ""
+    description = "store"
+
+    # True to flush the appended lines to the disk before returning
+    sync_writes = False
+
+    _instances_lock = threading.Lock()
+    _instances: typing.Dict[typing.Tuple[type, str], "JsonlStore"] = {}
+
+    def __init__(self, report_dir: str):
+        self._path = os.path.normpath(f"{report_dir}/{self.file_name}")
+        self._lock = threading.Lock()
+        self._entries: typing.Dict[str, dict] = {}
+        # Modification time and size of the file when it was last read
+        # or written by this instance.
+        self._file_state: typing.Optional[typing.Tuple[int, int]] = None
+        with self._lock:
+            self._load()
+
+    @classmethod
+    def for_directory(cls, report_dir: str):
+        """Gets the store of the given reports folder.
+
+        :param report_dir: Reports folder.
+        :type report_dir: str
+
+        :returns: The store shared by the report tasks writing to
+        the given folder.
+        :rtype: JsonlStore
+        """
+        key = (cls, os.path.normpath(report_dir))
+        with cls._instances_lock:
+            store = JsonlStore._instances.get(key)
+            if store is None:
+                store = cls(key[1])
+                JsonlStore._instances[key] = store
+
+        return store
+
+    @property
+    def path(self) -> str:
+        """Gets the path of the file.
+
+        :returns: Path of the file.
+        :rtype: str
+        """
+        return self._path
+
+    def _stat(self) -> typing.Optional[typing.Tuple[int, int]]:
+        """Returns the modification time and size of the file or None
+        if it does not exist.
+        """
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        """Reads the file again if it has been changed by another
+        instance or process since it was last read or written, the
+        lock should be held by the caller.
+        """
+        if self._stat() != self._file_state:
+            self._load()
+
+    def _load(self):
+        """Reads the entries from the file, if it exists, and compacts
+        the file when it contains superseded entries. The lock should
+        be held by the caller.
+        """
+        self._entries.clear()
+        # The state is taken before reading so that lines appended
+        # while reading cause the file to be read again.
+        self._file_state = self._stat()
+        if self._file_state is None:
+            return
+
+        line_count = 0
+        try:
+            with open(self._path, "r", encoding="utf-8") as store_file:
+                for line in store_file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    line_count += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Last line of a file written during a crash
+                        continue
+                    if self.key_field in entry:
+                        self._entries[entry[self.key_field]] = entry
+        except OSError as e:
+            log(f"Unable to read the {self.description} {self._path}, {e}", info=False)
+            return
+
+        if line_count > len(self._entries):
+            self._compact()
+
+    def _compact(self):
+        """Rewrites the file with only the latest entries.
+
+        The file is left as is if it has been changed since it was
+        read, the entries would otherwise miss the lines written by
+        other processes in the meantime.
+        """
+        temp_path = f"{self._path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as store_file:
+                for entry in self._entries.values():
+                    store_file.write(f"{json.dumps(entry, sort_keys=True)}\n")
+            if self._stat() != self._file_state:
+                os.remove(temp_path)
+                return
+            os.replace(temp_path, self._path)
+            self._file_state = self._stat()
+        except OSError as e:
+            log(
+                f"Unable to compact the {self.description} {self._path}, {e}",
+                info=False,
+            )
+
+    def _append(self, entries: typing.List[dict]):
+        """Records the given entries and appends them to the file, the
+        lock should be held by the caller after refreshing the entries.
+        """
+        for entry in entries:
+            self._entries[entry[self.key_field]] = entry
+
+        lines = "".join(f"{json.dumps(entry, sort_keys=True)}\n" for entry in entries)
+        try:
+            with open(self._path, "a", encoding="utf-8") as store_file:
+                store_file.write(lines)
+                if self.sync_writes:
+                    store_file.flush()
+                    os.fsync(store_file.fileno())
+        except OSError as e:
+            log(
+                f"Unable to update the {self.description} {self._path}, {e}",
+                info=False,
+            )
+            return
+
+        # Unless another process appended to the file at the same time,
+        # the entries are those of the file.
+        previous_size = self._file_state[1] if self._file_state else 0
+        file_state = self._stat()
+        if file_state is not None and file_state[1] == previous_size + len(
+            lines.encode("utf-8")
+        ):
+            self._file_state = file_state
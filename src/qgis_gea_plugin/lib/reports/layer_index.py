@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Lookup index of the layers and groups in a report project.
+"""
+
+import typing
+
+from qgis.core import (
+    QgsLayerTreeGroup,
+    QgsLayerTreeLayer,
+    QgsMapLayer,
+    QgsProject,
+)
+
+from ...models.base import LayerNodeSearch
+from ...utils import clean_filename, log
+
+
+class LayerTreeIndex:
+    """Index of the layers in a project by group name, layer tree node
+    name and cleaned layer name.
+
+    The index is built the first time it is queried and rebuilt when
+    layers are added to or removed from the project or when the layer
+    tree changes. Searches by name segment are memoized so repeated
+    lookups only walk the layers of the group once.
+    """
+
+    def __init__(self, project: QgsProject):
+        self._project = project
+        self._is_valid = False
+
+        # Layer tree node name and layer for each group with a given
+        # name, in the order the groups appear in the layer tree.
+        self._groups: typing.Dict[
+            str, typing.List[typing.List[typing.Tuple[str, QgsMapLayer]]]
+        ] = {}
+        # Layer of the first layer tree node with the given name
+        self._node_layers: typing.Dict[str, QgsMapLayer] = {}
+        # All layer tree nodes and corresponding layers in tree order
+        self._tree_layers: typing.List[typing.Tuple[str, QgsMapLayer]] = []
+        # First map layer with the given cleaned name
+        self._clean_name_layers: typing.Dict[str, QgsMapLayer] = {}
+        # Memoized results of the name segment searches
+        self._segment_layers: typing.Dict[
+            typing.Tuple[str, str, int], typing.Optional[QgsMapLayer]
+        ] = {}
+
+        project.layersAdded.connect(self.invalidate)
+        project.layersRemoved.connect(self.invalidate)
+        root = project.layerTreeRoot()
+        root.addedChildren.connect(self.invalidate)
+        root.removedChildren.connect(self.invalidate)
+        root.nameChanged.connect(self.invalidate)
+
+    @property
+    def project(self) -> QgsProject:
+        """Gets the project whose layers are indexed.
+
+        :returns: The indexed project.
+        :rtype: QgsProject
+        """
+        return self._project
+
+    def invalidate(self, *args):
+        """Marks the index as stale so that it is rebuilt on the next
+        lookup. Arguments from the connected signals are ignored.
+        """
+        self._is_valid = False
+
+    def _build(self):
+        """Walks the layer tree and the map layers of the project once
+        to populate the lookup tables.
+        """
+        self._groups = {}
+        self._node_layers = {}
+        self._tree_layers = []
+        self._clean_name_layers = {}
+        self._segment_layers = {}
+
+        def recurse(group: QgsLayerTreeGroup, ancestor_names: typing.Tuple[str]):
+            for child in group.children():
+                if isinstance(child, QgsLayerTreeLayer):
+                    layer = child.layer()
+                    if layer is None:
+                        continue
+                    self._tree_layers.append((child.name(), layer))
+                    self._node_layers.setdefault(child.name(), layer)
+                elif isinstance(child, QgsLayerTreeGroup):
+                    child_layers = [
+                        (node.name(), node.layer())
+                        for node in child.children()
+                        if isinstance(node, QgsLayerTreeLayer)
+                        and node.layer() is not None
+                    ]
+                    # Nested groups with the same name as an ancestor are
+                    # shadowed by the ancestor group.
+                    if child.name() not in ancestor_names:
+                        self._groups.setdefault(child.name(), []).append(child_layers)
+                    recurse(child, ancestor_names + (child.name(),))
+
+        recurse(self._project.layerTreeRoot(), ())
+
+        for layer in self._project.mapLayers().values():
+            self._clean_name_layers.setdefault(clean_filename(layer.name()), layer)
+
+        self._is_valid = True
+        log(
+            f"Layer index built with {len(self._tree_layers)} layer tree "
+            f"node(s) and {len(self._groups)} group name(s)."
+        )
+
+    def _ensure_index(self):
+        """Rebuilds the index if it is stale."""
+        if not self._is_valid:
+            self._build()
+
+    def group_layers(
+        self, group_name: str, first_group_only: bool = False
+    ) -> typing.List[QgsMapLayer]:
+        """Gets the layers that are direct children of the groups with
+        the given name.
+
+        :param group_name: Name of the layer tree group.
+        :type group_name: str
+
+        :param first_group_only: True to only return the layers in the
+        first group with the given name in the layer tree.
+        :type first_group_only: bool
+
+        :returns: Layers in the group(s) or an empty list if no group
+        was found.
+        :rtype: list
+        """
+        self._ensure_index()
+        groups = self._groups.get(group_name, [])
+        if first_group_only:
+            groups = groups[:1]
+
+        return [layer for group in groups for _, layer in group]
+
+    def first_layer_in_group(self, group_name: str) -> typing.Optional[QgsMapLayer]:
+        """Gets the first layer in the groups with the given name.
+
+        :param group_name: Name of the layer tree group.
+        :type group_name: str
+
+        :returns: The first layer or None if not found.
+        :rtype: QgsMapLayer
+        """
+        layers = self.group_layers(group_name)
+        return layers[0] if layers else None
+
+    def first_matching_layer_in_group(
+        self, group_name: str, search_string: str
+    ) -> typing.Optional[QgsMapLayer]:
+        """Gets the first layer, in the groups with the given name, whose
+        layer name contains the search string.
+
+        :param group_name: Name of the layer tree group.
+        :type group_name: str
+
+        :param search_string: Segment of the layer name.
+        :type search_string: str
+
+        :returns: The first matching layer or None if not found.
+        :rtype: QgsMapLayer
+        """
+        self._ensure_index()
+        key = (group_name, search_string, LayerNodeSearch.CONTAINS)
+        if key not in self._segment_layers:
+            self._segment_layers[key] = next(
+                (
+                    layer
+                    for layer in self.group_layers(group_name)
+                    if search_string in layer.name()
+                ),
+                None,
+            )
+
+        return self._segment_layers[key]
+
+    def layer_by_node_name(
+        self,
+        node_name: str,
+        search_type: LayerNodeSearch = LayerNodeSearch.EXACT_MATCH,
+        group_name: str = "",
+    ) -> typing.Optional[QgsMapLayer]:
+        """Gets the layer of the first layer tree node matching the given
+        name.
+
+        :param node_name: Name of the layer tree node.
+        :type node_name: str
+
+        :param search_type: Whether to match the exact name or a
+        segment of the name.
+        :type search_type: LayerNodeSearch
+
+        :param group_name: Limit the search to the nodes in the groups
+        with the given name.
+        :type group_name: str
+
+        :returns: The layer of the first matching node or None if
+        not found.
+        :rtype: QgsMapLayer
+        """
+        self._ensure_index()
+        if not group_name and search_type == LayerNodeSearch.EXACT_MATCH:
+            return self._node_layers.get(node_name)
+
+        key = (f"{group_name}/{node_name}", node_name, search_type)
+        if key in self._segment_layers:
+            return self._segment_layers[key]
+
+        if group_name:
+            nodes = [
+                node for group in self._groups.get(group_name, []) for node in group
+            ]
+        else:
+            nodes = self._tree_layers
+
+        matching_layer = None
+        for name, layer in nodes:
+            if (search_type == LayerNodeSearch.EXACT_MATCH and name == node_name) or (
+                search_type == LayerNodeSearch.CONTAINS and node_name in name
+            ):
+                matching_layer = layer
+                break
+
+        self._segment_layers[key] = matching_layer
+
+        return matching_layer
+
+    def layer_by_clean_name(self, clean_name: str) -> typing.Optional[QgsMapLayer]:
+        """Gets the first map layer whose name, cleaned using
+        `clean_filename`, matches the given name.
+
+        :param clean_name: Cleaned layer name e.g. the file stem.
+        :type clean_name: str
+
+        :returns: The matching layer or None if not found.
+        :rtype: QgsMapLayer
+        """
+        self._ensure_index()
+        return self._clean_name_layers.get(clean_name)
@@ -6,7 +6,6 @@ Manager that handles report generation.
 import datetime
 import os
 from pathlib import Path
-import shutil
 import typing
 
 from qgis.core import (
@@ -20,8 +19,26 @@ from qgis.utils import iface
 
 from qgis.PyQt import QtCore, QtGui, sip
 
+from .atlas import ProjectInstanceAtlasTask
+from .basemap_cache import basemap_cache
 from .generator import SiteReportReportGeneratorTask
-from ...models.base import MapTemporalInfo
+from .process_pool import ProcessBatchReportTask
+from .profiler import write_chrome_trace, write_timings_json
+from .scheduler import BatchReportTask
+from .transform_cache import transform_cache
+from ...conf import settings_manager, Settings
+from ...definitions.defaults import (
+    BATCH_PROJECT_FILE_NAME,
+    DEFAULT_REPORT_EXPORT_PROFILE,
+    REPORT_TIMINGS_FILE_NAME,
+    REPORT_TRACE_FILE_NAME,
+)
+from ...models.base import (
+    ExportProfile,
+    LogLevel,
+    MapTemporalInfo,
+    ReportBatchMode,
+)
 from ...models.report import (
     ReportOutputResult,
     ReportSubmitResult,
@@ -57,6 +74,7 @@ class ReportManager(QtCore.QObject):
         metadata: typing.Union[SiteMetadata, ProjectMetadata],
         project_folder: str,
         temporal_info: MapTemporalInfo,
+        base_project_path: str = "",
     ) -> ReportSubmitResult:
         """Initiates the site report generation process.
 
@@ -69,6 +87,10 @@ class ReportManager(QtCore.QObject):
         :param temporal_info: Datetime range in the map canvas.
         :type temporal_info: MapTemporalInfo
 
+        :param base_project_path: Path of the project shared by all the
+        reports in a batch, see `prepare_batch_project`.
+        :type base_project_path: str
+
         :returns: Returns a result object with the status of the submission.
         :rtype: ReportSubmitResult
         """
@@ -77,7 +99,7 @@ class ReportManager(QtCore.QObject):
 
         feedback = QgsFeedback()
         context = self.create_site_context(
-            metadata, project_folder, feedback, temporal_info
+            metadata, project_folder, feedback, temporal_info, base_project_path
         )
         if context is None:
             log(
@@ -89,6 +111,172 @@ class ReportManager(QtCore.QObject):
         site_report_task = SiteReportReportGeneratorTask(context)
         return ReportSubmitResult(True, feedback, None, site_report_task)
 
+    def generate_atlas_report(
+        self,
+        farmers: typing.List[ProjectMetadata],
+        project_folder: str,
+        temporal_info: MapTemporalInfo,
+        base_project_path: str,
+        combined: bool = False,
+    ) -> ReportSubmitResult:
+        """Initiates the generation of the farmer reports using one
+        layout atlas.
+
+        :param farmers: Information about the farmers.
+        :type farmers: list
+
+        :param project_folder: Path of the project directory.
+        :type project_folder: str
+
+        :param temporal_info: Datetime range in the map canvas.
+        :type temporal_info: MapTemporalInfo
+
+        :param base_project_path: Path of the project shared by all the
+        reports in a batch, see `prepare_batch_project`.
+        :type base_project_path: str
+
+        :param combined: True to export the reports to one combined PDF
+        else one PDF is exported per farmer.
+        :type combined: bool
+
+        :returns: Returns a result object with the status of the submission.
+        :rtype: ReportSubmitResult
+        """
+        if not Path(project_folder).exists() or not farmers:
+            return ReportSubmitResult(False, None, "-1")
+
+        feedback = QgsFeedback()
+        context = self.create_site_context(
+            farmers[0], project_folder, feedback, temporal_info, base_project_path
+        )
+        if context is None:
+            log(
+                f"Contextual information for creating the farmer reports "
+                f"could not be created.",
+                info=False,
+            )
+            return ReportSubmitResult(False, None, "-1")
+
+        atlas_task = ProjectInstanceAtlasTask(context, farmers, combined)
+        return ReportSubmitResult(True, feedback, None, atlas_task)
+
+    def generate_batch_report(
+        self,
+        farmers: typing.Iterable[ProjectMetadata],
+        project_folder: str,
+        temporal_info: MapTemporalInfo,
+        base_project_path: str,
+        farmer_count: int = 0,
+    ) -> ReportSubmitResult:
+        """Initiates the generation of one report per farmer using a
+        streaming batch task which keeps a bounded number of reports
+        in flight.
+
+        :param farmers: Information about the farmers, can be a generator.
+        :type farmers: typing.Iterable
+
+        :param project_folder: Path of the project directory.
+        :type project_folder: str
+
+        :param temporal_info: Datetime range in the map canvas.
+        :type temporal_info: MapTemporalInfo
+
+        :param base_project_path: Path of the project shared by all the
+        reports in a batch, see `prepare_batch_project`.
+        :type base_project_path: str
+
+        :param farmer_count: Number of farmers, used for the progress.
+        :type farmer_count: int
+
+        :returns: Returns a result object with the status of the submission.
+        :rtype: ReportSubmitResult
+        """
+        if not Path(project_folder).exists() or not base_project_path:
+            return ReportSubmitResult(False, None, "-1")
+
+        # The per-farmer contexts are derived from this one when each
+        # report is started, no per-farmer project copies are written.
+        feedback = QgsFeedback()
+        context = self.create_site_context(
+            ProjectMetadata("", "", "", "", ""),
+            project_folder,
+            feedback,
+            temporal_info,
+            base_project_path,
+            project_copy=False,
+        )
+        if context is None:
+            log(
+                f"Contextual information for creating the farmer reports "
+                f"could not be created.",
+                info=False,
+            )
+            return ReportSubmitResult(False, None, "-1")
+
+        batch_task = BatchReportTask(
+            farmers, context, self.worker_count(), farmer_count
+        )
+        return ReportSubmitResult(True, feedback, None, batch_task)
+
+    def generate_process_batch_report(
+        self,
+        farmers: typing.List[ProjectMetadata],
+        project_folder: str,
+        temporal_info: MapTemporalInfo,
+        base_project_path: str,
+        site_layer_path: str,
+    ) -> ReportSubmitResult:
+        """Initiates the generation of one report per farmer using
+        several headless QGIS processes, one per worker.
+
+        :param farmers: Information about the farmers.
+        :type farmers: list
+
+        :param project_folder: Path of the project directory.
+        :type project_folder: str
+
+        :param temporal_info: Datetime range in the map canvas.
+        :type temporal_info: MapTemporalInfo
+
+        :param base_project_path: Path of the project loaded by the
+        worker processes, see `prepare_batch_project`.
+        :type base_project_path: str
+
+        :param site_layer_path: Path of the project instances layer.
+        :type site_layer_path: str
+
+        :returns: Returns a result object with the status of the submission.
+        :rtype: ReportSubmitResult
+        """
+        if (
+            not Path(project_folder).exists()
+            or not base_project_path
+            or not site_layer_path
+        ):
+            return ReportSubmitResult(False, None, "-1")
+
+        feedback = QgsFeedback()
+        context = self.create_site_context(
+            ProjectMetadata("", "", "", "", ""),
+            project_folder,
+            feedback,
+            temporal_info,
+            base_project_path,
+            project_copy=False,
+        )
+        if context is None:
+            log(
+                f"Contextual information for creating the farmer reports "
+                f"could not be created.",
+                info=False,
+            )
+            return ReportSubmitResult(False, None, "-1")
+
+        process_task = ProcessBatchReportTask(
+            farmers, context, site_layer_path, self.worker_count()
+        )
+        return ReportSubmitResult(True, feedback, None, process_task)
+
     def task_by_id(
         self, task_id: str
     ) -> typing.Optional[SiteReportReportGeneratorTask]:
@@ -153,6 +341,8 @@ class ReportManager(QtCore.QObject):
         project_folder: str,
         feedback: QgsFeedback,
         temporal_info: MapTemporalInfo,
+        base_project_path: str = "",
+        project_copy: bool = True,
     ) -> typing.Optional[SiteReportContext]:
         """Creates the contextual information required for generating the report.
 
@@ -169,6 +359,15 @@ class ReportManager(QtCore.QObject):
         :param temporal_info: Datetime range in the map canvas.
         :type temporal_info: MapTemporalInfo
 
+        :param base_project_path: Path of the project shared by the
+        reports in a batch. If specified, a copy of the project is only
+        written for the report if enabled in the settings.
+        :type base_project_path: str
+
+        :param project_copy: False to never write a copy of the project
+        for the report, requires the base project path.
+        :type project_copy: bool
+
         :returns: Returns a context object containing required
         information for generating the report or None if it
         could not be created.
@@ -181,9 +380,10 @@ class ReportManager(QtCore.QObject):
             if isinstance(metadata, SiteMetadata)
             else FileUtils.project_instance_report_template_path()
         )
-        verbose = False
-        if verbose:
-            log(f"Using this report template: {report_template_path}", info=False)
+        log(
+            f"Using this report template: {report_template_path}",
+            level=LogLevel.DEBUG,
+        )
         if not Path(report_template_path).exists():
             log(f"Report template {report_template_path} not found.", info=False)
             return None
@@ -214,19 +414,16 @@ class ReportManager(QtCore.QObject):
             )
             return None
 
-        # Save the project file in the current location then copy
-        # the project file for use in the report.
-        storage_type = None
-        if Qgis.versionInt() >= 32200:
-            storage_type = QgsProject.instance().filePathStorage()
-            QgsProject.instance().setFilePathStorage(Qgis.FilePathType.Absolute)
-
-        current_qgs_project_path = QgsProject.instance().absoluteFilePath()
-        if not current_qgs_project_path:
+        # The copies of the reports in a batch are written from the
+        # batch project, which might be used without a current project.
+        source_project_path = (
+            base_project_path or QgsProject.instance().absoluteFilePath()
+        )
+        if not source_project_path:
             log(f"Unable to retrieve the file path of the current project.", info=False)
             return None
 
-        # Copy project file to 'reports' folder
+        # Serialize the current project to the 'reports' folder
         try:
             report_qgs_project_path = (
                 os.path.normpath(
@@ -240,15 +437,46 @@ class ReportManager(QtCore.QObject):
         except TypeError:
             log("FarmerID is None or invalid")
             return None
-        try:
-            shutil.copy(current_qgs_project_path, report_qgs_project_path)
-        except (OSError, shutil.SameFileError):
+
+        write_copy = not base_project_path or (
+            project_copy
+            and settings_manager.get_value(
+                Settings.REPORT_PROJECT_COPIES, default=False, setting_type=bool
+            )
+        )
+        if write_copy and not cls.write_project_copy(
+            report_qgs_project_path, base_project_path
+        ):
             log(f"Unable to copy the project file in the 'reports' folder.", info=False)
             return None
 
-        # Reset to the original file storage type
-        if Qgis.versionInt() >= 32200 and storage_type is not None:
-            QgsProject.instance().setFilePathStorage(storage_type)
+        use_basemap_cache = settings_manager.get_value(
+            Settings.REPORT_BASEMAP_CACHE, default=True, setting_type=bool
+        )
+        site_layer_path = settings_manager.get_value(
+            (
+                Settings.LAST_SITE_LAYER_PATH
+                if isinstance(metadata, SiteMetadata)
+                else Settings.CURRENT_PROJECT_LAYER_PATH
+            ),
+            default="",
+        )
+        # Layers in a GeoPackage have the layer name after the path
+        site_layer_path = site_layer_path.split("|")[0]
+
+        if base_project_path:
+            return SiteReportContext(
+                metadata,
+                feedback,
+                project_folder,
+                base_project_path,
+                report_template_path,
+                temporal_info,
+                shared_project=True,
+                export_profile=cls.export_profile(),
+                basemap_cache=use_basemap_cache,
+                site_layer_path=site_layer_path,
+            )
 
         return SiteReportContext(
             metadata,
@@ -257,6 +485,215 @@ class ReportManager(QtCore.QObject):
             report_qgs_project_path,
             report_template_path,
             temporal_info,
+            export_profile=cls.export_profile(),
+            basemap_cache=use_basemap_cache,
+            site_layer_path=site_layer_path,
+        )
+
+    @classmethod
+    def prepare_batch_project(cls, project_folder: str) -> str:
+        """Serializes the current project once for use by all the
+        reports in a batch.
+
+        :param project_folder: Path of the project directory.
+        :type project_folder: str
+
+        :returns: Returns the path of the batch project or an empty
+        string if it could not be written.
+        :rtype: str
+        """
+        if not QgsProject.instance().absoluteFilePath():
+            log(f"Unable to retrieve the file path of the current project.", info=False)
+            return ""
+
+        main_reports_dir = os.path.normpath(f"{project_folder}/reports")
+        create_dir(main_reports_dir)
+
+        batch_project_path = os.path.normpath(
+            f"{main_reports_dir}/{BATCH_PROJECT_FILE_NAME}"
+        )
+
+        if not cls.write_project_copy(batch_project_path):
+            log(f"Unable to write the batch project file.", info=False)
+            return ""
+
+        return batch_project_path
+
+    @classmethod
+    def write_project_copy(cls, project_path: str, source_path: str = "") -> bool:
+        """Writes a copy of the saved current project, or of the given
+        project file, to the given path with absolute layer paths.
+
+        Copying the project file as-is is not sufficient since the
+        report tasks read the copy from the 'reports' folder, hence
+        relative layer paths would resolve to the wrong sources. The
+        saved project file is read into a separate project which is
+        written with absolute paths, the current project is not
+        modified and its save hooks are not triggered.
+
+        :param project_path: Path of the project copy.
+        :type project_path: str
+
+        :param source_path: Path of the project file to copy, defaults
+        to the file of the current project.
+        :type source_path: str
+
+        :returns: True if the copy was successfully written, else False.
+        :rtype: bool
+        """
+        current_project_path = source_path or QgsProject.instance().absoluteFilePath()
+        if not current_project_path:
+            return False
+
+        if not source_path and QgsProject.instance().isDirty():
+            log(
+                "The current project has unsaved changes, "
+                "they are not included in the reports.",
+                info=False,
+            )
+
+        project = QgsProject()
+        if not project.read(current_project_path):
+            log(f"Unable to read the project {current_project_path}.", info=False)
+            return False
+
+        if Qgis.versionInt() >= 32200:
+            project.setFilePathStorage(Qgis.FilePathType.Absolute)
+        else:
+            project.writeEntryBool("Paths", "/Absolute", True)
+
+        return project.write(project_path)
+
+    @classmethod
+    def worker_count(cls) -> int:
+        """Returns the number of reports that can be generated
+        concurrently in a batch.
+
+        The value is read from the plugin settings, if not set (or
+        set to zero) then the number of processor cores minus one
+        is used.
+
+        :returns: Number of concurrent report tasks, at least one.
+        :rtype: int
+        """
+        default_count = max(1, (os.cpu_count() or 2) - 1)
+        count = settings_manager.get_value(
+            Settings.REPORT_CONCURRENCY, default=0, setting_type=int
+        )
+        if count is None or count <= 0:
+            return default_count
+
+        return count
+
+    @classmethod
+    def export_profile(cls) -> ExportProfile:
+        """Returns the profile for exporting the reports to PDF.
+
+        The profile is read from the plugin settings, the standard
+        profile is used if the setting is not set or is invalid.
+
+        :returns: PDF export profile.
+        :rtype: ExportProfile
+        """
+        profile_name = settings_manager.get_value(
+            Settings.REPORT_EXPORT_PROFILE, default=DEFAULT_REPORT_EXPORT_PROFILE
+        )
+        try:
+            return ExportProfile(str(profile_name).lower())
+        except ValueError:
+            log(f"Invalid report export profile '{profile_name}'", info=False)
+            return ExportProfile(DEFAULT_REPORT_EXPORT_PROFILE)
+
+    @classmethod
+    def batch_mode(cls) -> ReportBatchMode:
+        """Returns the mechanism for generating the farmer reports.
+
+        :returns: Batch mode from the plugin settings, defaults to one
+        report task per farmer.
+        :rtype: ReportBatchMode
+        """
+        mode_name = settings_manager.get_value(
+            Settings.REPORT_BATCH_MODE, default=ReportBatchMode.TASKS.value
+        )
+        try:
+            return ReportBatchMode(str(mode_name).lower())
+        except ValueError:
+            log(f"Invalid report batch mode '{mode_name}'", info=False)
+            return ReportBatchMode.TASKS
+
+    @classmethod
+    def export_timings(
+        cls, results: typing.List[ReportOutputResult], project_folder: str
+    ) -> str:
+        """Writes the stage timings of the reports in a batch to the
+        reports folder, in the format specified in the settings.
+
+        :param results: Results of the report tasks in a batch.
+        :type results: list
+
+        :param project_folder: Path of the project directory.
+        :type project_folder: str
+
+        :returns: Path of the timings file or an empty string if the
+        timings were not written.
+        :rtype: str
+        """
+        timings_format = str(
+            settings_manager.get_value(Settings.REPORT_TIMINGS_FORMAT, default="json")
+        ).lower()
+        if timings_format not in ("json", "chrome") or not results:
+            return ""
+
+        reports_dir = os.path.normpath(f"{project_folder}/reports")
+        if not os.path.isdir(reports_dir):
+            return ""
+
+        if timings_format == "chrome":
+            timings_path = os.path.join(reports_dir, REPORT_TRACE_FILE_NAME)
+            written = write_chrome_trace(results, timings_path, cls.cache_stats())
+        else:
+            timings_path = os.path.join(reports_dir, REPORT_TIMINGS_FILE_NAME)
+            written = write_timings_json(results, timings_path, cls.cache_stats())
+
+        return timings_path if written else ""
+
+    @classmethod
+    def cache_stats(cls) -> typing.Dict[str, typing.Dict[str, int]]:
+        """Gets the hit and miss counters of the caches shared by the
+        report tasks.
+
+        :returns: Counters (value) indexed by the cache name (key).
+        :rtype: dict
+        """
+        return {
+            "basemaps": basemap_cache.stats,
+            "transforms": transform_cache.stats,
+        }
+
+    @classmethod
+    def export_summary(cls, results: typing.List[ReportOutputResult]) -> str:
+        """Summarizes the PDF export time and size of the given
+        report results.
+
+        :param results: Results of the report tasks in a batch.
+        :type results: list
+
+        :returns: Summary of the number of exported reports, the total
+        and average export time and the total PDF size.
+        :rtype: str
+        """
+        exported = [result for result in results if result.pdf_size > 0]
+        if not exported:
+            return "No reports exported."
+
+        total_duration = sum(result.export_duration for result in exported)
+        total_size = sum(result.pdf_size for result in exported)
+
+        return (
+            f"Exported {len(exported)} report(s) using the "
+            f"'{cls.export_profile().value}' profile in {total_duration:.2f}s "
+            f"(average {total_duration / len(exported):.2f}s per report), "
+            f"total PDF size {total_size / (1024 * 1024):.2f} MB."
         )
 
     def remove_report_task(self, task_id: str) -> bool:
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Manifest of the content fingerprints of the generated reports.
+"""
+
+import datetime
+import hashlib
+import os
+import threading
+import typing
+
+from .jsonl_store import JsonlStore
+from ...definitions.defaults import REPORT_MANIFEST_FILE_NAME
+
+
+_file_digests_lock = threading.Lock()
+
+# Tuple of file modification time and digest (value) indexed by
+# the normalized file path (key).
+_file_digests: typing.Dict[str, typing.Tuple[float, str]] = {}
+
+
+def file_digest(file_path: str) -> str:
+    """Computes the SHA-256 digest of the file contents.
+
+    Digests are cached until the modification time of the file changes.
+
+    :param file_path: Path to the file.
+    :type file_path: str
+
+    :returns: The hexadecimal digest or an empty string if the file
+    could not be read.
+    :rtype: str
+    """
+    normalized_path = os.path.normpath(file_path)
+    try:
+        modified_time = os.path.getmtime(normalized_path)
+    except OSError:
+        return ""
+
+    with _file_digests_lock:
+        entry = _file_digests.get(normalized_path)
+    if entry is not None and entry[0] == modified_time:
+        return entry[1]
+
+    hasher = hashlib.sha256()
+    try:
+        with open(normalized_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                hasher.update(chunk)
+    except OSError:
+        return ""
+
+    digest = hasher.hexdigest()
+    with _file_digests_lock:
+        _file_digests[normalized_path] = (modified_time, digest)
+
+    return digest
+
+
+class ReportManifest(JsonlStore):
+    """Records the fingerprint of the inputs used to generate each
+    report in the reports folder, keyed by the report name.
+    """
+
+    file_name = REPORT_MANIFEST_FILE_NAME
+    key_field = "name"
+    description = "report manifest"
+
+    def fingerprint(self, report_name: str) -> str:
+        """Gets the fingerprint recorded for the given report.
+
+        :param report_name: Name of the report.
+        :type report_name: str
+
+        :returns: The fingerprint or an empty string if the report
+        is not in the manifest.
+        :rtype: str
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(report_name)
+
+        return entry.get("fingerprint", "") if entry else ""
+
+    def is_current(self, report_name: str, fingerprint: str, pdf_path: str) -> bool:
+        """Checks whether the report exists and was generated from
+        inputs with the given fingerprint.
+
+        :param report_name: Name of the report.
+        :type report_name: str
+
+        :param fingerprint: Fingerprint of the current report inputs.
+        :type fingerprint: str
+
+        :param pdf_path: Path of the report PDF file.
+        :type pdf_path: str
+
+        :returns: True if the report does not need to be regenerated.
+        :rtype: bool
+        """
+        if not fingerprint or not os.path.exists(pdf_path):
+            return False
+
+        # The entries are cleared if the manifest file was removed to
+        # force the reports to be rebuilt.
+        return self.fingerprint(report_name) == fingerprint
+
+    def update(self, report_name: str, fingerprint: str, pdf_path: str):
+        """Records the fingerprint of a generated report.
+
+        :param report_name: Name of the report.
+        :type report_name: str
+
+        :param fingerprint: Fingerprint of the report inputs.
+        :type fingerprint: str
+
+        :param pdf_path: Path of the report PDF file.
+        :type pdf_path: str
+        """
+        entry = {
+            "name": report_name,
+            "fingerprint": fingerprint,
+            "pdf": os.path.basename(pdf_path),
+            "updated": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            self._refresh()
+            self._append([entry])
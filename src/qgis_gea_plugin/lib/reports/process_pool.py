@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-process backend for the farmer reports in a batch.
+"""
+
+import dataclasses
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import typing
+
+import qgis
+from qgis.core import NULL, QgsTask
+
+from qgis.PyQt import QtCore
+
+from .journal import BatchJournal
+from ...definitions.defaults import (
+    BATCH_CANCEL_GRACE_PERIOD,
+    BATCH_POLL_INTERVAL,
+    REPORT_WORKER_FILE_PREFIX,
+)
+from ...models.base import LogLevel
+from ...models.report import (
+    ProjectMetadata,
+    ReportOutputResult,
+    SiteReportContext,
+    StageTiming,
+)
+from ...utils import FileUtils, is_log_enabled, log, tr
+
+
+def result_to_dict(result: ReportOutputResult) -> dict:
+    """Converts a report result to a JSON serializable dictionary.
+
+    :param result: Report result.
+    :type result: ReportOutputResult
+
+    :returns: Dictionary with the fields of the result.
+    :rtype: dict
+    """
+    return dataclasses.asdict(result)
+
+
+def result_from_dict(values: dict) -> ReportOutputResult:
+    """Creates a report result from a dictionary created by
+    `result_to_dict`.
+
+    :param values: Fields of the result.
+    :type values: dict
+
+    :returns: Report result.
+    :rtype: ReportOutputResult
+    """
+    values = dict(values)
+    values["errors"] = tuple(values.get("errors", ()))
+    values["timings"] = tuple(
+        StageTiming(**timing) for timing in values.get("timings", ())
+    )
+
+    return ReportOutputResult(**values)
+
+
+# Fields of the farmer metadata read as-is from the attributes of the
+# project instances layer, they can be a QDate or a NULL value.
+METADATA_ATTRIBUTE_FIELDS = (
+    "farmer_id",
+    "inception_date",
+    "project",
+    "author",
+    "total_area",
+)
+
+
+def metadata_to_dict(metadata: ProjectMetadata) -> dict:
+    """Converts the metadata of a farmer to a JSON serializable
+    dictionary.
+
+    Dates are written as ``{"date": "yyyy-MM-dd"}`` and NULL attribute
+    values as None so that `metadata_from_dict` can restore them.
+
+    :param metadata: Metadata of the farmer.
+    :type metadata: ProjectMetadata
+
+    :returns: Dictionary with the fields of the metadata.
+    :rtype: dict
+    """
+    values = {
+        field.name: getattr(metadata, field.name)
+        for field in dataclasses.fields(metadata)
+    }
+    for name in METADATA_ATTRIBUTE_FIELDS:
+        value = values[name]
+        if isinstance(value, QtCore.QDate):
+            values[name] = {"date": value.toString(QtCore.Qt.ISODate)}
+        elif isinstance(value, QtCore.QVariant) and value.isNull():
+            values[name] = None
+
+    return values
+
+
+def metadata_from_dict(values: dict) -> ProjectMetadata:
+    """Creates the metadata of a farmer from a dictionary created by
+    `metadata_to_dict`.
+
+    :param values: Fields of the metadata.
+    :type values: dict
+
+    :returns: Metadata of the farmer.
+    :rtype: ProjectMetadata
+    """
+    values = dict(values)
+    if values.get("site_extent") is not None:
+        values["site_extent"] = tuple(values["site_extent"])
+    for name in METADATA_ATTRIBUTE_FIELDS:
+        value = values.get(name)
+        if isinstance(value, dict):
+            values[name] = QtCore.QDate.fromString(value["date"], QtCore.Qt.ISODate)
+        elif value is None:
+            values[name] = NULL
+
+    return ProjectMetadata(**values)
+
+
+class WorkerEventWriter:
+    """Writes the events of a report worker process as JSON lines to
+    its standard output, where they are read by the parent
+    `ProcessBatchReportTask`.
+
+    It takes the place of the batch journal in the worker so that the
+    journal is only written by the parent process.
+    """
+
+    def __init__(self, stream: typing.TextIO = None):
+        self._stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def _write(self, event: dict):
+        """Writes one event, events can be written from any thread."""
+        with self._lock:
+            self._stream.write(f"{json.dumps(event)}\n")
+            self._stream.flush()
+
+    def start(self, farmer_id: typing.Any):
+        """Writes the event of a report being started.
+
+        :param farmer_id: ID of the farmer.
+        :type farmer_id: typing.Any
+        """
+        self._write({"event": "started", "farmer_id": str(farmer_id)})
+
+    def finish(
+        self,
+        farmer_id: typing.Any,
+        success: bool,
+        duration: float,
+        errors: typing.Iterable[str] = (),
+    ):
+        """Writes the event of a report being finished.
+
+        :param farmer_id: ID of the farmer.
+        :type farmer_id: typing.Any
+
+        :param success: Whether the report was generated.
+        :type success: bool
+
+        :param duration: Duration of the report generation, in seconds.
+        :type duration: float
+
+        :param errors: Error messages of the report.
+        :type errors: typing.Iterable
+        """
+        self._write(
+            {
+                "event": "finished",
+                "farmer_id": str(farmer_id),
+                "success": success,
+                "duration": duration,
+                "errors": list(errors),
+            }
+        )
+
+    def report(self, result: ReportOutputResult):
+        """Writes the result of a report.
+
+        :param result: Report result.
+        :type result: ReportOutputResult
+        """
+        self._write({"event": "result", "result": result_to_dict(result)})
+
+
+def python_executable() -> str:
+    """Returns the Python interpreter used to start the report workers.
+
+    Within QGIS, `sys.executable` can be the QGIS executable rather
+    than the Python interpreter it embeds.
+
+    :returns: Path of the Python interpreter.
+    :rtype: str
+    """
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return sys.executable
+
+    if sys.platform == "win32":
+        candidate = os.path.join(sys.exec_prefix, "python.exe")
+    else:
+        candidate = os.path.join(sys.exec_prefix, "bin", "python3")
+    if os.path.exists(candidate):
+        return candidate
+
+    return shutil.which("python3") or shutil.which("python") or sys.executable
+
+
+class ProcessBatchReportTask(QgsTask):
+    """Generates the farmer reports of a batch using several headless
+    QGIS processes.
+
+    The farmers are split in one shard per process, each process runs
+    the batch runner in worker mode which generates the reports of its
+    shard one at a time. The shard has the metadata of the farmers
+    computed by the parent, so the workers neither read the project
+    instances layer nor load the project other than for the reports. The results and
+    progress are streamed back through the standard output of the
+    processes, and the parent records them in the batch journal.
+    """
+
+    report_finished = QtCore.pyqtSignal(object)
+
+    def __init__(
+        self,
+        farmers: typing.List[ProjectMetadata],
+        context: SiteReportContext,
+        site_layer_path: str,
+        process_count: int,
+    ):
+        """
+        :param farmers: Farmers whose reports are to be generated.
+        :type farmers: list
+
+        :param context: Context of the batch, its project should be the
+        batch project shared by the reports.
+        :type context: SiteReportContext
+
+        :param site_layer_path: Path of the project instances layer.
+        :type site_layer_path: str
+
+        :param process_count: Number of worker processes.
+        :type process_count: int
+        """
+        super().__init__(tr("Generating farmer reports"))
+        self._farmers = list(farmers)
+        self._context = context
+        self._site_layer_path = site_layer_path
+        self._process_count = max(1, min(process_count, len(self._farmers)))
+        self._results: typing.List[ReportOutputResult] = []
+        self._lock = threading.Lock()
+        self._journal = BatchJournal.for_directory(context.report_dir)
+
+        self._context.feedback.canceled.connect(self.cancel)
+
+    @property
+    def results(self) -> typing.List[ReportOutputResult]:
+        """Gets the results of the reports generated so far.
+
+        :returns: Results of the reports, in the order of completion.
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._results)
+
+    def _worker_command(self, index: int, shard_path: str) -> typing.List[str]:
+        """Returns the command line of the worker process."""
+        log_level = next(
+            (level for level in sorted(LogLevel) if is_log_enabled(level)),
+            LogLevel.WARNING,
+        )
+        return [
+            python_executable(),
+            "-m",
+            "qgis_gea_plugin.batch",
+            self._context.qgs_project_path,
+            "--layer",
+            self._site_layer_path,
+            "--output",
+            self._context.project_dir,
+            "--workers",
+            "1",
+            "--profile",
+            self._context.export_profile.value,
+            "--log-level",
+            log_level.name.lower(),
+            "--log-file",
+            os.path.join(
+                self._context.report_dir, f"{REPORT_WORKER_FILE_PREFIX}{index}.log"
+            ),
+            "--farmer-file",
+            shard_path,
+            "--worker",
+        ]
+
+    @classmethod
+    def _worker_environment(cls) -> typing.Dict[str, str]:
+        """Returns the environment of the worker processes, where the
+        plugin and the QGIS Python packages can be imported.
+        """
+        environment = os.environ.copy()
+        python_paths = [
+            os.path.dirname(FileUtils.plugin_dir()),
+            os.path.dirname(os.path.dirname(qgis.__file__)),
+        ]
+        if environment.get("PYTHONPATH"):
+            python_paths.append(environment["PYTHONPATH"])
+        environment["PYTHONPATH"] = os.pathsep.join(python_paths)
+
+        return environment
+
+    def _start_workers(self, events: queue.Queue) -> typing.List[subprocess.Popen]:
+        """Starts one worker process per shard of farmers and the threads
+        reading their events into the given queue.
+        """
+        workers = []
+        environment = self._worker_environment()
+        for index in range(self._process_count):
+            shard = [
+                metadata_to_dict(metadata)
+                for metadata in self._farmers[index :: self._process_count]
+            ]
+            shard_path = os.path.join(
+                self._context.report_dir, f"{REPORT_WORKER_FILE_PREFIX}{index}.json"
+            )
+            with open(shard_path, "w", encoding="utf-8") as shard_file:
+                json.dump(shard, shard_file)
+
+            process = subprocess.Popen(
+                self._worker_command(index, shard_path),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=environment,
+                text=True,
+                encoding="utf-8",
+            )
+            reader = threading.Thread(
+                target=self._read_events,
+                args=(index, process, events),
+                name=f"report-worker-{index}",
+                daemon=True,
+            )
+            reader.start()
+            workers.append(process)
+            log(f"Started report worker {index} for {len(shard)} farmer(s).")
+
+        return workers
+
+    @classmethod
+    def _read_events(cls, index: int, process: subprocess.Popen, events: queue.Queue):
+        """Reads the events of a worker process until it exits."""
+        for line in process.stdout:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # Output of the libraries loaded by the worker
+                continue
+            if isinstance(event, dict) and "event" in event:
+                events.put((index, event))
+
+        events.put((index, None))
+
+    def _stop_workers(self, workers: typing.List[subprocess.Popen]):
+        """Terminates the worker processes, and kills those which are
+        still running after the grace period.
+        """
+        for process in workers:
+            if process.poll() is None:
+                process.terminate()
+
+        deadline = time.monotonic() + BATCH_CANCEL_GRACE_PERIOD
+        for process in workers:
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _handle_event(self, event: dict) -> bool:
+        """Records an event of a worker process.
+
+        :returns: True if the event is the result of a report.
+        :rtype: bool
+        """
+        if event["event"] == "started":
+            self._journal.start(event["farmer_id"])
+        elif event["event"] == "finished":
+            self._journal.finish(
+                event["farmer_id"],
+                event["success"],
+                event["duration"],
+                event["errors"],
+            )
+        elif event["event"] == "result":
+            result = result_from_dict(event["result"])
+            with self._lock:
+                self._results.append(result)
+            self.report_finished.emit(result)
+            return True
+
+        return False
+
+    def run(self) -> bool:
+        """Generates the reports of the farmers in the batch.
+
+        :returns: True if all the reports were generated, else False.
+        :rtype: bool
+        """
+        if not self._farmers:
+            return True
+
+        events = queue.Queue()
+        try:
+            workers = self._start_workers(events)
+        except OSError as e:
+            log(f"Unable to start the report workers, {e}", info=False)
+            return False
+
+        completed = 0
+        running = len(workers)
+        while running > 0:
+            if self.isCanceled():
+                log("Stopping the report workers.")
+                self._stop_workers(workers)
+                break
+
+            try:
+                _, event = events.get(timeout=BATCH_POLL_INTERVAL / 1000)
+            except queue.Empty:
+                continue
+
+            if event is None:
+                running -= 1
+            elif self._handle_event(event):
+                completed += 1
+                self.setProgress(min(100.0, completed * 100 / len(self._farmers)))
+
+        success = not self.isCanceled()
+        for index, process in enumerate(workers):
+            exit_code = process.wait()
+            if exit_code != 0:
+                success = False
+                log(f"Report worker {index} exited with code {exit_code}.", info=False)
+            try:
+                os.remove(
+                    os.path.join(
+                        self._context.report_dir,
+                        f"{REPORT_WORKER_FILE_PREFIX}{index}.json",
+                    )
+                )
+            except OSError:
+                pass
+
+        with self._lock:
+            success = success and all(result.success for result in self._results)
+            success = success and len(self._results) == len(self._farmers)
+
+        log(
+            f"Batch completed, {completed} report(s) processed by {len(workers)} workers."
+        )
+
+        return success
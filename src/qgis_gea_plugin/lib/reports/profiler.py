@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Span timings of the report generation stages.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+import typing
+
+from ...models.report import ReportOutputResult, StageTiming
+from ...utils import log
+
+
+# Reference for the start time of the spans so that the spans of all
+# the reports generated in the same session share the same timeline.
+_EPOCH = time.perf_counter()
+
+
+class ReportProfiler:
+    """Records the duration of the stages of a report generation
+    process as a list of spans.
+
+    Spans are recorded by the thread running the report task, use
+    `span` as a context manager around each stage.
+    """
+
+    def __init__(self):
+        self._timings: typing.List[StageTiming] = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "stage"):
+        """Records the time taken by the enclosed block.
+
+        :param name: Name of the stage or item being timed.
+        :type name: str
+
+        :param category: Category of the span e.g. stage or map item.
+        :type category: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._timings.append(
+                StageTiming(
+                    name,
+                    category,
+                    start - _EPOCH,
+                    end - start,
+                    threading.get_ident(),
+                )
+            )
+
+    def timings(self) -> typing.Tuple[StageTiming, ...]:
+        """Gets the spans recorded so far.
+
+        :returns: Recorded spans, in the order they were completed.
+        :rtype: tuple
+        """
+        return tuple(self._timings)
+
+
+def aggregate_timings(
+    results: typing.List[ReportOutputResult],
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    """Aggregates the span timings of the reports in a batch.
+
+    :param results: Results of the report tasks in a batch.
+    :type results: list
+
+    :returns: Count, total, mean and maximum duration in seconds
+    (value) indexed by the span category and name (key).
+    :rtype: dict
+    """
+    aggregates = {}
+    for result in results:
+        for timing in result.timings:
+            key = f"{timing.category}/{timing.name}"
+            aggregate = aggregates.setdefault(
+                key, {"count": 0, "total": 0.0, "mean": 0.0, "max": 0.0}
+            )
+            aggregate["count"] += 1
+            aggregate["total"] += timing.duration
+            aggregate["max"] = max(aggregate["max"], timing.duration)
+
+    for aggregate in aggregates.values():
+        aggregate["mean"] = aggregate["total"] / aggregate["count"]
+
+    return dict(sorted(aggregates.items(), key=lambda item: -item[1]["total"]))
+
+
+def write_timings_json(
+    results: typing.List[ReportOutputResult],
+    path: str,
+    cache_stats: typing.Optional[typing.Dict[str, typing.Dict[str, int]]] = None,
+) -> bool:
+    """Writes the span timings of each report and their aggregates
+    to a JSON file.
+
+    :param results: Results of the report tasks in a batch.
+    :type results: list
+
+    :param path: Path of the JSON file.
+    :type path: str
+
+    :param cache_stats: Hit and miss counters (value) indexed by the
+    cache name (key).
+    :type cache_stats: dict
+
+    :returns: True if the file was written, else False.
+    :rtype: bool
+    """
+    content = {
+        "aggregates": aggregate_timings(results),
+        "caches": cache_stats or {},
+        "reports": [
+            {
+                "name": result.name,
+                "success": result.success,
+                "export_duration": result.export_duration,
+                "pdf_size": result.pdf_size,
+                "timings": [
+                    {
+                        "name": timing.name,
+                        "category": timing.category,
+                        "start": timing.start,
+                        "duration": timing.duration,
+                    }
+                    for timing in result.timings
+                ],
+            }
+            for result in results
+        ],
+    }
+
+    return _write_json(content, path)
+
+
+def write_chrome_trace(
+    results: typing.List[ReportOutputResult],
+    path: str,
+    cache_stats: typing.Optional[typing.Dict[str, typing.Dict[str, int]]] = None,
+) -> bool:
+    """Writes the span timings of the reports as a trace file which
+    can be opened in chrome://tracing or Perfetto.
+
+    :param results: Results of the report tasks in a batch.
+    :type results: list
+
+    :param path: Path of the trace file.
+    :type path: str
+
+    :param cache_stats: Hit and miss counters (value) indexed by the
+    cache name (key), written as the trace metadata.
+    :type cache_stats: dict
+
+    :returns: True if the file was written, else False.
+    :rtype: bool
+    """
+    events = [
+        {
+            "name": timing.name,
+            "cat": timing.category,
+            "ph": "X",
+            "ts": round(timing.start * 1e6),
+            "dur": round(timing.duration * 1e6),
+            "pid": os.getpid(),
+            "tid": timing.thread_id,
+            "args": {"report": result.name},
+        }
+        for result in results
+        for timing in result.timings
+    ]
+
+    return _write_json(
+        {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"caches": cache_stats or {}},
+        },
+        path,
+    )
+
+
+def _write_json(content: dict, path: str) -> bool:
+    """Writes the content to a JSON file."""
+    try:
+        with open(path, "w", encoding="utf-8") as json_file:
+            json.dump(content, json_file, indent=2)
+    except OSError as e:
+        log(f"Unable to write report timings to {path}, {e}", info=False)
+        return False
+
+    log(f"Report timings written to {path}")
+
+    return True
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Pool of deserialized projects shared by the reports of a batch.
+"""
+
+import os
+import threading
+import typing
+
+from qgis.core import QgsProject
+
+from .layer_index import LayerTreeIndex
+from ...utils import log
+
+
+class ReportProjectPool:
+    """Keeps one deserialized copy of a batch project per worker thread
+    of a batch.
+
+    The base project of a batch is serialized once, the first report
+    generated in a given worker thread reads it and the subsequent
+    reports in the same thread reuse that copy together with its layer
+    index. Projects are never shared across threads since they are
+    bound to the thread that created them.
+
+    Each batch owns its pool and the projects are stored in thread
+    local storage, each worker thread should call `release` before it
+    exits so that its projects are deleted in the thread that created
+    them.
+    """
+
+    def __init__(self):
+        # Dictionary of file modification time, project and layer
+        # index (value) indexed by the normalized project path (key),
+        # in each thread.
+        self._local = threading.local()
+
+    def _projects(
+        self,
+    ) -> typing.Dict[str, typing.Tuple[float, QgsProject, LayerTreeIndex]]:
+        """Returns the projects of the current thread."""
+        if not hasattr(self._local, "projects"):
+            self._local.projects = {}
+
+        return self._local.projects
+
+    def get(
+        self, project_path: str
+    ) -> typing.Optional[typing.Tuple[QgsProject, LayerTreeIndex]]:
+        """Gets the project previously read by the current thread.
+
+        :param project_path: Path of the base project file.
+        :type project_path: str
+
+        :returns: Returns the project and its layer index or None if
+        it has not been read by the current thread or if the file has
+        changed since it was read.
+        :rtype: tuple
+        """
+        try:
+            modified_time = os.path.getmtime(project_path)
+        except OSError:
+            return None
+
+        entry = self._projects().get(os.path.normpath(project_path))
+        if entry is None or entry[0] != modified_time:
+            return None
+
+        return entry[1], entry[2]
+
+    def add(self, project_path: str, project: QgsProject, layer_index: LayerTreeIndex):
+        """Adds a project read by the current thread to the pool.
+
+        :param project_path: Path of the base project file.
+        :type project_path: str
+
+        :param project: Project deserialized from the given path.
+        :type project: QgsProject
+
+        :param layer_index: Layer index of the project.
+        :type layer_index: LayerTreeIndex
+        """
+        try:
+            modified_time = os.path.getmtime(project_path)
+        except OSError:
+            return
+
+        self._projects()[os.path.normpath(project_path)] = (
+            modified_time,
+            project,
+            layer_index,
+        )
+
+    def release(self):
+        """Removes the projects read by the current thread.
+
+        This should be called by each worker thread once it has
+        generated its reports.
+        """
+        projects = self._projects()
+        count = len(projects)
+        projects.clear()
+
+        log(f"Released {count} shared report project(s).")
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming scheduler for the farmer reports in a batch.
+"""
+
+import dataclasses
+import queue
+import threading
+import time
+import typing
+
+from qgis.core import QgsFeedback, QgsTask
+
+from qgis.PyQt import QtCore
+
+from .generator import generate_report
+from .journal import BatchJournal
+from .project_pool import ReportProjectPool
+from ...definitions.defaults import (
+    BATCH_CANCEL_GRACE_PERIOD,
+    BATCH_POLL_INTERVAL,
+)
+from ...models.report import ProjectMetadata, ReportOutputResult, SiteReportContext
+from ...utils import log, tr
+
+
+class BatchReportTask(QgsTask):
+    """Generates the farmer reports of a batch with a bounded number
+    of reports in flight.
+
+    The reports are generated by a fixed number of worker threads
+    owned by the task, the report generators are not added to the task
+    manager. The generators are created lazily from the farmer iterator
+    as workers become free, and each generator, together with its
+    layout, is discarded as soon as its result has been collected.
+    Only the lightweight results are kept so that the peak memory
+    does not depend on the number of farmers in the batch.
+    """
+
+    report_finished = QtCore.pyqtSignal(object)
+
+    def __init__(
+        self,
+        farmers: typing.Iterable[ProjectMetadata],
+        context: SiteReportContext,
+        max_in_flight: int,
+        farmer_count: int = 0,
+        journal: typing.Optional[BatchJournal] = None,
+    ):
+        """
+        :param farmers: Farmers whose reports are to be generated, can
+        be a generator.
+        :type farmers: typing.Iterable
+
+        :param context: Context of the batch, a copy with the metadata
+        and feedback of each farmer is used for each report.
+        :type context: SiteReportContext
+
+        :param max_in_flight: Maximum number of reports being generated
+        at the same time.
+        :type max_in_flight: int
+
+        :param farmer_count: Number of farmers, used for the progress.
+        :type farmer_count: int
+
+        :param journal: Journal in which the state of the reports is
+        recorded, defaults to the journal of the reports folder.
+        :type journal: BatchJournal
+        """
+        super().__init__(tr("Generating farmer reports"))
+        self._farmers = farmers
+        self._context = context
+        self._max_in_flight = max(1, max_in_flight)
+        self._farmer_count = farmer_count
+        self._results: typing.List[ReportOutputResult] = []
+        self._active_feedback: typing.Set[QgsFeedback] = set()
+        self._lock = threading.Lock()
+        # Set once the workers still running after a cancellation
+        # have been abandoned.
+        self._abandoned = threading.Event()
+        # Batch project of each worker thread
+        self._project_pool = ReportProjectPool()
+        self._journal = journal or BatchJournal.for_directory(context.report_dir)
+
+        # Cancel the batch if the feedback of the batch context is cancelled
+        self._context.feedback.canceled.connect(self.cancel)
+
+    @property
+    def results(self) -> typing.List[ReportOutputResult]:
+        """Gets the results of the reports generated so far.
+
+        :returns: Results of the reports, in the order of completion.
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._results)
+
+    def cancel(self):
+        """Cancels the batch and the reports being generated."""
+        with self._lock:
+            active_feedback = list(self._active_feedback)
+
+        for feedback in active_feedback:
+            feedback.cancel()
+
+        super().cancel()
+
+    def run(self) -> bool:
+        """Generates the reports of the farmers in the batch.
+
+        Once the batch is cancelled, the reports in flight are given
+        a grace period to stop. The reports still exporting after that
+        are abandoned so that the task finishes in a bounded time, they
+        have been cancelled and their PDFs, results and journal entries
+        are discarded.
+
+        :returns: True if all the reports were generated, else False.
+        :rtype: bool
+        """
+        farmers = iter(self._farmers)
+        results = queue.Queue()
+        worker_count = self._max_in_flight
+        if self._farmer_count:
+            worker_count = min(worker_count, self._farmer_count)
+
+        workers = [
+            threading.Thread(
+                target=self._run_worker,
+                args=(farmers, results),
+                name=f"report-{index}",
+                daemon=True,
+            )
+            for index in range(worker_count)
+        ]
+        for worker in workers:
+            worker.start()
+
+        completed = 0
+        success = True
+        cancel_time = None
+        running = len(workers)
+        while running > 0:
+            if self.isCanceled():
+                if cancel_time is None:
+                    cancel_time = time.monotonic()
+                elif time.monotonic() - cancel_time > BATCH_CANCEL_GRACE_PERIOD:
+                    self._abandoned.set()
+                    log(
+                        f"Abandoning the reports of {running} worker(s) still "
+                        f"running after the batch was cancelled.",
+                        info=False,
+                    )
+                    break
+
+            try:
+                result = results.get(timeout=BATCH_POLL_INTERVAL / 1000)
+            except queue.Empty:
+                continue
+
+            if result is None:
+                running -= 1
+                continue
+
+            success = success and result.success
+            completed += 1
+            with self._lock:
+                self._results.append(result)
+            self.report_finished.emit(result)
+
+            if self._farmer_count:
+                self.setProgress(min(100.0, completed * 100 / self._farmer_count))
+
+        log(f"Batch completed, {completed} report(s) processed.")
+
+        return success and not self.isCanceled()
+
+    def _run_worker(self, farmers: typing.Iterator[ProjectMetadata], results):
+        """Generates reports in a worker thread until there are no more
+        farmers or the batch is cancelled. The results are put in the
+        given queue, followed by None once the worker stops.
+        """
+        try:
+            while not self.isCanceled():
+                # The farmers can be a generator shared by the workers
+                with self._lock:
+                    metadata = next(farmers, None)
+                if metadata is None:
+                    break
+
+                result = self._generate_report(metadata)
+                if result is not None:
+                    results.put(result)
+        finally:
+            # The projects are deleted in the thread that read them
+            self._project_pool.release()
+            results.put(None)
+
+    def _generate_report(
+        self, metadata: ProjectMetadata
+    ) -> typing.Optional[ReportOutputResult]:
+        """Generates the report of one farmer in a worker thread and
+        records its state in the batch journal.
+
+        :returns: Result of the report or None if the report has been
+        abandoned, in which case its result is not recorded.
+        :rtype: ReportOutputResult
+        """
+        feedback = QgsFeedback()
+        context = dataclasses.replace(
+            self._context, metadata=metadata, feedback=feedback, adopt_layout=False
+        )
+        with self._lock:
+            self._active_feedback.add(feedback)
+
+        self._journal.start(metadata.farmer_id)
+        start_time = time.perf_counter()
+        try:
+            if self.isCanceled():
+                feedback.cancel()
+            result = generate_report(context, self._project_pool)
+            if result is None:
+                result = ReportOutputResult(
+                    False,
+                    "",
+                    f"Farmer ID {metadata.farmer_id}",
+                    (tr("Generation of report has been cancelled."),),
+                )
+        except Exception as e:
+            log(
+                f"Error generating the report for {metadata.farmer_id}, {e}", info=False
+            )
+            result = ReportOutputResult(
+                False, "", f"Farmer ID {metadata.farmer_id}", (str(e),)
+            )
+        finally:
+            with self._lock:
+                self._active_feedback.discard(feedback)
+
+        if self._abandoned.is_set():
+            return None
+
+        self._journal.finish(
+            metadata.farmer_id,
+            result.success,
+            time.perf_counter() - start_time,
+            result.errors,
+        )
+
+        return result
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide cache of parsed report templates.
+"""
+
+import os
+import threading
+import typing
+
+from qgis.PyQt import QtCore, QtXml
+
+from ...utils import log, tr
+
+
+def read_template_document(
+    template_path: str, error_messages: list = None
+) -> typing.Optional[QtXml.QDomDocument]:
+    """Reads and parses the contents of a layout template file.
+
+    :param template_path: Path to the layout template (*.qpt) file.
+    :type template_path: str
+
+    :param error_messages: Optional list for writing error messages.
+    :type error_messages: list
+
+    :returns: Returns the parsed template document or None if the
+    file could not be read or parsed.
+    :rtype: QtXml.QDomDocument
+    """
+    if not os.path.exists(template_path):
+        if error_messages is not None:
+            tr_msg = tr("Template file does not exist")
+            error_messages.append(f"{tr_msg} {template_path}.")
+        return None
+
+    template_file = QtCore.QFile(template_path)
+    doc = QtXml.QDomDocument()
+    try:
+        if not template_file.open(QtCore.QIODevice.ReadOnly):
+            if error_messages is not None:
+                tr_msg = tr("Unable to read template file")
+                error_messages.append(f"{tr_msg} {template_path}")
+            return None
+
+        if not doc.setContent(template_file):
+            if error_messages is not None:
+                tr_msg = tr("Failed to parse template file contents")
+                error_messages.append(f"{tr_msg} {template_path}")
+            return None
+    finally:
+        template_file.close()
+
+    return doc
+
+
+class ReportTemplateCache:
+    """Keeps the parsed documents of the report templates so that
+    report tasks do not read and parse the template files each time
+    a layout is created.
+
+    A cached document is invalidated when the modification time of
+    the corresponding template file changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # Tuple of file modification time and parsed document (value)
+        # indexed by the normalized template path (key).
+        self._documents: typing.Dict[str, typing.Tuple[float, QtXml.QDomDocument]] = {}
+
+        self._parse_count = 0
+
+    @property
+    def parse_count(self) -> int:
+        """Gets the number of times template files have been parsed
+        by the cache.
+
+        :returns: Number of template files parsed.
+        :rtype: int
+        """
+        return self._parse_count
+
+    def document(
+        self, template_path: str, error_messages: list = None
+    ) -> typing.Optional[QtXml.QDomDocument]:
+        """Gets a copy of the parsed template document.
+
+        Each caller gets its own deep copy since DOM documents are
+        implicitly shared and should not be accessed from several
+        threads.
+
+        :param template_path: Path to the layout template (*.qpt) file.
+        :type template_path: str
+
+        :param error_messages: Optional list for writing error messages.
+        :type error_messages: list
+
+        :returns: Returns a copy of the template document or None if
+        the file could not be read or parsed.
+        :rtype: QtXml.QDomDocument
+        """
+        normalized_path = os.path.normpath(template_path)
+        try:
+            modified_time = os.path.getmtime(normalized_path)
+        except OSError:
+            if error_messages is not None:
+                tr_msg = tr("Template file does not exist")
+                error_messages.append(f"{tr_msg} {template_path}.")
+            return None
+
+        with self._lock:
+            entry = self._documents.get(normalized_path)
+            if entry is None or entry[0] != modified_time:
+                log(f"Parsing report template {normalized_path}")
+                doc = read_template_document(normalized_path, error_messages)
+                self._parse_count += 1
+                if doc is None:
+                    _ = self._documents.pop(normalized_path, None)
+                    return None
+
+                entry = (modified_time, doc)
+                self._documents[normalized_path] = entry
+
+            return entry[1].cloneNode(True).toDocument()
+
+    def clear(self):
+        """Removes all the cached template documents."""
+        with self._lock:
+            self._documents.clear()
+
+
+template_cache = ReportTemplateCache()
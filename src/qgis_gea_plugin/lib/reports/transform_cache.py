@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of the coordinate transforms used by the report map items.
+"""
+
+import collections
+import threading
+import typing
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCoordinateTransformContext,
+)
+
+
+class TransformCache:
+    """Shares the coordinate transforms between the map items and the
+    reports in a batch.
+
+    Creating a transform resolves the PROJ pipeline between the two
+    CRSs, which is the costly part, whereas the map items of all the
+    reports in a batch use the same few CRS pairs. Transforms are
+    implicitly shared and each thread gets its own PROJ context, so a
+    cached transform can be used by several report tasks at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # Transform (value) indexed by the source CRS, target CRS and
+        # transform context (key).
+        self._transforms: typing.Dict[
+            typing.Tuple[str, str, str], QgsCoordinateTransform
+        ] = {}
+
+        self._stats = collections.Counter()
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        """Gets the number of transforms read from the cache and created.
+
+        :returns: Number of hits and misses.
+        :rtype: dict
+        """
+        with self._lock:
+            return {"hits": self._stats["hits"], "misses": self._stats["misses"]}
+
+    def clear(self):
+        """Removes all the transforms in the cache."""
+        with self._lock:
+            self._transforms.clear()
+            self._stats.clear()
+
+    @classmethod
+    def _key(
+        cls,
+        source_crs: QgsCoordinateReferenceSystem,
+        target_crs: QgsCoordinateReferenceSystem,
+        transform_context: QgsCoordinateTransformContext,
+    ) -> typing.Tuple[str, str, str]:
+        """Returns the cache key of the transform."""
+        operations = sorted(
+            (f"{source}|{target}", operation)
+            for (source, target), operation in (
+                transform_context.coordinateOperations().items()
+            )
+        )
+        return (
+            source_crs.authid()
+            or source_crs.toWkt(QgsCoordinateReferenceSystem.WKT_PREFERRED),
+            target_crs.authid()
+            or target_crs.toWkt(QgsCoordinateReferenceSystem.WKT_PREFERRED),
+            repr(operations),
+        )
+
+    def transform(
+        self,
+        source_crs: QgsCoordinateReferenceSystem,
+        target_crs: QgsCoordinateReferenceSystem,
+        transform_context: QgsCoordinateTransformContext,
+    ) -> QgsCoordinateTransform:
+        """Gets the transform between the two CRSs.
+
+        :param source_crs: Source CRS.
+        :type source_crs: QgsCoordinateReferenceSystem
+
+        :param target_crs: Target CRS.
+        :type target_crs: QgsCoordinateReferenceSystem
+
+        :param transform_context: Transform context of the project, it
+        defines the coordinate operations to use between CRSs.
+        :type transform_context: QgsCoordinateTransformContext
+
+        :returns: Transform from the source to the target CRS.
+        :rtype: QgsCoordinateTransform
+        """
+        key = self._key(source_crs, target_crs, transform_context)
+        with self._lock:
+            transform = self._transforms.get(key)
+            if transform is not None:
+                self._stats["hits"] += 1
+                return QgsCoordinateTransform(transform)
+
+        transform = QgsCoordinateTransform(source_crs, target_crs, transform_context)
+
+        with self._lock:
+            self._stats["misses"] += 1
+            self._transforms.setdefault(key, transform)
+
+        return QgsCoordinateTransform(transform)
+
+
+transform_cache = TransformCache()
@@ -13,7 +13,6 @@ import os.path
 import os
 import tempfile
 import datetime
-import logging
 from pathlib import Path
 
 from typing import Optional
@@ -22,7 +21,9 @@ from qgis.PyQt.QtCore import QTranslator, QCoreApplication, Qt, QSettings
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QMessageBox, QAction, QPushButton
 
-from .utils import log
+from .conf import settings_manager, Settings
+from .definitions.defaults import DEFAULT_LOG_LEVEL
+from .utils import log, log_level_from_name, set_log_level, start_file_log
 
 from .gui.qgis_gea import QgisGeaPlugin
 
@@ -42,11 +43,11 @@ if os.path.exists(log_file_path):
     with open(log_file_path, "w") as log_file:
         log_file.write("")
 
-logging.basicConfig(
-    filename=log_file_path,
-    filemode="a",  # Append mode
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    level=logging.DEBUG,
+start_file_log(log_file_path)
+set_log_level(
+    log_level_from_name(
+        settings_manager.get_value(Settings.LOG_LEVEL, default=DEFAULT_LOG_LEVEL)
+    )
 )
 date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 log(f"»»»»»»»»»»»»»»»»»»»»»»»»»»»»»»»»»»»»")
@@ -62,6 +63,8 @@ class QgisGea:
     def __init__(self, iface):
         self.iface = iface
 
+        settings_manager.settings_updated.connect(self.on_settings_updated)
+
         debug_env = int(os.getenv("GEA_DEBUG", 0))
         if debug_env:
             self.debug()
@@ -249,6 +252,18 @@ class QgisGea:
 
         return action
 
+    def on_settings_updated(self, name: str, value):
+        """Applies the log level once it has been changed in the settings.
+
+        :param name: Name of the setting that has been updated.
+        :type name: str
+
+        :param value: New value of the setting.
+        :type value: Any
+        """
+        if name == Settings.LOG_LEVEL.value:
+            set_log_level(log_level_from_name(value))
+
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
         LOCAL_ROOT_DIR = Path(__file__).parent.resolve()
@@ -299,6 +314,7 @@ class QgisGea:
     def unload(self):
         """Removes the plugin menu item and icon from QGIS GUI."""
         try:
+            settings_manager.settings_updated.disconnect(self.on_settings_updated)
 
             # Save geometry before unloading
             self.save_geometry()
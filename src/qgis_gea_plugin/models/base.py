@@ -14,6 +14,46 @@ class IMAGERY(Enum):
     HISTORICAL = "Historical"
 
 
+class ExportProfile(Enum):
+    """Quality profiles for exporting reports to PDF."""
+
+    DRAFT = "draft"
+    STANDARD = "standard"
+    PRINT = "print"
+
+
+class ReportBatchMode(Enum):
+    """Mechanisms for generating the reports of several farmers."""
+
+    # One report task per farmer
+    TASKS = "tasks"
+    # One atlas for all the farmers, exported to one PDF per farmer
+    ATLAS = "atlas"
+    # One atlas for all the farmers, exported to one combined PDF
+    ATLAS_COMBINED = "atlas_combined"
+    # Farmers split across several headless QGIS processes
+    PROCESSES = "processes"
+
+
+class LogLevel(IntEnum):
+    """Severity of the plugin log messages, the values match the
+    levels of the logging module.
+    """
+
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+
+
+class JournalState(Enum):
+    """States of a farmer report in the batch journal."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class LayerNodeSearch(IntEnum):
     """Mechanism type for searching layer tree nodes."""
 
@@ -21,7 +61,7 @@ class LayerNodeSearch(IntEnum):
     CONTAINS = 1
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class MapTemporalInfo:
     """Current map temporal information."""
 
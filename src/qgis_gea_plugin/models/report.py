@@ -8,7 +8,7 @@ from importlib.metadata import metadata
 
 from qgis.core import QgsFeedback, QgsTask
 
-from .base import MapTemporalInfo
+from .base import ExportProfile, MapTemporalInfo
 
 
 @dataclasses.dataclass
@@ -21,6 +21,19 @@ class ReportSubmitResult:
     task: QgsTask = None
 
 
+@dataclasses.dataclass
+class StageTiming:
+    """Time taken by a stage of the report generation process."""
+
+    name: str
+    category: str
+    # Start time and duration in seconds, the start time is relative
+    # to a reference shared by all the reports in a session.
+    start: float
+    duration: float
+    thread_id: int
+
+
 @dataclasses.dataclass
 class ReportOutputResult:
     """Result of site report generation process."""
@@ -29,9 +42,14 @@ class ReportOutputResult:
     output_path: str
     name: str
     errors: typing.Tuple[str] = dataclasses.field(default_factory=tuple)
+    # Time taken, in seconds, to export the PDF and its size in bytes.
+    # These are zero if the PDF was not exported.
+    export_duration: float = 0.0
+    pdf_size: int = 0
+    timings: typing.Tuple[StageTiming, ...] = dataclasses.field(default_factory=tuple)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class SiteMetadata:
     """Information about the site."""
 
@@ -45,7 +63,7 @@ class SiteMetadata:
     computed_area: str
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class ProjectMetadata:
     """Information about the project instance report."""
 
@@ -54,11 +72,24 @@ class ProjectMetadata:
     project: str
     author: str
     total_area: str
+    # Summary of the farmer's sites computed by the batch planner in a
+    # single pass over the project instances layer. The extent is
+    # (xmin, ymin, xmax, ymax) in the CRS of the layer and the digest
+    # is a SHA-256 of the geometries of the sites.
+    site_extent: typing.Optional[typing.Tuple[float, float, float, float]] = None
+    feature_count: int = 0
+    geometry_digest: str = ""
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class SiteReportContext:
-    """Information required to generate a site report."""
+    """Information required to generate a site report.
+
+    The context is a snapshot of all the inputs of the report, taken
+    when the report is submitted. The report tasks only use the context
+    and their own project, they never read the plugin settings or the
+    current project which can change while the reports are generated.
+    """
 
     metadata: typing.Union[SiteMetadata, ProjectMetadata]
     feedback: QgsFeedback
@@ -66,6 +97,17 @@ class SiteReportContext:
     qgs_project_path: str
     template_path: str
     temporal_info: MapTemporalInfo
+    # True if the project file is the base project shared by the
+    # reports in a batch, which is then reused across reports.
+    shared_project: bool = False
+    export_profile: ExportProfile = ExportProfile.STANDARD
+    # True to use the cache of rendered background layers
+    basemap_cache: bool = True
+    # Path of the site or project instances layer
+    site_layer_path: str = ""
+    # True to add the report layout to the current project once the
+    # report has been generated.
+    adopt_layout: bool = True
 
     @property
     def report_dir(self) -> str:
@@ -3,8 +3,13 @@
 Plugin utilities
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import typing
 from pathlib import Path
 
 from qgis.PyQt import QtCore, QtGui
@@ -14,9 +19,114 @@ from qgis.core import (
 )
 
 from .definitions.defaults import (
+    DEFAULT_LOG_LEVEL,
+    LOG_FILE_BACKUP_COUNT,
+    LOG_FILE_MAX_SIZE,
+    PARTIAL_PDF_SUFFIX,
     PROJECT_INSTANCE_REPORT_TEMPLATE_NAME,
     SITE_REPORT_TEMPLATE_NAME,
 )
+from .models.base import LogLevel
+
+
+# Messages below this level are discarded before reaching the QGIS
+# message log or the log file.
+_log_level = LogLevel[DEFAULT_LOG_LEVEL.upper()]
+
+# Messages are written to the log file by a background thread so that
+# the report tasks do not wait for the file writes, see start_file_log.
+_file_logger = logging.getLogger("qgis_gea_plugin")
+_file_logger.propagate = False
+_file_log_listener: typing.Optional[logging.handlers.QueueListener] = None
+_file_log_lock = threading.Lock()
+
+
+def set_log_level(level: LogLevel):
+    """Sets the minimum level of the messages that are logged.
+
+    :param level: Minimum log level.
+    :type level: LogLevel
+    """
+    global _log_level
+    _log_level = level
+
+
+def log_level_from_name(name: str) -> LogLevel:
+    """Gets the log level with the given name, as stored in the
+    settings, e.g. 'debug'.
+
+    :param name: Name of the log level.
+    :type name: str
+
+    :returns: Log level or the default level if the name is invalid.
+    :rtype: LogLevel
+    """
+    try:
+        return LogLevel[str(name).upper()]
+    except KeyError:
+        return LogLevel[DEFAULT_LOG_LEVEL.upper()]
+
+
+def is_log_enabled(level: LogLevel) -> bool:
+    """Checks whether messages of the given level are logged, use it
+    to skip building expensive log messages.
+
+    :param level: Log level.
+    :type level: LogLevel
+
+    :returns: True if messages of the given level are logged.
+    :rtype: bool
+    """
+    return level >= _log_level
+
+
+def start_file_log(log_path: str):
+    """Starts writing the log messages to the given file using a
+    background thread, replaces the current log file if any.
+
+    :param log_path: Path of the log file.
+    :type log_path: str
+    """
+    global _file_log_listener
+    stop_file_log()
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path,
+        maxBytes=LOG_FILE_MAX_SIZE,
+        backupCount=LOG_FILE_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True,
+    )
+    file_handler.setFormatter(
+        logging.Formatter("%(asctime)s [%(levelname)s] [%(threadName)s] %(message)s")
+    )
+
+    log_queue = queue.SimpleQueue()
+    with _file_log_lock:
+        _file_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _file_logger.setLevel(logging.DEBUG)
+        _file_log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _file_log_listener.start()
+
+
+def stop_file_log():
+    """Flushes the pending messages and stops the background thread
+    writing to the log file.
+    """
+    global _file_log_listener
+    with _file_log_lock:
+        if _file_log_listener is None:
+            return
+
+        _file_log_listener.stop()
+        for handler in _file_log_listener.handlers:
+            handler.close()
+        for handler in list(_file_logger.handlers):
+            _file_logger.removeHandler(handler)
+        _file_log_listener = None
+
+
+atexit.register(stop_file_log)
 
 
 def log(
@@ -25,39 +135,49 @@ def log(
     info: bool = True,
     notify: bool = True,
     to_file: bool = True,
+    level: typing.Optional[LogLevel] = None,
 ):
-    """Logs the message into QGIS logs using qgis_cplus as the default
+    """Logs the message into QGIS logs using qgis_gea as the default
     log instance.
-    If notify_user is True, user will be notified about the log.
+
+    Messages below the log level set in the settings are discarded,
+    only warnings notify the user.
 
     :param message: The log message
     :type message: str
 
-    :param name: Name of te log instance, qgis_cplus is the default
+    :param name: Name of te log instance, qgis_gea is the default
     :type message: str
 
     :param info: Whether the message is about info or a
-    warning
+    warning, ignored if the level is specified.
     :type info: bool
 
-    :param notify: Whether to notify user about the log
+    :param notify: Whether to notify user about a warning
     :type notify: bool
 
     :param to_file: Whether to log the message to a file
     :type to_file: bool
+
+    :param level: Level of the message, e.g. LogLevel.DEBUG for
+    messages in frequently called code.
+    :type level: LogLevel
     """
-    level = Qgis.Info if info else Qgis.Warning
+    if level is None:
+        level = LogLevel.INFO if info else LogLevel.WARNING
+    if level < _log_level:
+        return
+
+    is_warning = level >= LogLevel.WARNING
     QgsMessageLog.logMessage(
         message,
         name,
-        level=level,
-        notifyUser=notify,
+        level=Qgis.Warning if is_warning else Qgis.Info,
+        notifyUser=notify and is_warning,
     )
-    # also log using logging module
-    if info:
-        logging.info(message)
-    else:
-        logging.warning(message)
+
+    if to_file and _file_log_listener is not None:
+        _file_logger.log(level, message)
 
 
 def tr(message):
@@ -93,6 +213,39 @@ def clean_filename(filename):
     return filename
 
 
+def partial_pdf_path(pdf_path: str) -> str:
+    """Returns the path a PDF file is written to before being renamed
+    to its final path, so that an interrupted export never leaves an
+    incomplete file at the final path.
+
+    :param pdf_path: Final path of the PDF file.
+    :type pdf_path: str
+
+    :returns: Path of the partial PDF file, in the same directory.
+    :rtype: str
+    """
+    root, extension = os.path.splitext(pdf_path)
+    return f"{root}{PARTIAL_PDF_SUFFIX}{extension}"
+
+
+def commit_partial_pdf(pdf_path: str) -> bool:
+    """Atomically renames the partial PDF file to its final path.
+
+    :param pdf_path: Final path of the PDF file.
+    :type pdf_path: str
+
+    :returns: True if the file was renamed, else False.
+    :rtype: bool
+    """
+    try:
+        os.replace(partial_pdf_path(pdf_path), pdf_path)
+    except OSError as e:
+        log(f"Unable to move the exported PDF to {pdf_path}, {e}", info=False)
+        return False
+
+    return True
+
+
 def create_dir(directory: str, log_message: str = ""):
     """Creates new file directory if it doesn't exist"""
     p = Path(directory)
@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmark of the farmer report generation.
+
+Builds a synthetic offline project for each number of farmers, i.e.
+local GeoTIFF stand-ins of the Landsat and satellite imagery, an
+administrative areas layer, exclusion masks and a project instances
+shapefile, then generates the reports using the headless batch runner
+in a separate process so that the peak memory of each run is measured
+independently.
+
+Usage::
+
+    python test/benchmark_reporting.py --farmers 10 100 1000 \\
+        --save-baseline test/benchmarks/baseline.json
+
+    python test/benchmark_reporting.py --farmers 10 100 \\
+        --baseline test/benchmarks/baseline.json
+
+The benchmark exits with a non-zero code when a run regresses against
+the baseline by more than the tolerance.
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import typing
+from pathlib import Path
+
+from osgeo import gdal, ogr, osr
+
+from qgis.core import (
+    Qgis,
+    QgsCoordinateReferenceSystem,
+    QgsProject,
+    QgsRasterLayer,
+    QgsVectorLayer,
+)
+
+from qgis_gea_plugin.definitions.defaults import (
+    ADMIN_AREAS_GROUP_NAME,
+    BATCH_SUMMARY_FILE_NAME,
+    EXCLUSION_MASK_GROUP_NAME,
+    FARMER_ID_FIELD,
+    GOOGLE_LAYER_NAME,
+    LANDSAT_2013_LAYER_SEGMENT,
+    LANDSAT_2015_LAYER_SEGMENT,
+    LANDSAT_IMAGERY_GROUP_NAME,
+    PROJECT_INSTANCES_GROUP_NAME,
+)
+
+from utilities_for_testing import get_qgis_app
+
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+# Extent of the synthetic project in EPSG:4326 (xmin, ymin, xmax, ymax)
+BENCHMARK_EXTENT = (34.0, 0.0, 35.0, 1.0)
+BENCHMARK_RASTER_SIZE = 1024
+SITES_PER_FARMER = 2
+
+# Metrics compared against the baseline, True if higher is better
+BENCHMARK_METRICS = {
+    "reports_per_minute": True,
+    "peak_rss_mb": False,
+    "output_size_mb": False,
+}
+
+
+def _write_raster(path: str, band_count: int, seed: int):
+    """Writes a byte GeoTIFF covering the benchmark extent with a
+    gradient pattern, which compresses similarly to real imagery.
+    """
+    size = BENCHMARK_RASTER_SIZE
+    xmin, ymin, xmax, ymax = BENCHMARK_EXTENT
+
+    driver = gdal.GetDriverByName("GTiff")
+    dataset = driver.Create(
+        path, size, size, band_count, gdal.GDT_Byte, ["TILED=YES", "COMPRESS=DEFLATE"]
+    )
+    dataset.SetGeoTransform(
+        (xmin, (xmax - xmin) / size, 0, ymax, 0, -(ymax - ymin) / size)
+    )
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    dataset.SetProjection(srs.ExportToWkt())
+
+    for band_number in range(1, band_count + 1):
+        offset = seed * 37 + band_number * 53
+        data = b"".join(
+            bytes(
+                ((x * 3 + y * band_number) // 4 + offset + (x ^ y) % 17) % 256
+                for x in range(size)
+            )
+            for y in range(size)
+        )
+        dataset.GetRasterBand(band_number).WriteRaster(0, 0, size, size, data)
+
+    dataset.FlushCache()
+    dataset = None
+
+
+def _square(x: float, y: float, size: float) -> ogr.Geometry:
+    """Creates a square polygon with the given lower left corner."""
+    ring = ogr.Geometry(ogr.wkbLinearRing)
+    for px, py in ((x, y), (x + size, y), (x + size, y + size), (x, y + size)):
+        ring.AddPoint_2D(px, py)
+    ring.CloseRings()
+    polygon = ogr.Geometry(ogr.wkbPolygon)
+    polygon.AddGeometry(ring)
+
+    return polygon
+
+
+def _write_polygons(
+    path: str,
+    driver_name: str,
+    fields: typing.List[typing.Tuple[str, int]],
+    features: typing.List[typing.Tuple[ogr.Geometry, typing.List]],
+):
+    """Writes the polygon features to a vector file in EPSG:4326."""
+    driver = ogr.GetDriverByName(driver_name)
+    if os.path.exists(path):
+        driver.DeleteDataSource(path)
+    dataset = driver.CreateDataSource(path)
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    layer = dataset.CreateLayer(Path(path).stem, srs, ogr.wkbPolygon)
+    for name, field_type in fields:
+        layer.CreateField(ogr.FieldDefn(name, field_type))
+
+    definition = layer.GetLayerDefn()
+    for geometry, values in features:
+        feature = ogr.Feature(definition)
+        feature.SetGeometry(geometry)
+        for index, value in enumerate(values):
+            feature.SetField(index, value)
+        layer.CreateFeature(feature)
+
+    dataset = None
+
+
+def _site_features(farmer_count: int) -> typing.List:
+    """Creates the project instance features laid out in a grid."""
+    xmin, ymin, xmax, ymax = BENCHMARK_EXTENT
+    columns = math.ceil(math.sqrt(farmer_count))
+    cell = (xmax - xmin) / (columns + 1)
+    site_size = cell / 8
+    hectares = (site_size * 111320) ** 2 / 10000
+
+    features = []
+    for index in range(farmer_count):
+        row, column = divmod(index, columns)
+        x = xmin + cell * (column + 0.5)
+        y = ymin + cell * (row + 0.5)
+        for site in range(SITES_PER_FARMER):
+            features.append(
+                (
+                    _square(x + site * site_size * 2, y, site_size),
+                    [
+                        f"BENCH {index + 1:05d}",
+                        f"{hectares:,.2f}",
+                        "2020-01-01",
+                        "benchmark",
+                        "Western Kenya",
+                    ],
+                )
+            )
+
+    return features
+
+
+def build_synthetic_project(folder: str, farmer_count: int) -> typing.Tuple[str, str]:
+    """Builds an offline project with the layers used by the farmer
+    reports.
+
+    :param folder: Folder in which the data and project are written.
+    :type folder: str
+
+    :param farmer_count: Number of farmers in the project instances layer.
+    :type farmer_count: int
+
+    :returns: Paths of the project file and project instances layer.
+    :rtype: tuple
+    """
+    data_dir = os.path.join(folder, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    xmin, ymin, xmax, ymax = BENCHMARK_EXTENT
+    rng = random.Random(farmer_count)
+
+    raster_paths = {
+        LANDSAT_2013_LAYER_SEGMENT: (os.path.join(data_dir, "landsat_2013.tif"), 3),
+        LANDSAT_2015_LAYER_SEGMENT: (os.path.join(data_dir, "landsat_2015.tif"), 3),
+        GOOGLE_LAYER_NAME: (os.path.join(data_dir, "satellite.tif"), 3),
+    }
+    for seed, (path, band_count) in enumerate(raster_paths.values()):
+        if not os.path.exists(path):
+            _write_raster(path, band_count, seed)
+
+    admin_path = os.path.join(data_dir, "districts.gpkg")
+    half_x, half_y = (xmax - xmin) / 2, (ymax - ymin) / 2
+    _write_polygons(
+        admin_path,
+        "GPKG",
+        [("name", ogr.OFTString)],
+        [
+            (
+                _square(xmin + i * half_x, ymin + j * half_y, half_x),
+                [f"District {i}{j}"],
+            )
+            for i in range(2)
+            for j in range(2)
+        ],
+    )
+
+    mask_path = os.path.join(data_dir, "exclusion_mask.gpkg")
+    _write_polygons(
+        mask_path,
+        "GPKG",
+        [("type", ogr.OFTString)],
+        [
+            (
+                _square(
+                    rng.uniform(xmin, xmax - 0.05), rng.uniform(ymin, ymax - 0.05), 0.05
+                ),
+                ["Forest"],
+            )
+            for _ in range(20)
+        ],
+    )
+
+    site_path = os.path.join(data_dir, f"project_instances_{farmer_count}.shp")
+    _write_polygons(
+        site_path,
+        "ESRI Shapefile",
+        [
+            (FARMER_ID_FIELD, ogr.OFTString),
+            ("area (ha)", ogr.OFTString),
+            ("IncepDate", ogr.OFTString),
+            ("author", ogr.OFTString),
+            ("project", ogr.OFTString),
+        ],
+        _site_features(farmer_count),
+    )
+
+    project = QgsProject()
+    project.setCrs(QgsCoordinateReferenceSystem("EPSG:4326"))
+    root = project.layerTreeRoot()
+
+    def add_layer(layer, group_name=""):
+        if not layer.isValid():
+            raise RuntimeError(f"Invalid benchmark layer {layer.source()}")
+        project.addMapLayer(layer, False)
+        group = root
+        if group_name:
+            group = root.findGroup(group_name) or root.addGroup(group_name)
+        group.addLayer(layer)
+
+    add_layer(
+        QgsVectorLayer(site_path, Path(site_path).stem, "ogr"),
+        PROJECT_INSTANCES_GROUP_NAME,
+    )
+    add_layer(
+        QgsVectorLayer(mask_path, "Forest Mask", "ogr"), EXCLUSION_MASK_GROUP_NAME
+    )
+    add_layer(
+        QgsVectorLayer(admin_path, "Kenya Districts", "ogr"), ADMIN_AREAS_GROUP_NAME
+    )
+    for segment in (LANDSAT_2013_LAYER_SEGMENT, LANDSAT_2015_LAYER_SEGMENT):
+        add_layer(
+            QgsRasterLayer(raster_paths[segment][0], f"{segment} Mosaic"),
+            LANDSAT_IMAGERY_GROUP_NAME,
+        )
+    add_layer(QgsRasterLayer(raster_paths[GOOGLE_LAYER_NAME][0], GOOGLE_LAYER_NAME))
+
+    project_path = os.path.join(folder, f"benchmark_{farmer_count}.qgz")
+    if not project.write(project_path):
+        raise RuntimeError(f"Unable to write the benchmark project {project_path}")
+
+    return project_path, site_path
+
+
+def _folder_size(folder: str, suffix: str = ".pdf") -> int:
+    """Total size in bytes of the files with the given suffix."""
+    return sum(
+        path.stat().st_size
+        for path in Path(folder).rglob(f"*{suffix}")
+        if path.is_file()
+    )
+
+
+def run_benchmark(
+    project_path: str,
+    layer_path: str,
+    output_folder: str,
+    args: argparse.Namespace,
+) -> dict:
+    """Generates the reports of the synthetic project in a separate
+    process and collects the metrics of the run.
+
+    :returns: Metrics of the run.
+    :rtype: dict
+    """
+    command = [
+        sys.executable,
+        "-m",
+        "qgis_gea_plugin.batch",
+        project_path,
+        "--layer",
+        layer_path,
+        "--output",
+        output_folder,
+        "--mode",
+        args.mode,
+        "--profile",
+        args.profile,
+    ]
+    if args.workers:
+        command.extend(["--workers", str(args.workers)])
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(SRC_DIR), env.get("PYTHONPATH", "")])
+    )
+
+    process = subprocess.Popen(command, env=env)
+    peak_rss_mb = None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(process.pid, 0)
+        exit_code = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        peak_rss_mb = usage.ru_maxrss / scale
+    else:
+        exit_code = process.wait()
+
+    summary_path = os.path.join(output_folder, "reports", BATCH_SUMMARY_FILE_NAME)
+    if not os.path.exists(summary_path):
+        raise RuntimeError(f"Batch run failed with exit code {exit_code}")
+
+    with open(summary_path, encoding="utf-8") as summary_file:
+        summary = json.load(summary_file)
+
+    return {
+        "exit_code": exit_code,
+        "farmers": summary.get("farmers", 0),
+        "succeeded": summary.get("succeeded", 0),
+        "failed": summary.get("failed", 0),
+        "wall_time": summary.get("wall_time", 0.0),
+        "reports_per_minute": summary.get("reports_per_minute", 0.0),
+        "peak_rss_mb": peak_rss_mb,
+        "output_size_mb": _folder_size(output_folder) / (1024 * 1024),
+        "stages": {
+            name: {"mean": aggregate["mean"], "max": aggregate["max"]}
+            for name, aggregate in summary.get("aggregates", {}).items()
+        },
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """Compares the benchmark runs with the baseline runs having the
+    same number of farmers.
+
+    :param results: Benchmark results.
+    :type results: dict
+
+    :param baseline: Baseline results.
+    :type baseline: dict
+
+    :param tolerance: Relative change above which a metric is reported
+    as a regression e.g. 0.1 for 10%.
+    :type tolerance: float
+
+    :returns: Descriptions of the regressions.
+    :rtype: list
+    """
+    regressions = []
+    for farmer_count, run in results["runs"].items():
+        baseline_run = baseline.get("runs", {}).get(farmer_count)
+        if baseline_run is None:
+            continue
+
+        for metric, higher_is_better in BENCHMARK_METRICS.items():
+            value, reference = run.get(metric), baseline_run.get(metric)
+            if not value or not reference:
+                continue
+            change = (value - reference) / reference
+            print(f"{farmer_count} farmers, {metric}: {value:.2f} ({change:+.1%})")
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    f"{farmer_count} farmers: {metric} {value:.2f} "
+                    f"vs baseline {reference:.2f}"
+                )
+
+    return regressions
+
+
+def parse_args(argv: typing.List[str] = None) -> argparse.Namespace:
+    """Parses the command line arguments of the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--farmers", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument(
+        "--output", default="", help="Working folder, defaults to a temporary one."
+    )
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--mode", default="tasks")
+    parser.add_argument("--profile", default="standard")
+    parser.add_argument("--results", default="", help="Path of the results JSON.")
+    parser.add_argument("--baseline", default="", help="Baseline JSON to compare.")
+    parser.add_argument(
+        "--save-baseline", default="", help="Writes the results as a baseline."
+    )
+    parser.add_argument("--tolerance", type=float, default=0.1)
+
+    return parser.parse_args(argv)
+
+
+def main(argv: typing.List[str] = None) -> int:
+    """Runs the benchmark for each number of farmers.
+
+    :returns: Exit code, 1 if a metric regressed against the baseline.
+    :rtype: int
+    """
+    args = parse_args(argv)
+    get_qgis_app()
+
+    work_dir = args.output or tempfile.mkdtemp(prefix="gea_report_benchmark_")
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "qgis_version": Qgis.QGIS_VERSION,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "mode": args.mode,
+        "profile": args.profile,
+        "workers": args.workers,
+        "runs": {},
+    }
+
+    for farmer_count in args.farmers:
+        folder = os.path.join(work_dir, f"farmers_{farmer_count}")
+        project_path, layer_path = build_synthetic_project(folder, farmer_count)
+        output_folder = os.path.join(folder, "output")
+        run = run_benchmark(project_path, layer_path, output_folder, args)
+        results["runs"][str(farmer_count)] = run
+        print(
+            f"{farmer_count} farmers: {run['reports_per_minute']:.1f} reports/min, "
+            f"{run['wall_time']:.1f}s, {run['failed']} failed"
+        )
+
+    results_path = args.results or os.path.join(work_dir, "benchmark_results.json")
+    for path in filter(None, (results_path, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as results_file:
+            json.dump(results, results_file, indent=2)
+    print(f"Benchmark results: {results_path}")
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
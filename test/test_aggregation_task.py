@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the background farmer aggregation.
+"""
+from unittest import TestCase
+
+from qgis.core import (
+    QgsFeature,
+    QgsFeedback,
+    QgsGeometry,
+    QgsRectangle,
+    QgsVectorLayer,
+)
+
+from qgis_gea_plugin.jobs.aggregation import FarmerAggregationTask
+from qgis_gea_plugin.lib.reports.farmers import aggregate_farmers
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestFarmerAggregationTask(TestCase):
+    """Tests for the farmer aggregation task."""
+
+    def setUp(self):
+        self.layer = QgsVectorLayer(
+            "Polygon?crs=EPSG:4326&field=FarmerID:string&field=area (ha):double"
+            "&field=IncepDate:string&field=author:string&field=project:string",
+            "sites",
+            "memory",
+        )
+        self.assertTrue(self.layer.isValid())
+
+        features = []
+        for index in range(10):
+            feature = QgsFeature(self.layer.fields())
+            feature.setAttributes(
+                [f"F {index % 3}", 1.0, "2020-01-01", "author", "GEA"]
+            )
+            feature.setGeometry(
+                QgsGeometry.fromRect(QgsRectangle(index, 0, index + 0.5, 1))
+            )
+            features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+
+    def test_aggregation(self):
+        """Assert the farmers are aggregated in the task."""
+        task = FarmerAggregationTask(self.layer)
+
+        self.assertTrue(task.run())
+        self.assertEqual(
+            [farmer.farmer_id for farmer in task.farmers], ["F 0", "F 1", "F 2"]
+        )
+        self.assertEqual(task.farmers[0].total_area, "4.00")
+
+    def test_cancelled_aggregation(self):
+        """Assert no farmers are returned once cancelled."""
+        feedback = QgsFeedback()
+        feedback.cancel()
+
+        self.assertEqual(aggregate_farmers(self.layer, feedback), [])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the ellipsoidal area of the sites.
+"""
+from unittest import TestCase
+
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsFeedback,
+    QgsGeometry,
+    QgsRectangle,
+    QgsVectorLayer,
+)
+
+from qgis_gea_plugin.lib.area import (
+    area_value,
+    compute_areas,
+    create_distance_area,
+    format_area,
+)
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestArea(TestCase):
+    """Tests for the area engine."""
+
+    def setUp(self):
+        self.layer = QgsVectorLayer("Polygon?crs=EPSG:3857", "sites", "memory")
+        self.assertTrue(self.layer.isValid())
+
+        valid_feature = QgsFeature(self.layer.fields())
+        valid_feature.setGeometry(QgsGeometry.fromRect(QgsRectangle(0, 0, 1000, 1000)))
+        invalid_feature = QgsFeature(self.layer.fields())
+        invalid_feature.setGeometry(
+            QgsGeometry.fromWkt("POLYGON((0 0, 10 10, 10 0, 0 10, 0 0))")
+        )
+        self.layer.dataProvider().addFeatures([valid_feature, invalid_feature])
+
+        self.distance_area = create_distance_area(
+            self.layer.crs(), QgsCoordinateTransformContext()
+        )
+
+    def test_compute_areas(self):
+        """Assert the ellipsoidal areas of all the features are computed."""
+        areas = compute_areas(self.layer, self.distance_area)
+        valid_id, invalid_id = sorted(areas)
+
+        # A square of 1 km on the Web Mercator equator is close to 100 ha
+        self.assertAlmostEqual(areas[valid_id], 100.0, delta=1.0)
+        self.assertIsNone(areas[invalid_id])
+
+    def test_cancelled_computation(self):
+        """Assert no areas are returned once cancelled."""
+        feedback = QgsFeedback()
+        feedback.cancel()
+
+        self.assertEqual(
+            compute_areas(self.layer, self.distance_area, feedback=feedback), {}
+        )
+
+    def test_area_values(self):
+        """Assert the numeric and legacy text areas are read."""
+        self.assertEqual(area_value(1234.5), 1234.5)
+        self.assertEqual(area_value("1,234.50"), 1234.5)
+        self.assertEqual(area_value(""), 0.0)
+        self.assertEqual(format_area(1234.5), "1,234.50")
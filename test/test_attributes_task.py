@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the background write of the site attributes.
+"""
+import os
+import tempfile
+from unittest import TestCase
+
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsGeometry,
+    QgsRectangle,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+)
+
+from qgis_gea_plugin.jobs.attributes import SiteAttributesTask
+from qgis_gea_plugin.lib.area import create_distance_area
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestSiteAttributesTask(TestCase):
+    """Tests for the site attributes task."""
+
+    def setUp(self):
+        # The task opens the layer again from its source, hence a file
+        self.temp_dir = tempfile.TemporaryDirectory()
+        layer_path = os.path.join(self.temp_dir.name, "sites.gpkg")
+
+        layer = QgsVectorLayer(
+            "Polygon?crs=EPSG:3857&field=FarmerID:string&field=author:string"
+            "&field=project:string&field=area (ha):double",
+            "sites",
+            "memory",
+        )
+        features = []
+        for index in range(5):
+            feature = QgsFeature(layer.fields())
+            feature.setAttributes([f"F {index}", None, None, None])
+            feature.setGeometry(
+                QgsGeometry.fromRect(
+                    QgsRectangle(index * 2000, 0, index * 2000 + 1000, 1000)
+                )
+            )
+            features.append(feature)
+        layer.dataProvider().addFeatures(features)
+
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "GPKG"
+        QgsVectorFileWriter.writeAsVectorFormatV2(
+            layer, layer_path, QgsCoordinateTransformContext(), options
+        )
+        self.layer = QgsVectorLayer(layer_path, "sites", "ogr")
+        self.assertTrue(self.layer.isValid())
+
+        self.distance_area = create_distance_area(
+            self.layer.crs(), QgsCoordinateTransformContext()
+        )
+
+    def tearDown(self):
+        del self.layer
+        self.temp_dir.cleanup()
+
+    def test_attributes_written(self):
+        """Assert the attributes of all the sites are written."""
+        task = SiteAttributesTask(self.layer, "Author", "Kenya", self.distance_area)
+
+        self.assertTrue(task.run())
+        task.finished(True)
+        self.assertEqual(task.invalid_count, 0)
+        for feature in self.layer.getFeatures():
+            self.assertEqual(feature["author"], "Author")
+            self.assertEqual(feature["project"], "Kenya")
+            self.assertAlmostEqual(feature["area (ha)"], 100.0, delta=1.0)
+
+    def test_cancelled_task(self):
+        """Assert nothing is written once cancelled."""
+        task = SiteAttributesTask(self.layer, "Author", "Kenya", self.distance_area)
+        task.cancel()
+
+        self.assertFalse(task.run())
+        for feature in self.layer.getFeatures():
+            self.assertFalse(feature["author"])
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the basemap render cache.
+"""
+import os
+from unittest import TestCase
+
+from qgis.core import QgsCoordinateTransformContext, QgsFeedback, QgsRasterLayer
+
+from qgis.PyQt import QtCore
+
+from qgis_gea_plugin.lib.reports.basemap_cache import (
+    BasemapCache,
+    remove_basemap_files,
+)
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestBasemapCache(TestCase):
+    """Tests for the basemap render cache."""
+
+    def setUp(self):
+        self.temp_dir = QtCore.QTemporaryDir()
+        self.assertTrue(self.temp_dir.isValid())
+        self.cache_dir = os.path.join(self.temp_dir.path(), "basemaps")
+        raster_path = os.path.join(os.path.dirname(__file__), "tenbytenraster.tif")
+        self.layer = QgsRasterLayer(raster_path, "tenbytenraster")
+        self.assertTrue(self.layer.isValid())
+
+    def _basemap_layer(self, cache: BasemapCache, file_name: str, feedback=None):
+        return cache.basemap_layer(
+            [self.layer],
+            self.layer.extent(),
+            200,
+            200,
+            96,
+            self.layer.crs(),
+            QgsCoordinateTransformContext(),
+            self.cache_dir,
+            os.path.join(self.temp_dir.path(), file_name),
+            feedback,
+        )
+
+    def test_tiles_reused_from_memory(self):
+        """Assert tiles are only rendered once for the same extent."""
+        cache = BasemapCache()
+        first_layer = self._basemap_layer(cache, "first.png")
+        self.assertIsNotNone(first_layer)
+        self.assertTrue(first_layer.isValid())
+        self.assertTrue(first_layer.extent().contains(self.layer.extent()))
+
+        renders = cache.stats["renders"]
+        self.assertGreater(renders, 0)
+
+        second_layer = self._basemap_layer(cache, "second.png")
+        self.assertIsNotNone(second_layer)
+        self.assertEqual(cache.stats["renders"], renders)
+        self.assertEqual(cache.stats["memory_hits"], renders)
+
+    def test_tiles_reused_from_disk(self):
+        """Assert tiles are read from the disk tier by a new cache."""
+        _ = self._basemap_layer(BasemapCache(), "first.png")
+
+        cache = BasemapCache()
+        basemap_layer = self._basemap_layer(cache, "second.png")
+        self.assertIsNotNone(basemap_layer)
+        self.assertEqual(cache.stats["renders"], 0)
+        self.assertGreater(cache.stats["disk_hits"], 0)
+
+    def test_cancellable_render(self):
+        """Assert tiles are rendered with a feedback and none are
+        rendered once it is cancelled."""
+        cache = BasemapCache(memory_tiles=0, disk_size=0)
+        feedback = QgsFeedback()
+        basemap_layer = self._basemap_layer(cache, "first.png", feedback)
+        self.assertIsNotNone(basemap_layer)
+        renders = cache.stats["renders"]
+        self.assertGreater(renders, 0)
+
+        feedback.cancel()
+        self.assertIsNone(self._basemap_layer(cache, "second.png", feedback))
+        self.assertEqual(cache.stats["renders"], renders)
+
+    def test_memory_tier_eviction(self):
+        """Assert the least recently used tiles are evicted."""
+        cache = BasemapCache(memory_tiles=0, disk_size=0)
+        _ = self._basemap_layer(cache, "first.png")
+        _ = self._basemap_layer(cache, "second.png")
+
+        self.assertEqual(cache.stats["memory_hits"], 0)
+
+    def test_remove_basemap_files(self):
+        """Assert the composed basemap and its sidecar files are removed."""
+        basemap_layer = self._basemap_layer(BasemapCache(), "basemap.png")
+        basemap_path = basemap_layer.source()
+        del basemap_layer
+
+        remove_basemap_files(basemap_path)
+        self.assertFalse(os.path.exists(basemap_path))
+        self.assertFalse(os.path.exists(f"{os.path.splitext(basemap_path)[0]}.pgw"))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the headless batch report runner.
+"""
+from unittest import TestCase
+
+from qgis.core import QgsFeature, QgsGeometry, QgsRectangle, QgsVectorLayer
+
+from qgis_gea_plugin.batch import parse_args
+from qgis_gea_plugin.lib.reports.farmers import (
+    aggregate_farmers,
+    ensure_farmer_id_index,
+)
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestBatch(TestCase):
+    """Tests for the batch report runner."""
+
+    def test_parse_args(self):
+        """Assert the command line arguments are parsed."""
+        args = parse_args(
+            [
+                "project.qgz",
+                "--layer",
+                "sites.shp",
+                "--output",
+                "output",
+                "--farmer",
+                "F 1",
+                "--farmer",
+                "F 2",
+                "--mode",
+                "atlas",
+            ]
+        )
+
+        self.assertEqual(args.project, "project.qgz")
+        self.assertEqual(args.farmer, ["F 1", "F 2"])
+        self.assertEqual(args.mode, "atlas")
+        self.assertEqual(args.workers, 0)
+        self.assertIsNone(args.profile)
+
+    def test_aggregate_farmers(self):
+        """Assert the sites are aggregated by farmer."""
+        layer = QgsVectorLayer(
+            "Polygon?crs=EPSG:4326&field=FarmerID:string&field=area (ha):double"
+            "&field=IncepDate:string&field=author:string&field=project:string",
+            "sites",
+            "memory",
+        )
+        self.assertTrue(layer.isValid())
+
+        features = []
+        for index, (farmer_id, area) in enumerate(
+            (("F 1", 1.5), ("F 2", 2.0), ("F 1", 2.5))
+        ):
+            feature = QgsFeature(layer.fields())
+            feature.setAttributes([farmer_id, area, "2020-01-01", "author", "GEA"])
+            feature.setGeometry(
+                QgsGeometry.fromRect(QgsRectangle(index, 0, index + 0.5, 1))
+            )
+            features.append(feature)
+        layer.dataProvider().addFeatures(features)
+
+        farmers = aggregate_farmers(layer)
+
+        self.assertEqual([farmer.farmer_id for farmer in farmers], ["F 1", "F 2"])
+        self.assertEqual(farmers[0].total_area, "4.00")
+        self.assertEqual(farmers[0].inception_date, "2020-01-01")
+        self.assertEqual(farmers[0].feature_count, 2)
+        self.assertEqual(farmers[0].site_extent, (0.0, 0.0, 2.5, 1.0))
+        self.assertEqual(farmers[1].site_extent, (1.0, 0.0, 1.5, 1.0))
+        self.assertNotEqual(farmers[0].geometry_digest, farmers[1].geometry_digest)
+
+    def test_farmer_id_index(self):
+        """Assert the farmer ID index requires the farmer ID field."""
+        layer = QgsVectorLayer(
+            "Polygon?crs=EPSG:4326&field=FarmerID:string", "sites", "memory"
+        )
+        self.assertTrue(ensure_farmer_id_index(layer))
+
+        layer = QgsVectorLayer(
+            "Polygon?crs=EPSG:4326&field=id:string", "sites", "memory"
+        )
+        self.assertFalse(ensure_farmer_id_index(layer))
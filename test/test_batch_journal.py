@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the batch journal.
+"""
+import os
+from unittest import TestCase
+
+from qgis.core import QgsFeedback
+
+from qgis.PyQt import QtCore
+
+from qgis_gea_plugin.lib.reports.atlas import ProjectInstanceAtlasTask
+from qgis_gea_plugin.lib.reports.journal import BatchJournal
+from qgis_gea_plugin.lib.reports.manifest import ReportManifest
+from qgis_gea_plugin.models.base import JournalState
+from qgis_gea_plugin.models.report import ProjectMetadata, SiteReportContext
+from qgis_gea_plugin.utils import commit_partial_pdf, FileUtils, partial_pdf_path
+
+from model_data_for_testing import get_temporal_info
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestBatchJournal(TestCase):
+    """Tests for the batch journal."""
+
+    def setUp(self):
+        self.temp_dir = QtCore.QTemporaryDir()
+        self.assertTrue(self.temp_dir.isValid())
+        self.report_dir = self.temp_dir.path()
+
+    def test_report_states(self):
+        """Assert the state and attempts of each report are recorded."""
+        journal = BatchJournal(self.report_dir)
+        journal.queue(["F 1", "F 2", "F 3"])
+        journal.start("F 1")
+        journal.finish("F 1", True, 1.5)
+        journal.start("F 2")
+        journal.finish("F 2", False, 0.5, ["Export failed"])
+        journal.start("F 2")
+
+        self.assertEqual(journal.state("F 1"), JournalState.DONE)
+        self.assertEqual(journal.state("F 2"), JournalState.RUNNING)
+        self.assertEqual(journal.entry("F 2")["attempts"], 2)
+        self.assertEqual(journal.state("F 3"), JournalState.QUEUED)
+        self.assertIsNone(journal.state("F 4"))
+
+    def test_resume_after_interruption(self):
+        """Assert only the done reports are done after reloading."""
+        journal = BatchJournal(self.report_dir)
+        journal.queue(["F 1", "F 2", "F 3"])
+        journal.start("F 1")
+        journal.finish("F 1", True, 1.5)
+        journal.start("F 2")
+
+        # Reloading compacts the superseded entries
+        journal = BatchJournal(self.report_dir)
+        self.assertTrue(journal.is_done("F 1"))
+        self.assertFalse(journal.is_done("F 2"))
+        self.assertFalse(journal.is_done("F 3"))
+        self.assertEqual(journal.entry("F 1")["duration"], 1.5)
+        with open(journal.path, "r", encoding="utf-8") as journal_file:
+            self.assertEqual(len(journal_file.readlines()), 3)
+
+    def test_store_per_directory(self):
+        """Assert the journal and manifest of a folder are separate."""
+        journal = BatchJournal.for_directory(self.report_dir)
+
+        self.assertIs(BatchJournal.for_directory(self.report_dir), journal)
+        self.assertIsInstance(
+            ReportManifest.for_directory(self.report_dir), ReportManifest
+        )
+        self.assertNotEqual(
+            journal.path, ReportManifest.for_directory(self.report_dir).path
+        )
+
+    def test_commit_partial_pdf(self):
+        """Assert the partial PDF replaces the final PDF."""
+        pdf_path = os.path.join(self.report_dir, "Farmer_1.pdf")
+        self.assertFalse(commit_partial_pdf(pdf_path))
+
+        with open(partial_pdf_path(pdf_path), "wb") as pdf_file:
+            pdf_file.write(b"%PDF-1.4")
+        self.assertTrue(commit_partial_pdf(pdf_path))
+        self.assertTrue(os.path.exists(pdf_path))
+        self.assertFalse(os.path.exists(partial_pdf_path(pdf_path)))
+
+    def test_atlas_farmer_states(self):
+        """Assert the atlas records the state of each farmer report."""
+        farmers = [
+            ProjectMetadata(farmer_id, "2020-01-01", "Project", "Author", "1.00")
+            for farmer_id in ("F 1", "F 2")
+        ]
+        context = SiteReportContext(
+            farmers[0],
+            QgsFeedback(),
+            self.report_dir,
+            os.path.join(self.report_dir, "missing.qgz"),
+            FileUtils.project_instance_report_template_path(),
+            get_temporal_info(),
+        )
+        os.makedirs(context.report_dir)
+        journal = BatchJournal(context.report_dir)
+        journal.queue([farmer.farmer_id for farmer in farmers])
+
+        task = ProjectInstanceAtlasTask(context, farmers, journal=journal)
+        self.assertFalse(task.run())
+
+        for farmer in farmers:
+            entry = journal.entry(farmer.farmer_id)
+            self.assertEqual(entry["state"], JournalState.FAILED.value)
+            self.assertTrue(entry["errors"])
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the report layer index.
+"""
+from unittest import TestCase
+
+from qgis.core import QgsProject, QgsVectorLayer
+
+from qgis_gea_plugin.lib.reports.layer_index import LayerTreeIndex
+from qgis_gea_plugin.models.base import LayerNodeSearch
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+def _memory_layer(name: str) -> QgsVectorLayer:
+    """Creates a polygon memory layer with the given name."""
+    return QgsVectorLayer("Polygon?crs=EPSG:4326", name, "memory")
+
+
+class TestLayerTreeIndex(TestCase):
+    """Tests for the layer tree index."""
+
+    def setUp(self):
+        self.project = QgsProject()
+        root = self.project.layerTreeRoot()
+
+        self.imagery_group = root.addGroup("Historical Landsat Imagery")
+        self.landsat_2013 = _memory_layer("Landsat 2013 Mosaic")
+        self.landsat_2015 = _memory_layer("Landsat 2015 Mosaic")
+        self.project.addMapLayers([self.landsat_2013, self.landsat_2015], False)
+        self.imagery_group.addLayer(self.landsat_2013)
+        self.imagery_group.addLayer(self.landsat_2015)
+
+        self.site_layer = _memory_layer("Site boundary: v1")
+        self.project.addMapLayer(self.site_layer)
+
+        self.index = LayerTreeIndex(self.project)
+
+    def test_group_lookups(self):
+        """Assert layers are found by group and name segment."""
+        self.assertEqual(
+            self.index.first_layer_in_group("Historical Landsat Imagery").id(),
+            self.landsat_2013.id(),
+        )
+        self.assertEqual(
+            self.index.first_matching_layer_in_group(
+                "Historical Landsat Imagery", "Landsat 2015"
+            ).id(),
+            self.landsat_2015.id(),
+        )
+        self.assertEqual(len(self.index.group_layers("Historical Landsat Imagery")), 2)
+        self.assertIsNone(self.index.first_layer_in_group("Exclusion Masks"))
+
+    def test_name_lookups(self):
+        """Assert layers are found by node name and cleaned name."""
+        self.assertEqual(
+            self.index.layer_by_node_name("Site boundary: v1").id(),
+            self.site_layer.id(),
+        )
+        self.assertEqual(
+            self.index.layer_by_node_name("2013", LayerNodeSearch.CONTAINS).id(),
+            self.landsat_2013.id(),
+        )
+        self.assertEqual(
+            self.index.layer_by_clean_name("Site_boundary__v1").id(),
+            self.site_layer.id(),
+        )
+
+    def test_index_invalidated(self):
+        """Assert the index is updated when the layer tree changes."""
+        self.assertIsNone(self.index.first_layer_in_group("Exclusion Masks"))
+
+        mask_layer = _memory_layer("Mask")
+        self.project.addMapLayer(mask_layer, False)
+        mask_group = self.project.layerTreeRoot().addGroup("Exclusion Masks")
+        mask_group.addLayer(mask_layer)
+
+        self.assertEqual(
+            self.index.first_layer_in_group("Exclusion Masks").id(), mask_layer.id()
+        )
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the multi-process report backend.
+"""
+import io
+import json
+from unittest import TestCase
+
+from qgis.core import NULL
+
+from qgis.PyQt import QtCore
+
+from qgis_gea_plugin.lib.reports.process_pool import (
+    metadata_from_dict,
+    metadata_to_dict,
+    result_from_dict,
+    result_to_dict,
+    WorkerEventWriter,
+)
+from qgis_gea_plugin.models.report import (
+    ProjectMetadata,
+    ReportOutputResult,
+    StageTiming,
+)
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestProcessPool(TestCase):
+    """Tests for the multi-process report backend."""
+
+    def setUp(self):
+        self.result = ReportOutputResult(
+            True,
+            "reports",
+            "Farmer ID F 1",
+            ("Warning",),
+            1.5,
+            2048,
+            (StageTiming("export_pdf", "stage", 0.5, 1.5, 1),),
+        )
+
+    def test_result_round_trip(self):
+        """Assert a result is restored from its dictionary."""
+        values = json.loads(json.dumps(result_to_dict(self.result)))
+
+        self.assertEqual(result_from_dict(values), self.result)
+
+    def test_metadata_round_trip(self):
+        """Assert the metadata of a worker shard is restored from its
+        dictionary.
+        """
+        metadata = ProjectMetadata(
+            "F 1", "2020-01-01", "Project", "Author", "4.00", (0.0, 0.0, 2.5, 1.0), 2
+        )
+        values = json.loads(json.dumps(metadata_to_dict(metadata)))
+
+        self.assertEqual(metadata_from_dict(values), metadata)
+
+    def test_metadata_attribute_values(self):
+        """Assert date and NULL attribute values of the metadata are
+        written to JSON and restored.
+        """
+        metadata = ProjectMetadata(
+            "F 1", QtCore.QDate(2020, 1, 31), "Project", NULL, "4.00"
+        )
+        values = json.loads(json.dumps(metadata_to_dict(metadata)))
+        self.assertEqual(values["inception_date"], {"date": "2020-01-31"})
+        self.assertIsNone(values["author"])
+
+        restored = metadata_from_dict(values)
+        self.assertEqual(restored.inception_date, QtCore.QDate(2020, 1, 31))
+        self.assertTrue(restored.author.isNull())
+        self.assertIsNone(restored.site_extent)
+
+    def test_worker_events(self):
+        """Assert the worker events are written as JSON lines."""
+        stream = io.StringIO()
+        writer = WorkerEventWriter(stream)
+        writer.start("F 1")
+        writer.finish("F 1", True, 1.5)
+        writer.report(self.result)
+
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(
+            [event["event"] for event in events], ["started", "finished", "result"]
+        )
+        self.assertEqual(events[1]["farmer_id"], "F 1")
+        self.assertEqual(result_from_dict(events[2]["result"]), self.result)
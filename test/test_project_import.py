@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the import of the project instances layer.
+"""
+import os
+import tempfile
+from unittest import TestCase
+
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsGeometry,
+    QgsRectangle,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+)
+
+from qgis_gea_plugin.jobs.project_import import ProjectInstanceImportTask
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestProjectInstanceImportTask(TestCase):
+    """Tests for the project instances import task."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.shapefile_path = os.path.join(self.temp_dir.name, "instances.shp")
+        self.output_path = os.path.join(self.temp_dir.name, "instances.gpkg")
+
+        layer = QgsVectorLayer(
+            "Polygon?crs=EPSG:3857&field=FarmerID:string&field=area (ha):string",
+            "instances",
+            "memory",
+        )
+        features = []
+        for index in range(4):
+            feature = QgsFeature(layer.fields())
+            feature.setAttributes([f"F {index % 2}", "1,000.00"])
+            feature.setGeometry(
+                QgsGeometry.fromRect(
+                    QgsRectangle(index * 2000, 0, index * 2000 + 1000, 1000)
+                )
+            )
+            features.append(feature)
+        layer.dataProvider().addFeatures(features)
+
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "ESRI Shapefile"
+        QgsVectorFileWriter.writeAsVectorFormatV2(
+            layer, self.shapefile_path, QgsCoordinateTransformContext(), options
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_import(self):
+        """Assert the layer is converted with numeric areas."""
+        task = ProjectInstanceImportTask(
+            self.shapefile_path, self.output_path, QgsCoordinateTransformContext()
+        )
+
+        self.assertTrue(task.run())
+        self.assertEqual(task.feature_count, 4)
+        self.assertEqual(task.extent, QgsRectangle(0, 0, 7000, 1000))
+
+        layer = QgsVectorLayer(task.layer_uri, task.layer_name, "ogr")
+        self.assertTrue(layer.isValid())
+        self.assertEqual(layer.featureCount(), 4)
+        for feature in layer.getFeatures():
+            self.assertAlmostEqual(feature["area (ha)"], 100.0, delta=1.0)
+
+    def test_invalid_layer(self):
+        """Assert a layer without farmer IDs is not imported."""
+        layer = QgsVectorLayer(self.shapefile_path, "instances", "ogr")
+        layer.dataProvider().deleteAttributes([0])
+        del layer
+
+        task = ProjectInstanceImportTask(
+            self.shapefile_path, self.output_path, QgsCoordinateTransformContext()
+        )
+
+        self.assertFalse(task.run())
+        self.assertTrue(task.error)
+        self.assertFalse(os.path.exists(self.output_path))
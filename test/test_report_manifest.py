@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the report manifest.
+"""
+import os
+from unittest import TestCase
+
+from qgis.PyQt import QtCore
+
+from qgis_gea_plugin.lib.reports.manifest import file_digest, ReportManifest
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestReportManifest(TestCase):
+    """Tests for the report manifest."""
+
+    def setUp(self):
+        self.temp_dir = QtCore.QTemporaryDir()
+        self.assertTrue(self.temp_dir.isValid())
+        self.report_dir = self.temp_dir.path()
+        self.pdf_path = os.path.join(self.report_dir, "Farmer_1.pdf")
+        with open(self.pdf_path, "wb") as pdf_file:
+            pdf_file.write(b"%PDF-1.4")
+
+    def test_report_is_current(self):
+        """Assert a report is only current for the recorded fingerprint."""
+        manifest = ReportManifest(self.report_dir)
+        self.assertFalse(manifest.is_current("Farmer 1", "abc", self.pdf_path))
+
+        manifest.update("Farmer 1", "abc", self.pdf_path)
+        self.assertTrue(manifest.is_current("Farmer 1", "abc", self.pdf_path))
+        self.assertFalse(manifest.is_current("Farmer 1", "def", self.pdf_path))
+
+        os.remove(self.pdf_path)
+        self.assertFalse(manifest.is_current("Farmer 1", "abc", self.pdf_path))
+
+    def test_manifest_persisted_and_compacted(self):
+        """Assert the latest entries are read back and superseded lines
+        are removed from the manifest file.
+        """
+        manifest = ReportManifest(self.report_dir)
+        manifest.update("Farmer 1", "abc", self.pdf_path)
+        manifest.update("Farmer 1", "def", self.pdf_path)
+
+        reloaded_manifest = ReportManifest(self.report_dir)
+        self.assertEqual(reloaded_manifest.fingerprint("Farmer 1"), "def")
+        with open(reloaded_manifest.path, encoding="utf-8") as manifest_file:
+            self.assertEqual(len(manifest_file.readlines()), 1)
+
+    def test_manifest_reloaded(self):
+        """Assert the entries written by another process are read."""
+        manifest = ReportManifest(self.report_dir)
+        manifest.update("Farmer 1", "abc", self.pdf_path)
+
+        worker_manifest = ReportManifest(self.report_dir)
+        worker_manifest.update("Farmer 2", "def", self.pdf_path)
+        manifest.update("Farmer 3", "ghi", self.pdf_path)
+
+        self.assertEqual(manifest.fingerprint("Farmer 2"), "def")
+        self.assertEqual(ReportManifest(self.report_dir).fingerprint("Farmer 2"), "def")
+
+    def test_file_digest(self):
+        """Assert the digest changes with the file contents."""
+        digest = file_digest(self.pdf_path)
+        self.assertTrue(digest)
+
+        with open(self.pdf_path, "ab") as pdf_file:
+            pdf_file.write(b"%%EOF")
+        modified_time = os.path.getmtime(self.pdf_path) + 10
+        os.utime(self.pdf_path, (modified_time, modified_time))
+
+        self.assertNotEqual(file_digest(self.pdf_path), digest)
+        self.assertEqual(file_digest(os.path.join(self.report_dir, "missing")), "")
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the report stage timings.
+"""
+import json
+import os
+from unittest import TestCase
+
+from qgis.PyQt import QtCore
+
+from qgis_gea_plugin.lib.reports.profiler import (
+    aggregate_timings,
+    ReportProfiler,
+    write_chrome_trace,
+    write_timings_json,
+)
+from qgis_gea_plugin.models.report import ReportOutputResult
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestReportProfiler(TestCase):
+    """Tests for the report profiler."""
+
+    def _get_results(self):
+        results = []
+        for name in ("Farmer 1", "Farmer 2"):
+            profiler = ReportProfiler()
+            with profiler.span("set_project"):
+                pass
+            with profiler.span("overview_map", "map_item"):
+                pass
+            results.append(
+                ReportOutputResult(True, "", name, timings=profiler.timings())
+            )
+
+        return results
+
+    def test_span_recorded_on_error(self):
+        """Assert a span is recorded when the block raises an error."""
+        profiler = ReportProfiler()
+        with self.assertRaises(ValueError):
+            with profiler.span("load_template"):
+                raise ValueError()
+
+        timings = profiler.timings()
+        self.assertEqual(len(timings), 1)
+        self.assertEqual(timings[0].name, "load_template")
+        self.assertGreaterEqual(timings[0].duration, 0)
+
+    def test_aggregate_timings(self):
+        """Assert the timings are aggregated by category and name."""
+        aggregates = aggregate_timings(self._get_results())
+
+        self.assertEqual(aggregates["stage/set_project"]["count"], 2)
+        self.assertEqual(aggregates["map_item/overview_map"]["count"], 2)
+
+    def test_write_timings(self):
+        """Assert the JSON and trace files are written."""
+        temp_dir = QtCore.QTemporaryDir()
+        self.assertTrue(temp_dir.isValid())
+        results = self._get_results()
+
+        json_path = os.path.join(temp_dir.path(), "timings.json")
+        self.assertTrue(write_timings_json(results, json_path))
+        with open(json_path) as json_file:
+            content = json.load(json_file)
+        self.assertEqual(len(content["reports"]), 2)
+
+        trace_path = os.path.join(temp_dir.path(), "trace.json")
+        self.assertTrue(write_chrome_trace(results, trace_path))
+        with open(trace_path) as trace_file:
+            content = json.load(trace_file)
+        self.assertEqual(len(content["traceEvents"]), 4)
+        self.assertEqual(content["traceEvents"][0]["ph"], "X")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the streaming batch report scheduler.
+"""
+import os
+from unittest import TestCase
+
+from qgis.core import QgsFeedback
+
+from qgis.PyQt import QtCore
+
+from qgis_gea_plugin.lib.reports.scheduler import BatchReportTask
+from qgis_gea_plugin.models.report import ProjectMetadata, SiteReportContext
+
+from model_data_for_testing import get_temporal_info
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestBatchReportTask(TestCase):
+    """Tests for the batch report task."""
+
+    def setUp(self):
+        self.temp_dir = QtCore.QTemporaryDir()
+        self.assertTrue(self.temp_dir.isValid())
+        self.consumed = []
+
+    def _farmers(self, count):
+        for index in range(count):
+            self.consumed.append(index)
+            yield ProjectMetadata(f"F {index}", "", "GEA", "author", "1.00")
+
+    def _get_context(self):
+        # The project does not exist so each report fails quickly
+        return SiteReportContext(
+            ProjectMetadata("", "", "", "", ""),
+            QgsFeedback(),
+            self.temp_dir.path(),
+            os.path.join(self.temp_dir.path(), "missing.qgz"),
+            os.path.join(self.temp_dir.path(), "missing.qpt"),
+            get_temporal_info(),
+        )
+
+    def test_result_per_farmer(self):
+        """Assert a result is collected for each farmer."""
+        task = BatchReportTask(self._farmers(5), self._get_context(), 2, 5)
+
+        self.assertFalse(task.run())
+        self.assertEqual(len(self.consumed), 5)
+        self.assertEqual(
+            sorted(result.name for result in task.results),
+            [f"Farmer ID F {index}" for index in range(5)],
+        )
+        self.assertTrue(all(not result.success for result in task.results))
+
+    def test_cancelled_batch(self):
+        """Assert no report is created once the batch is cancelled."""
+        context = self._get_context()
+        task = BatchReportTask(self._farmers(5), context, 2, 5)
+        context.feedback.cancel()
+
+        self.assertFalse(task.run())
+        self.assertEqual(self.consumed, [])
+        self.assertEqual(task.results, [])
@@ -2,15 +2,42 @@
 """
 Unit test for report framework.
 """
+import dataclasses
 import os
 from unittest import TestCase
 
-from qgis.core import QgsFeedback, QgsProject
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsFeedback,
+    QgsGeometry,
+    QgsProject,
+    QgsRectangle,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+)
 
 from qgis.PyQt import QtCore
 
 
+from qgis_gea_plugin.conf import settings_manager, Settings
+from qgis_gea_plugin.definitions.defaults import (
+    STAGE_PDF_EXPORT,
+    STAGE_PROJECT_READ,
+    STAGE_TEMPLATE_LOAD,
+)
+from qgis_gea_plugin.lib.reports.generator import (
+    SiteReportReportGeneratorTask,
+    split_farmer_id,
+)
 from qgis_gea_plugin.lib.reports.manager import ReportManager
+from qgis_gea_plugin.models.base import ExportProfile, ReportBatchMode
+from qgis_gea_plugin.models.report import (
+    ProjectMetadata,
+    ReportOutputResult,
+    SiteReportContext,
+)
+from qgis_gea_plugin.utils import clean_filename, FileUtils
 
 from model_data_for_testing import get_site_metadata, get_temporal_info
 from utilities_for_testing import get_qgis_app
@@ -22,6 +49,15 @@ QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
 class TestReportManager(TestCase):
     """Tests for the report manager."""
 
+    def set_setting(self, name: Settings, value):
+        """Sets a plugin setting which is restored once the test has run."""
+        previous_value = settings_manager.get_value(name)
+        if previous_value is None:
+            self.addCleanup(settings_manager.remove, name)
+        else:
+            self.addCleanup(settings_manager.set_value, name, previous_value)
+        settings_manager.set_value(name, value)
+
     def test_successful_submit_result(self):
         """Assert a site report job is successfully submitted."""
         rpm = ReportManager()
@@ -39,3 +75,142 @@ class TestReportManager(TestCase):
         #     temporal_info
         # )
         # self.assertTrue(submit_result.success)
+
+    def test_worker_count(self):
+        """Assert the number of concurrent report workers is configurable."""
+        self.set_setting(Settings.REPORT_CONCURRENCY, 3)
+        self.assertEqual(ReportManager.worker_count(), 3)
+
+        self.set_setting(Settings.REPORT_CONCURRENCY, 0)
+        self.assertEqual(
+            ReportManager.worker_count(), max(1, (os.cpu_count() or 2) - 1)
+        )
+
+    def test_export_profile(self):
+        """Assert the PDF export profile is read from the settings."""
+        self.set_setting(Settings.REPORT_EXPORT_PROFILE, "draft")
+        self.assertEqual(ReportManager.export_profile(), ExportProfile.DRAFT)
+
+        self.set_setting(Settings.REPORT_EXPORT_PROFILE, "unknown")
+        self.assertEqual(ReportManager.export_profile(), ExportProfile.STANDARD)
+
+    def test_batch_mode(self):
+        """Assert the farmer reports batch mode is read from the settings."""
+        self.set_setting(Settings.REPORT_BATCH_MODE, "atlas_combined")
+        self.assertEqual(ReportManager.batch_mode(), ReportBatchMode.ATLAS_COMBINED)
+
+        self.set_setting(Settings.REPORT_BATCH_MODE, "unknown")
+        self.assertEqual(ReportManager.batch_mode(), ReportBatchMode.TASKS)
+
+    def test_split_farmer_id(self):
+        """Assert the farmer number is split from the farmer ID."""
+        self.assertEqual(split_farmer_id("12 John Doe"), ("John Doe", "12"))
+        self.assertEqual(split_farmer_id("John Doe 12"), ("John Doe ", "12"))
+        self.assertEqual(split_farmer_id("John Doe"), ("John Doe", ""))
+
+    def test_export_summary(self):
+        """Assert only the exported reports are summarized."""
+        results = [
+            ReportOutputResult(True, "", "Farmer 1", (), 1.5, 1024),
+            ReportOutputResult(True, "", "Farmer 2", (), 0.5, 2048),
+            ReportOutputResult(True, "", "Farmer 3"),
+        ]
+        summary = ReportManager.export_summary(results)
+
+        self.assertIn("Exported 2 report(s)", summary)
+        self.assertIn("2.00s", summary)
+
+    def test_single_pass_report_generation(self):
+        """Assert the report of a farmer is exported to PDF with the
+        project, template and PDF export stages only executed once.
+        """
+        temp_dir = QtCore.QTemporaryDir()
+        self.assertTrue(temp_dir.isValid())
+
+        # Project with a project instances layer with the farmer's sites
+        layer_path = os.path.join(temp_dir.path(), "project_instances.shp")
+        memory_layer = QgsVectorLayer(
+            "Polygon?crs=EPSG:4326&field=FarmerID:string", "sites", "memory"
+        )
+        features = []
+        for index in range(2):
+            feature = QgsFeature(memory_layer.fields())
+            feature.setAttributes(["F 1"])
+            feature.setGeometry(
+                QgsGeometry.fromRect(
+                    QgsRectangle(34.0 + index * 0.02, 0.0, 34.01 + index * 0.02, 0.01)
+                )
+            )
+            features.append(feature)
+        memory_layer.dataProvider().addFeatures(features)
+
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "ESRI Shapefile"
+        QgsVectorFileWriter.writeAsVectorFormatV2(
+            memory_layer, layer_path, QgsCoordinateTransformContext(), options
+        )
+
+        project = QgsProject()
+        site_layer = QgsVectorLayer(layer_path, "project_instances", "ogr")
+        self.assertTrue(site_layer.isValid())
+        project.addMapLayer(site_layer)
+        project_path = os.path.join(temp_dir.path(), "test.qgz")
+        self.assertTrue(project.write(project_path))
+
+        context = SiteReportContext(
+            ProjectMetadata(
+                "F 1",
+                "2020-01-01",
+                "Project",
+                "Author",
+                "2.46",
+                (34.0, 0.0, 34.03, 0.01),
+                2,
+            ),
+            QgsFeedback(),
+            temp_dir.path(),
+            project_path,
+            FileUtils.project_instance_report_template_path(),
+            get_temporal_info(),
+            basemap_cache=False,
+            site_layer_path=layer_path,
+            adopt_layout=False,
+        )
+        os.makedirs(context.report_dir)
+
+        task = SiteReportReportGeneratorTask(context)
+        self.assertTrue(task.run())
+
+        pdf_path = os.path.join(
+            context.report_dir, f"{clean_filename(task.report_name)}.pdf"
+        )
+        self.assertTrue(os.path.exists(pdf_path))
+        self.assertGreater(task.result.pdf_size, 0)
+
+        stage_counts = task.stage_counts
+        self.assertEqual(stage_counts.get(STAGE_PROJECT_READ), 1)
+        self.assertEqual(stage_counts.get(STAGE_TEMPLATE_LOAD), 1)
+        self.assertEqual(stage_counts.get(STAGE_PDF_EXPORT), 1)
+
+        # The report is now up to date, it is skipped with the same name
+        skipped_task = SiteReportReportGeneratorTask(context)
+        self.assertTrue(skipped_task.run())
+        self.assertFalse(skipped_task.stage_counts.get(STAGE_TEMPLATE_LOAD))
+        self.assertEqual(skipped_task.result.name, task.result.name)
+
+    def test_context_is_immutable(self):
+        """Assert the report context cannot be changed once created."""
+        context = SiteReportContext(
+            get_site_metadata(),
+            QgsFeedback(),
+            "",
+            "test.qgz",
+            FileUtils.site_report_template_path(),
+            get_temporal_info(),
+        )
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            context.site_layer_path = "sites.shp"
+
+        context_copy = dataclasses.replace(context, site_layer_path="sites.shp")
+        self.assertEqual(context_copy.site_layer_path, "sites.shp")
+        self.assertEqual(context.site_layer_path, "")
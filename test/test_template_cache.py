@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the report template cache.
+"""
+import os
+import shutil
+from unittest import TestCase
+
+from qgis.PyQt import QtCore
+
+from qgis_gea_plugin.lib.reports.template_cache import ReportTemplateCache
+from qgis_gea_plugin.utils import FileUtils
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestReportTemplateCache(TestCase):
+    """Tests for the report template cache."""
+
+    def setUp(self):
+        self.temp_dir = QtCore.QTemporaryDir()
+        self.assertTrue(self.temp_dir.isValid())
+        self.template_path = os.path.join(self.temp_dir.path(), "template.qpt")
+        shutil.copy(
+            FileUtils.project_instance_report_template_path(), self.template_path
+        )
+
+    def test_template_parsed_once(self):
+        """Assert a template is only parsed the first time it is requested."""
+        cache = ReportTemplateCache()
+        first_doc = cache.document(self.template_path)
+        second_doc = cache.document(self.template_path)
+
+        self.assertFalse(first_doc.isNull())
+        self.assertFalse(second_doc.isNull())
+        self.assertEqual(cache.parse_count, 1)
+        self.assertEqual(
+            first_doc.documentElement().tagName(),
+            second_doc.documentElement().tagName(),
+        )
+
+    def test_template_invalidated_on_change(self):
+        """Assert a template is parsed again when the file is modified."""
+        cache = ReportTemplateCache()
+        _ = cache.document(self.template_path)
+
+        modified_time = os.path.getmtime(self.template_path) + 10
+        os.utime(self.template_path, (modified_time, modified_time))
+        _ = cache.document(self.template_path)
+
+        self.assertEqual(cache.parse_count, 2)
+
+    def test_missing_template(self):
+        """Assert an error is reported for a missing template."""
+        cache = ReportTemplateCache()
+        error_messages = []
+        doc = cache.document(
+            os.path.join(self.temp_dir.path(), "missing.qpt"), error_messages
+        )
+
+        self.assertIsNone(doc)
+        self.assertEqual(len(error_messages), 1)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the coordinate transform cache.
+"""
+from unittest import TestCase
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsRectangle,
+)
+
+from qgis_gea_plugin.lib.reports.transform_cache import TransformCache
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestTransformCache(TestCase):
+    """Tests for the transform cache."""
+
+    def test_transform_reused(self):
+        """Assert transforms are reused for the same CRS pair."""
+        cache = TransformCache()
+        source_crs = QgsCoordinateReferenceSystem("EPSG:4326")
+        target_crs = QgsCoordinateReferenceSystem("EPSG:3857")
+        context = QgsCoordinateTransformContext()
+
+        first = cache.transform(source_crs, target_crs, context)
+        second = cache.transform(source_crs, target_crs, context)
+        _ = cache.transform(target_crs, source_crs, context)
+
+        self.assertEqual(cache.stats, {"hits": 1, "misses": 2})
+        extent = QgsRectangle(34, 0, 35, 1)
+        self.assertEqual(
+            first.transformBoundingBox(extent), second.transformBoundingBox(extent)
+        )
+
+        cache.clear()
+        self.assertEqual(cache.stats, {"hits": 0, "misses": 0})
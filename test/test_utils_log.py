@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the plugin logging.
+"""
+import os
+from unittest import TestCase
+
+from qgis.PyQt import QtCore
+
+from qgis_gea_plugin.models.base import LogLevel
+from qgis_gea_plugin.utils import (
+    is_log_enabled,
+    log,
+    log_level_from_name,
+    set_log_level,
+    start_file_log,
+    stop_file_log,
+)
+
+from utilities_for_testing import get_qgis_app
+
+
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+
+class TestLog(TestCase):
+    """Tests for the level-aware logging."""
+
+    def tearDown(self):
+        stop_file_log()
+        set_log_level(LogLevel.INFO)
+
+    def test_log_level_from_name(self):
+        """Assert log levels are read from their setting names."""
+        self.assertEqual(log_level_from_name("debug"), LogLevel.DEBUG)
+        self.assertEqual(log_level_from_name("WARNING"), LogLevel.WARNING)
+        self.assertEqual(log_level_from_name("unknown"), LogLevel.INFO)
+
+    def test_file_log_levels(self):
+        """Assert only the messages at or above the level are written."""
+        temp_dir = QtCore.QTemporaryDir()
+        self.assertTrue(temp_dir.isValid())
+        log_path = os.path.join(temp_dir.path(), "gea.log")
+
+        start_file_log(log_path)
+        set_log_level(LogLevel.INFO)
+        self.assertFalse(is_log_enabled(LogLevel.DEBUG))
+
+        log("Debug message", level=LogLevel.DEBUG)
+        log("Info message")
+        log("Warning message", info=False)
+        stop_file_log()
+
+        with open(log_path, encoding="utf-8") as log_file:
+            content = log_file.read()
+
+        self.assertNotIn("Debug message", content)
+        self.assertIn("Info message", content)
+        self.assertIn("[WARNING]", content)